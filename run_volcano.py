@@ -16,6 +16,7 @@
 
 try:
     from src.integration.vuap import VolcanicMonitoringFramework
+    from src.visualization.report_generator import format_probability, render, report_filename
     IMPORT_SUCCESS = True
 except ImportError as e:
     print(f"⚠️  Import error: {e}")
@@ -38,53 +39,10 @@ def save_txt_report(report: dict, output_dir: str = "results/reports"):
         output_dir: Directory to save the report
     """
     try:
-        # Create directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
-        
-        # Create safe filename
-        volcano_safe = ''.join(c if c.isalnum() else '_' for c in report['volcano'])
-        timestamp = report['timestamp'].replace(':', '').replace('-', '').replace('T', '_').split('.')[0]
-        filename = f"{output_dir}/{volcano_safe}_{timestamp}.txt"
-        
-        # Format TXT report
+        filename = os.path.join(output_dir, report_filename(report, 'txt'))
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write("=" * 60 + "\n")
-            f.write(f"🌋 VUAP REPORT: {report['volcano']}\n")
-            f.write("=" * 60 + "\n\n")
-            
-            f.write(f"📅 TIMESTAMP: {report['timestamp']}\n")
-            f.write(f"🚨 ALERT LEVEL: {report['alert_level']}\n")
-            f.write(f"📊 ERUPTION PROBABILITY: {report['eruption_probability']:.2%}\n\n")
-            
-            f.write("📈 STATE VECTOR:\n")
-            params = ['S', 'P', 'G', 'D', 'H', 'E', 'W', 'L', 'R']
-            vector = report['state_vector']
-            for i, (param, value) in enumerate(zip(params, vector)):
-                f.write(f"  {param}: {float(value):.3f}")
-                if (i + 1) % 3 == 0:
-                    f.write("\n")
-                else:
-                    f.write(" | ")
-            f.write("\n\n")
-            
-            f.write("🚦 THRESHOLD STATUS:\n")
-            for key, value in report['threshold_status'].items():
-                status = "✅ ACTIVE" if value else "☑️ INACTIVE"
-                f.write(f"  • {key.upper()}: {status}\n")
-            f.write("\n")
-            
-            f.write("💡 RECOMMENDATIONS:\n")
-            for i, rec in enumerate(report['recommendations'], 1):
-                f.write(f"  {i}. {rec}\n")
-            f.write("\n")
-            
-            f.write("📋 PARAMETER VALUES:\n")
-            for param, value in report['parameter_values'].items():
-                f.write(f"  {param}: {value:.3f}\n")
-            f.write("\n")
-            
-            f.write(f"⏭️  NEXT ASSESSMENT: {report['next_assessment']}\n")
-            f.write("=" * 60 + "\n")
+            f.write(render(report, 'txt'))
         
         print(f"💾 TXT report saved: {filename}")
         return filename
@@ -93,8 +51,8 @@ def save_txt_report(report: dict, output_dir: str = "results/reports"):
         print(f"❌ Failed to save TXT report: {e}")
         return None
 
-def main():
-    """Main CLI entry point."""
+def main(argv=None):
+    """Main CLI entry point (``argv`` defaults to ``sys.argv[1:]``)."""
     if not IMPORT_SUCCESS:
         print("❌ Failed to import modules")
         return 1
@@ -104,22 +62,53 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
-    parser.add_argument('--volcano', required=True, help='Name of volcano to monitor')
+    parser.add_argument('--volcano', help='Name of volcano to monitor')
+    parser.add_argument('--all', action='store_true',
+                        help='Monitor every volcano in the volcano list concurrently')
+    parser.add_argument('--volcano-list', default='config/volcano_list.yaml',
+                        help='Volcano list used with --all')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Parameter computation processes used with --all')
     parser.add_argument('--demo', action='store_true', help='Run with demo data')
     parser.add_argument('--report', action='store_true', help='Generate single report')
     parser.add_argument('--monitor', action='store_true', help='Run real-time monitoring')
     parser.add_argument('--interval', type=int, default=3600, help='Monitoring interval in seconds')
     parser.add_argument('--output', default='results/reports', help='Output directory for reports')
+    parser.add_argument('--export', choices=['txt', 'json'],
+                        help='Render the archived reports of --volcano into --output and exit')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
     parser.add_argument('--simple', action='store_true', help='Simple output format')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if not args.volcano and not (args.all and args.monitor):
+        parser.error('--volcano is required unless --monitor --all is given')
     
     # Setup logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
     setup_logging(log_level)
     
     logger = logging.getLogger(__name__)
+    
+    if args.monitor and args.all:
+        from src.integration.scheduler import MonitoringScheduler
+        
+        scheduler = MonitoringScheduler.from_volcano_list(
+            args.volcano_list,
+            default_interval=args.interval,
+            max_workers=args.workers,
+        )
+        stats = scheduler.run_forever()
+        for name, summary in stats.items():
+            mean = summary.get('mean')
+            latency = f"{mean:.2f}s mean" if mean is not None else "no cycles"
+            print(f"⏱️  {name}: {summary['cycles']} cycles, {latency}, "
+                  f"{summary['overruns']} overruns")
+        writer = scheduler.report_writer_stats()
+        if writer:
+            print(f"💾 Reports: {writer['written']}/{writer['submitted']} archived, "
+                  f"max queue depth {writer['max_queue_depth']}")
+        return 0
+    
     logger.info(f"🌋 Starting volcano monitoring for {args.volcano}")
     
     # Initialize framework
@@ -129,6 +118,12 @@ def main():
         logger.error(f"Failed to initialize: {e}")
         return 1
     
+    if args.export:
+        with framework.open_report_store() as store:
+            paths = store.export(args.output, args.export, volcano=args.volcano)
+        print(f"💾 Exported {len(paths)} {args.export.upper()} reports to {args.output}")
+        return 0
+    
     # Use demo data if requested
     if args.demo:
         logger.info("📊 Using demo data mode")
@@ -157,13 +152,15 @@ def main():
             # Generate report
             report = framework.generate_vuap_report()
             
-            # Save TXT report
+            # Archive it and save a TXT copy
+            framework._save_report(report)
+            framework.flush_reports()
             saved_file = save_txt_report(report, args.output)
             
             # Display summary
             if args.simple:
                 print(f"\n🌋 {report['volcano']}")
-                print(f"📊 Probability: {report['eruption_probability']:.1%}")
+                print(f"📊 Probability: {format_probability(report['eruption_probability'])}")
                 print(f"🚨 Status: {report['alert_level']}")
                 if saved_file:
                     print(f"💾 Saved: {saved_file}")
@@ -172,9 +169,11 @@ def main():
                 print(f"🌋 VUAP REPORT: {report['volcano']}")
                 print(f"{'='*60}")
                 print(f"📅 Timestamp: {report['timestamp']}")
-                print(f"📊 Eruption Probability: {report['eruption_probability']:.2%}")
+                print(f"📊 Eruption Probability: "
+                      f"{format_probability(report['eruption_probability'], '.2%')}")
                 print(f"🚨 Alert Level: {report['alert_level']}")
-                print(f"\n📈 State Vector: {[f'{float(v):.2f}' for v in report['state_vector']]}")
+                vector = ['n/a' if v is None else f'{float(v):.2f}' for v in report['state_vector']]
+                print(f"\n📈 State Vector: {vector}")
                 
                 print(f"\n💾 TXT Report: {saved_file or 'Not saved'}")
                 print(f"{'='*60}")
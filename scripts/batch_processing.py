@@ -1,16 +1,315 @@
 #!/usr/bin/env python3
 """
 batch processing
+
+Historical backfill of VUAP assessments, e.g. after changing the parameter
+weights. Work is split into (volcano, time chunk) partitions that run on a
+process pool. Each partition reads its data window from the volcano's
+TimeSeriesStore once and assesses every cycle in its chunk. The parent
+writes the results in bulk to a columnar TimeSeriesStore, with one
+``vuap_<volcano>`` dataset per volcano, and records completed partitions
+in a checkpoint so that an interrupted run resumes where it stopped.
+Results are written with one row per assessment time, so partitions that
+were written but not yet checkpointed are replaced, not duplicated, when
+they are rerun.
 """
 
 import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+import pandas as pd
+
+from src.integration.parameter_graph import ParameterGraph
+from src.integration.scheduler import DEFAULT_VOLCANO_LIST, load_volcano_list
+from src.integration.vuap import PARAMETER_NAMES, VolcanicMonitoringFramework
+from src.utils.cache import content_key
+from src.utils.io import TimeSeriesStore
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = '_checkpoint.json'
+THRESHOLD_LEVELS = ('warning', 'critical', 'alert')
+
+
+def dataset_name(volcano: str) -> str:
+    """Output dataset holding the backfilled assessments of a volcano."""
+    return 'vuap_' + ''.join(c if c.isalnum() else '_' for c in volcano)
+
+
+def _read_window(data_sources: Dict, start: pd.Timestamp, end: pd.Timestamp) -> Dict:
+    """Every dataset of a volcano's store over [start, end), with its time axis."""
+    if 'data_store' not in data_sources:
+        raise ValueError("No data_store in the volcano's data_sources; "
+                         "set one in the volcano list or pass --data-store")
+
+    store = TimeSeriesStore(data_sources['data_store'])
+    data = {}
+    for dataset in data_sources.get('datasets') or store.datasets():
+        frame = store.read(dataset, start, end)
+        time_column = store.columns(dataset)[0]
+        data[dataset] = (frame, frame[time_column].to_numpy(dtype='datetime64[ns]'))
+    return data
+
+
+def run_partition(partition: Dict, data_sources: Dict, config_path: Optional[str],
+                  step: str, window: str) -> pd.DataFrame:
+    """
+    Assess every cycle of one (volcano, time chunk) partition.
+
+    Module-level so it can be shipped to worker processes.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per cycle: time, the nine indices (NaN where unavailable),
+        eruption_probability and the warning/critical/alert flags
+    """
+    framework = VolcanicMonitoringFramework(partition['volcano'], config_path,
+                                            volcano_type=partition.get('type'))
+    start, end = pd.Timestamp(partition['start']), pd.Timestamp(partition['end'])
+    window = pd.Timedelta(window).to_timedelta64()
+    times = np.arange(start.to_datetime64(), end.to_datetime64(),
+                      pd.Timedelta(step).to_timedelta64()).astype('datetime64[ns]')
+
+    # One read per dataset for the whole chunk; cycles slice it in memory
+    data = _read_window(data_sources, start - pd.Timedelta(window), end)
+    states = np.full((len(times), len(PARAMETER_NAMES)), np.nan)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # The framework's cache skips indices whose window did not change
+        graph = ParameterGraph(config=framework.config.get('parameter_config'),
+                               executor=executor, cache=framework.parameter_cache)
+        for k, t in enumerate(times):
+            cycle_data = {}
+            for dataset, (frame, frame_times) in data.items():
+                lo = np.searchsorted(frame_times, t - window, side='left')
+                hi = np.searchsorted(frame_times, t, side='left')
+                cycle_data[dataset] = frame.iloc[lo:hi]
+            values = graph.evaluate(cycle_data)['values']
+            states[k] = [np.nan if values[p] is None else values[p] for p in PARAMETER_NAMES]
+
+    # Missing indices stay NaN and are left out of the probability
+    scores = framework.score_state_vectors(states)
+    columns = {'time': times}
+    columns.update({p: states[:, i] for i, p in enumerate(PARAMETER_NAMES)})
+    columns['eruption_probability'] = scores['eruption_probability']
+    columns.update({level: scores[level] for level in THRESHOLD_LEVELS if level in scores})
+    return pd.DataFrame(columns)
+
+
+class BackfillEngine:
+    """
+    Partitioned, resumable recomputation of historical VUAP assessments.
+
+    Parameters
+    ----------
+    volcanoes : dict
+        Volcano name -> metadata; ``data_sources`` (with ``data_store``)
+        points each volcano at its TimeSeriesStore
+    output_dir : str
+        Output TimeSeriesStore; also holds the checkpoint
+    start, end : str or timestamp
+        Half-open range [start, end) of assessment times
+    chunk : str
+        Time span of one partition (a multiple of ``step``)
+    step : str
+        Interval between assessments
+    window : str
+        Data window ending at each assessment time
+    config_path : str, optional
+        Framework configuration file
+    max_workers : int, optional
+        Size of the process pool
+    executor : concurrent.futures.Executor, optional
+        Executor to use instead of a new process pool
+    flush_rows : int
+        Result rows buffered before a bulk write and checkpoint
+    format : str
+        Output store format ('npy' or 'parquet')
+    """
+
+    def __init__(self, volcanoes: Dict[str, Dict], output_dir: str,
+                 start, end, chunk: str = '7D', step: str = '1h', window: str = '30D',
+                 config_path: Optional[str] = None,
+                 max_workers: Optional[int] = None,
+                 executor: Optional[Executor] = None,
+                 flush_rows: int = 100_000,
+                 format: str = 'npy'):
+        self.volcanoes = volcanoes
+        self.data_sources = {
+            name: dict((meta or {}).get('data_sources', {})) for name, meta in volcanoes.items()
+        }
+        self.output_dir = output_dir
+        self.start, self.end = pd.Timestamp(start), pd.Timestamp(end)
+        self.chunk, self.step, self.window = pd.Timedelta(chunk), pd.Timedelta(step), pd.Timedelta(window)
+        if self.end <= self.start:
+            raise ValueError("end must be after start")
+        if self.step <= pd.Timedelta(0) or self.chunk % self.step != pd.Timedelta(0):
+            raise ValueError(f"chunk ({chunk}) must be a positive multiple of step ({step})")
+        self.config_path = config_path
+        self.max_workers = max_workers
+        self.executor = executor
+        self.flush_rows = flush_rows
+        self.store = TimeSeriesStore(output_dir, format=format)
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+
+    def signature(self) -> str:
+        """Hash of everything that determines the results of a run."""
+        config = None
+        if self.config_path and os.path.exists(self.config_path):
+            with open(self.config_path, 'r') as f:
+                config = f.read()
+        types = sorted((name, (meta or {}).get('type')) for name, meta in self.volcanoes.items())
+        return content_key(sorted(self.data_sources.items()), types, str(self.start), str(self.end),
+                           str(self.chunk), str(self.step), str(self.window), config)
+
+    def partitions(self) -> List[Dict]:
+        """(volcano, time chunk) partitions covering the backfill range."""
+        bounds = []
+        chunk_start = self.start
+        while chunk_start < self.end:
+            bounds.append((chunk_start, min(chunk_start + self.chunk, self.end)))
+            chunk_start += self.chunk
+
+        return [
+            {'id': f"{volcano}/{lo.isoformat()}", 'volcano': volcano,
+             'type': (meta or {}).get('type'),
+             'start': lo.isoformat(), 'end': hi.isoformat()}
+            for volcano, meta in self.volcanoes.items() for lo, hi in bounds
+        ]
+
+    def _load_checkpoint(self) -> set:
+        if not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('signature') != self.signature():
+            raise ValueError(f"{self.output_dir} holds a backfill with different settings; "
+                             "use a new output directory")
+        return set(checkpoint['completed'])
+
+    def _write_checkpoint(self, completed: set):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'signature': self.signature(), 'completed': sorted(completed)}, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _flush(self, buffer: Dict[str, List[pd.DataFrame]], finished: List[str], completed: set):
+        """Write buffered results in bulk, then mark their partitions complete."""
+        for volcano, frames in buffer.items():
+            if frames:
+                self.store.ingest(dataset_name(volcano), pd.concat(frames, ignore_index=True),
+                                  unique=True)
+        completed.update(finished)
+        self._write_checkpoint(completed)
+        buffer.clear()
+        finished.clear()
+
+    def run(self) -> Dict:
+        """
+        Run every partition not yet recorded in the checkpoint.
+
+        Returns
+        -------
+        dict
+            Counts of partitions ('total', 'skipped', 'completed',
+            'failed'), rows written and elapsed seconds
+        """
+        started = time.perf_counter()
+        partitions = self.partitions()
+        completed = self._load_checkpoint()
+        todo = [p for p in partitions if p['id'] not in completed]
+        summary = {'total': len(partitions), 'skipped': len(partitions) - len(todo),
+                   'completed': 0, 'failed': 0, 'rows': 0}
+        logger.info(f"Backfilling {len(todo)} of {len(partitions)} partitions")
+
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.max_workers)
+        buffer, finished, buffered_rows = {}, [], 0
+        futures = {}
+        try:
+            for partition in todo:
+                future = executor.submit(run_partition, partition,
+                                         self.data_sources[partition['volcano']],
+                                         self.config_path, str(self.step), str(self.window))
+                futures[future] = partition
+
+            for future in as_completed(futures):
+                partition = futures[future]
+                try:
+                    frame = future.result()
+                except Exception as e:
+                    summary['failed'] += 1
+                    logger.error(f"❌ Partition {partition['id']} failed: {e}")
+                    continue
+
+                buffer.setdefault(partition['volcano'], []).append(frame)
+                finished.append(partition['id'])
+                buffered_rows += len(frame)
+                summary['completed'] += 1
+                summary['rows'] += len(frame)
+                if buffered_rows >= self.flush_rows:
+                    self._flush(buffer, finished, completed)
+                    buffered_rows = 0
+        finally:
+            # On interruption keep every finished partition and drop the rest
+            for future in futures:
+                future.cancel()
+            if finished:
+                self._flush(buffer, finished, completed)
+            if self.executor is None:
+                executor.shutdown(wait=True)
+
+        summary['elapsed'] = time.perf_counter() - started
+        return summary
+
 
 def main():
     parser = argparse.ArgumentParser(description='batch processing')
     parser.add_argument('--volcano', help='Volcano name')
+    parser.add_argument('--volcano-list', default=DEFAULT_VOLCANO_LIST,
+                        help='Volcano list with per-volcano data sources')
+    parser.add_argument('--start', required=True, help='First assessment time')
+    parser.add_argument('--end', required=True, help='End of the backfill (exclusive)')
+    parser.add_argument('--chunk', default='7D', help='Time span of one partition')
+    parser.add_argument('--step', default='1h', help='Interval between assessments')
+    parser.add_argument('--window', default='30D', help='Data window of each assessment')
+    parser.add_argument('--config', help='Framework configuration file')
+    parser.add_argument('--data-store', help='Root holding one TimeSeriesStore per volcano, '
+                                             'for volcanoes without data_sources')
+    parser.add_argument('--output', default='results/backfill', help='Output store directory')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes')
     args = parser.parse_args()
-    
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    volcanoes = load_volcano_list(args.volcano_list)
+    if args.volcano:
+        volcanoes = {args.volcano: volcanoes.get(args.volcano) or {}}
+    if args.data_store:
+        for name, meta in volcanoes.items():
+            meta = volcanoes[name] = dict(meta or {})
+            meta.setdefault('data_sources', {'data_store': os.path.join(args.data_store, name)})
+
     print(f"Running batch_processing for {args.volcano or 'all volcanoes'}")
+    engine = BackfillEngine(volcanoes, args.output, args.start, args.end,
+                            chunk=args.chunk, step=args.step, window=args.window,
+                            config_path=args.config, max_workers=args.workers)
+    summary = engine.run()
+    print(f"✅ {summary['completed']} partitions backfilled ({summary['rows']} rows), "
+          f"{summary['skipped']} already done, {summary['failed']} failed "
+          f"in {summary['elapsed']:.1f}s -> {args.output}")
+    return 1 if summary['failed'] else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
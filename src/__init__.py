@@ -21,16 +21,26 @@
 __license__ = "MIT"
 __copyright__ = "Copyright (c) 2026 Samir Baladi"
 
-# Core framework imports
-from .preprocessing import *
-from .parameters import *
-from .models import *
-from .integration import *
-from .analysis import *
-from .visualization import *
+# Subpackages and public names are imported lazily (PEP 562) so that
+# command-line entry points only pay for the modules they actually use.
+import importlib
 
-# Framework main class
-from .integration.vuap import VolcanicMonitoringFramework
+_SUBPACKAGES = (
+    "preprocessing",
+    "parameters",
+    "models",
+    "integration",
+    "analysis",
+    "visualization",
+    "utils",
+)
+
+_LAZY_ATTRIBUTES = {
+    "VolcanicMonitoringFramework": ".integration.vuap",
+    "calculate_all_parameters": ".integration.vuap",
+    "generate_vuap_report": ".integration.vuap",
+    "run_real_time_monitoring": ".integration.vuap",
+}
 
 __all__ = [
     "VolcanicMonitoringFramework",
@@ -38,3 +48,19 @@
     "generate_vuap_report",
     "run_real_time_monitoring",
 ]
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        module = importlib.import_module(f".{name}", __name__)
+    elif name in _LAZY_ATTRIBUTES:
+        module = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBPACKAGES) | set(_LAZY_ATTRIBUTES))
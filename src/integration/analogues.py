@@ -0,0 +1,386 @@
+"""
+Analogues
+integration/analogues.py
+
+Nearest-neighbour index over archived state vectors of all volcanoes.
+
+Distances are the weighted Euclidean distance of the probability model,
+so vectors are stored scaled by sqrt(weight) and searched with plain
+KD-trees. New vectors go to an append buffer that is scanned brute force
+and merged into the trees once it outgrows ``rebuild_fraction`` of them,
+so insertion is amortized O(log n) and no tree is updated in place.
+
+Missing parameters (``valid`` False in ``STATE_DTYPE`` records, NaN in
+plain arrays) are left out of the distance between two vectors and the
+remaining weights rescaled, as in the probability model. Stored vectors
+are therefore grouped by validity pattern, with one KD-tree per pattern
+over its valid parameters: for a query valid wherever the pattern is, the
+distance to those vectors is a plain Euclidean distance over the pattern's
+columns with rescaled weights. Vectors of rare patterns, and of patterns
+a query does not cover, are answered by an exact masked scan. The index
+is saved as NumPy arrays plus a JSON header and reloaded memory-mapped:
+
+    <path>/index.json        weights, volcano names, tree size
+    <path>/points.npy        scaled state vectors (n, 9)
+    <path>/volcano.npy       volcano code per vector
+    <path>/time.npy          POSIX seconds per vector
+    <path>/valid.npy         validity mask per vector (n, 9)
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .state_vector import HistoryBuffer, Timestamp, _to_epoch_seconds, state_valid, state_values
+
+INDEX_FILE = 'index.json'
+ARRAYS = ('points', 'volcano', 'time', 'valid')
+
+# Query x stored pairs scored per block of the masked scan
+SCAN_BLOCK = 1 << 16
+
+# Stored vectors a validity pattern needs for its own KD-tree
+MIN_PATTERN_TREE = 64
+
+
+class AnalogueIndex:
+    """
+    Incremental KD-trees of historical state vectors with batched queries.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        Parameter weights of the distance (as used for the probability)
+    leafsize : int
+        KD-tree leaf size
+    rebuild_fraction : float
+        Buffer size, relative to the trees, that triggers a rebuild
+    min_buffer : int
+        Buffer size below which the trees are never rebuilt
+    """
+
+    def __init__(self, weights: np.ndarray, leafsize: int = 32,
+                 rebuild_fraction: float = 0.05, min_buffer: int = 4096):
+        self.weights = np.asarray(weights, dtype=float)
+        self._scale = np.sqrt(self.weights)
+        self.leafsize = leafsize
+        self.rebuild_fraction = rebuild_fraction
+        self.min_buffer = min_buffer
+
+        width = self.weights.size
+        self._points = np.empty((0, width))
+        self._volcano = np.empty(0, dtype=np.int32)
+        self._time = np.empty(0)
+        self._valid = np.empty((0, width), dtype=bool)
+        self._size = 0
+        # (valid columns, weight factor, stored rows, tree) per pattern
+        self._trees: List[tuple] = []
+        self._scan_rows = np.empty(0, dtype=np.intp)    # rare patterns
+        self._tree_size = 0
+        self.volcanoes: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._eruptions: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def buffered(self) -> int:
+        """Vectors not yet in the trees."""
+        return self._size - self._tree_size
+
+    def _code(self, volcano: str) -> int:
+        if volcano not in self._codes:
+            self._codes[volcano] = len(self.volcanoes)
+            self.volcanoes.append(volcano)
+        return self._codes[volcano]
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed <= len(self._points):
+            return
+        capacity = max(needed, 2 * len(self._points), 1024)
+        for name in ('_points', '_volcano', '_time', '_valid'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def add(self, volcano: str, state_vectors, times=None):
+        """
+        Append state vectors of one volcano.
+
+        Parameters
+        ----------
+        volcano : str
+            Volcano name
+        state_vectors : np.ndarray
+            (9,) or (n, 9) values, or ``STATE_DTYPE`` records
+        times : timestamp or sequence of timestamps, optional
+            Time of each vector (POSIX seconds, datetime or datetime64);
+            taken from the records' 'time' field when omitted
+        """
+        values = np.atleast_2d(state_values(state_vectors))
+        valid = np.broadcast_to(state_valid(state_vectors), values.shape)
+        if times is None:
+            times = np.asarray(state_vectors)['time']
+        times = np.atleast_1d(np.asarray(times))
+        if times.dtype.kind in 'iuf':
+            seconds = times.astype(float)
+        else:
+            seconds = np.array([_to_epoch_seconds(t) for t in times], dtype=float)
+        if len(seconds) != len(values):
+            raise ValueError(f"Got {len(values)} state vectors but {len(seconds)} times")
+
+        n = len(values)
+        self._reserve(n)
+        rows = slice(self._size, self._size + n)
+        self._points[rows] = np.where(valid, values, 0.0) * self._scale
+        self._volcano[rows] = self._code(volcano)
+        self._time[rows] = seconds
+        self._valid[rows] = valid
+        self._size += n
+
+        if self.buffered > max(self.min_buffer, self.rebuild_fraction * self._tree_size):
+            self.rebuild()
+
+    def add_history(self, volcano: str, history: HistoryBuffer, n: Optional[int] = None):
+        """Append the last ``n`` samples of a framework's ``state_vector_history``."""
+        self.add(volcano, history.window(n), history.timestamps(n))
+
+    def _pattern_codes(self, valid: np.ndarray) -> np.ndarray:
+        """One integer per validity mask (bit j set where parameter j is valid)."""
+        return valid.astype(np.int64) @ (1 << np.arange(self.weights.size, dtype=np.int64))
+
+    def rebuild(self):
+        """Rebuild the per-pattern KD-trees over every stored vector (empties the buffer)."""
+        trees, scan = [], []
+        if self._size:
+            total = self.weights.sum()
+            codes = self._pattern_codes(self._valid[:self._size])
+            patterns, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+            bits = np.arange(self.weights.size)
+            for j, code in enumerate(patterns):
+                rows = np.flatnonzero(inverse == j)
+                columns = (int(code) >> bits) & 1 == 1
+                weight = self.weights[columns].sum()
+                if counts[j] < MIN_PATTERN_TREE or weight <= 0:
+                    scan.append(rows)
+                    continue
+                factor = np.sqrt(total / weight)
+                tree = cKDTree(self._points[rows][:, columns] * factor, leafsize=self.leafsize)
+                trees.append((columns, factor, rows, tree))
+        self._trees = trees
+        self._scan_rows = np.concatenate(scan) if scan else np.empty(0, dtype=np.intp)
+        self._tree_size = self._size
+
+    def set_eruptions(self, eruptions: Dict[str, Sequence[Timestamp]]):
+        """Eruption onset times per volcano, used to report what followed each analogue."""
+        self._eruptions = {
+            volcano: np.sort([_to_epoch_seconds(t) for t in onsets])
+            for volcano, onsets in eruptions.items()
+        }
+
+    def _time_to_eruption(self, codes: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """Seconds from each entry to its volcano's next eruption (inf if none)."""
+        result = np.full(times.shape, np.inf)
+        for volcano, onsets in self._eruptions.items():
+            code = self._codes.get(volcano)
+            if code is None or not len(onsets):
+                continue
+            mask = codes == code
+            nxt = np.searchsorted(onsets, times[mask], side='right')
+            found = nxt < len(onsets)
+            delta = np.full(nxt.shape, np.inf)
+            delta[found] = onsets[nxt[found]] - times[mask][found]
+            result[mask] = delta
+        return result
+
+    def _masked_candidates(self, points: np.ndarray, valid: np.ndarray, k: int,
+                           rows: np.ndarray):
+        """k nearest (distance, index) per query among ``rows``, over parameters valid in both."""
+        q = len(points)
+        total = self.weights.sum()
+        block = max(1, SCAN_BLOCK // q)
+        best_d = np.full((q, 0), np.inf)
+        best_i = np.full((q, 0), -1)
+        for start in range(0, len(rows), block):
+            chunk = rows[start:start + block]
+            stored, stored_valid = self._points[chunk], self._valid[chunk]
+            joint = valid[:, None, :] & stored_valid[None, :, :]
+            squared = np.where(joint, np.square(stored[None, :, :] - points[:, None, :]), 0.0)
+            weight = joint @ self.weights
+            with np.errstate(invalid='ignore', divide='ignore'):
+                d = np.sqrt(squared.sum(axis=-1) * total / weight)
+            d[weight == 0] = np.inf
+
+            d = np.concatenate([best_d, d], axis=1)
+            i = np.concatenate([best_i, np.broadcast_to(chunk, (q, len(chunk)))], axis=1)
+            if d.shape[1] > k:
+                keep = np.argpartition(d, k - 1, axis=1)[:, :k]
+                d, i = np.take_along_axis(d, keep, axis=1), np.take_along_axis(i, keep, axis=1)
+            best_d, best_i = d, i
+        return best_d, best_i
+
+    def _candidates(self, points: np.ndarray, valid: np.ndarray, k: int):
+        """
+        k nearest (distance, index) per query, sorted by distance.
+
+        Queries are grouped by validity pattern; each group searches the
+        trees of the stored patterns it covers and scans everything else
+        (rare or uncovered patterns and the buffer).
+        """
+        q = len(points)
+        distance = np.full((q, k), np.inf)
+        index = np.full((q, k), -1)
+        codes = self._pattern_codes(valid)
+        buffer = np.arange(self._tree_size, self._size)
+        for code in np.unique(codes):
+            group = np.flatnonzero(codes == code)
+            group_points, group_valid = points[group], valid[group]
+            parts_d, parts_i, scan = [], [], [self._scan_rows, buffer]
+            for columns, factor, rows, tree in self._trees:
+                if (columns & ~group_valid[0]).any():
+                    scan.append(rows)
+                    continue
+                kk = min(k, len(rows))
+                d, i = tree.query(group_points[:, columns] * factor, k=kk)
+                parts_d.append(np.reshape(d, (len(group), kk)))
+                parts_i.append(rows[np.reshape(i, (len(group), kk))])
+
+            scan_rows = np.concatenate(scan)
+            if len(scan_rows):
+                d, i = self._masked_candidates(group_points, group_valid, k, scan_rows)
+                parts_d.append(d)
+                parts_i.append(i)
+
+            d, i = np.concatenate(parts_d, axis=1), np.concatenate(parts_i, axis=1)
+            order = np.argsort(d, axis=1, kind='stable')[:, :k]
+            width = order.shape[1]
+            distance[group, :width] = np.take_along_axis(d, order, axis=1)
+            index[group, :width] = np.take_along_axis(i, order, axis=1)
+        return distance, index
+
+    def query(self, state_vectors, k: int = 10, volcano: Optional[str] = None,
+              time: Timestamp = None, exclude_window: float = 0.0) -> Dict:
+        """
+        The k most similar archived states for each query vector.
+
+        Parameters
+        ----------
+        state_vectors : np.ndarray
+            (9,) or (Q, 9) values, or ``STATE_DTYPE`` records
+        k : int
+            Analogues per query
+        volcano, time : optional
+            Query origin; with ``exclude_window`` (seconds) the volcano's
+            own states within that window of ``time`` are skipped, so a
+            volcano is not its own trivial analogue
+        exclude_window : float
+            Half-width of the excluded window in seconds
+
+        Returns
+        -------
+        dict
+            Arrays of shape (Q, k) (or (k,) for a single vector):
+            'distance', 'index', 'volcano' (names), 'time' (POSIX seconds)
+            and 'time_to_eruption' (seconds, inf if no later eruption is
+            known); slots beyond the index size hold inf / -1 / ''.
+        """
+        values = state_values(state_vectors)
+        single = values.ndim == 1
+        valid = np.atleast_2d(np.broadcast_to(state_valid(state_vectors), values.shape))
+        points = np.where(valid, np.atleast_2d(values), 0.0) * self._scale
+        q = len(points)
+
+        distance = np.full((q, k), np.inf)
+        index = np.full((q, k), -1)
+        if self._size:
+            exclude = None
+            if volcano is not None and exclude_window > 0 and volcano in self._codes:
+                exclude = (self._codes[volcano], _to_epoch_seconds(time))
+
+            fetch = k if exclude is None else 2 * k
+            while True:
+                d, i = self._candidates(points, valid, min(fetch, self._size))
+                if exclude is not None:
+                    skip = ((self._volcano[i] == exclude[0])
+                            & (np.abs(self._time[i] - exclude[1]) < exclude_window))
+                    d = np.where(skip, np.inf, d)
+                    order = np.argsort(d, axis=1, kind='stable')
+                    d, i = np.take_along_axis(d, order, axis=1), np.take_along_axis(i, order, axis=1)
+                    i = np.where(np.isinf(d), -1, i)
+                enough = np.isfinite(d[:, :k]).all() or fetch >= self._size
+                if enough:
+                    break
+                fetch *= 4
+            kk = min(k, d.shape[1])
+            distance[:, :kk], index[:, :kk] = d[:, :kk], i[:, :kk]
+
+        found = index >= 0
+        rows = np.maximum(index, 0)
+        codes = np.where(found, self._volcano[rows], -1) if self._size else index
+        times = np.where(found, self._time[rows], np.nan) if self._size else np.full(index.shape, np.nan)
+        names = np.array(self.volcanoes + [''], dtype=object)[codes]
+        result = {
+            'distance': distance,
+            'index': index,
+            'volcano': names,
+            'time': times,
+            'time_to_eruption': np.where(found, self._time_to_eruption(codes, times), np.inf),
+        }
+        if single:
+            result = {key: value[0] for key, value in result.items()}
+        return result
+
+    def save(self, path: str):
+        """Write the index to a directory (the buffer is merged first)."""
+        self.rebuild()
+        os.makedirs(path, exist_ok=True)
+        # Write beside and swap in: the arrays may be memory-mapped from
+        # these very files (an index reopened with ``load``)
+        for name in ARRAYS:
+            array = getattr(self, f"_{name}")
+            target = os.path.join(path, f"{name}.npy")
+            with open(f"{target}.tmp", 'wb') as f:
+                np.save(f, array[:self._size])
+            os.replace(f"{target}.tmp", target)
+        header = {
+            'weights': self.weights.tolist(),
+            'volcanoes': self.volcanoes,
+            'size': self._size,
+            'leafsize': self.leafsize,
+            'rebuild_fraction': self.rebuild_fraction,
+            'min_buffer': self.min_buffer,
+            'eruptions': {v: onsets.tolist() for v, onsets in self._eruptions.items()},
+        }
+        tmp_path = os.path.join(path, f"{INDEX_FILE}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, os.path.join(path, INDEX_FILE))
+
+    @classmethod
+    def load(cls, path: str) -> 'AnalogueIndex':
+        """Reopen a saved index; stored vectors are memory-mapped until new ones arrive."""
+        with open(os.path.join(path, INDEX_FILE), 'r') as f:
+            header = json.load(f)
+
+        index = cls(header['weights'], leafsize=header['leafsize'],
+                    rebuild_fraction=header['rebuild_fraction'],
+                    min_buffer=header['min_buffer'])
+        index._size = header['size']
+        for name in ARRAYS:
+            target = os.path.join(path, f"{name}.npy")
+            if os.path.exists(target):
+                setattr(index, f"_{name}", np.load(target, mmap_mode='r'))
+            else:
+                # Indexes saved before masks were stored hold complete vectors
+                setattr(index, f"_{name}", np.ones((index._size, index.weights.size), dtype=bool))
+        for volcano in header['volcanoes']:
+            index._code(volcano)
+        index._eruptions = {v: np.asarray(onsets) for v, onsets in header['eruptions'].items()}
+        index.rebuild()
+        return index
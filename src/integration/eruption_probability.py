@@ -2,12 +2,261 @@
 Eruption Probability
 integration/eruption_probability.py
 
-Module for eruption probability.
+Eruption probability model and its Monte Carlo ensemble.
+
+The probability is a logistic function of the weighted distance between the
+9-dimensional state vector and the nearest known pre-eruptive reference
+state of the volcano's type. ``EnsembleProbability`` propagates
+per-parameter measurement uncertainty through that model by scoring
+thousands of perturbed state vectors as one array, and reports the mean,
+a credible interval and threshold exceedance probabilities.
+
+Missing parameters (``valid`` False in ``STATE_DTYPE`` records, NaN in
+plain arrays) are left out of the distance: their weight is dropped and
+the remaining weights are rescaled to the same total. A vector with no
+valid parameter has no probability (NaN).
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+from typing import Dict, Optional
+
+import numpy as np
+
+from .state_vector import state_valid, state_values
+
+# Logistic shape of the probability model
+PROBABILITY_SLOPE = 2.5
+PROBABILITY_MIDPOINT = 0.3
+
+# Reference (pre-eruptive) state used when no volcano type is known
+REFERENCE_STATE = np.array([0.8, 0.7, 0.75, 0.7, 0.6, 0.5, 0.6, 0.25, 0.7])
+
+# Pre-eruptive reference states per volcano type (S, P, G, D, H, E, W, L, R);
+# a state close to any of them scores high
+REFERENCE_STATES = {
+    'general': [REFERENCE_STATE],
+    'stratovolcano': [
+        REFERENCE_STATE,                                      # open-vent pressurization
+        [0.85, 0.8, 0.5, 0.6, 0.5, 0.4, 0.5, 0.3, 0.6],       # sealed conduit (gas drop)
+    ],
+    'shield': [
+        [0.6, 0.4, 0.8, 0.85, 0.7, 0.5, 0.6, 0.2, 0.6],       # dike intrusion
+        [0.5, 0.3, 0.75, 0.7, 0.8, 0.4, 0.5, 0.2, 0.5],       # summit lava lake rise
+    ],
+    'caldera': [
+        [0.7, 0.6, 0.6, 0.8, 0.7, 0.7, 0.8, 0.25, 0.8],       # magmatic unrest
+        [0.6, 0.5, 0.5, 0.7, 0.8, 0.8, 0.85, 0.2, 0.85],      # hydrothermal pressurization
+    ],
+    'hydrothermal': [
+        [0.5, 0.6, 0.6, 0.4, 0.85, 0.8, 0.85, 0.2, 0.85],     # phreatic
+    ],
+}
+
+
+def reference_states(volcano_type: Optional[str] = None,
+                     overrides: Optional[Dict] = None) -> np.ndarray:
+    """
+    Reference states of a volcano type as an (R, 9) array.
+
+    ``overrides`` (e.g. the ``reference_states`` config key) maps types to
+    lists of states and takes precedence; unknown types fall back to
+    'general'.
+    """
+    table = {**REFERENCE_STATES, **(overrides or {})}
+    key = (volcano_type or 'general').lower()
+    states = np.atleast_2d(np.asarray(table.get(key, table['general']), dtype=float))
+    if states.shape[1] != REFERENCE_STATE.size:
+        raise ValueError(f"Reference states for '{key}' must have "
+                         f"{REFERENCE_STATE.size} components, got shape {states.shape}")
+    return states
+
+
+def masked_weights(weights: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Per-vector weights with missing parameters dropped, shape (..., 9).
+
+    The valid weights are rescaled to the full total so distances stay
+    comparable; rows without any valid parameter are NaN.
+    """
+    w = np.where(valid, weights, 0.0)
+    total = w.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return w * (weights.sum() / total)
+
+
+def weighted_distances(state_vectors: np.ndarray, weights: np.ndarray,
+                       references: np.ndarray) -> np.ndarray:
+    """
+    Weighted Euclidean distance to the nearest reference state.
+
+    Expands |x - r|^2_w = x^2 w - 2 x (w r) + r^2 w so all references are
+    scored with one matrix product. ``weights`` is (9,) or per vector
+    (..., 9), e.g. from ``masked_weights``.
+    """
+    x = np.asarray(state_vectors, dtype=float)
+    if weights.ndim == 1:
+        squared = (np.square(x) @ weights)[..., None] - 2.0 * (x @ (weights * references).T) \
+            + (np.square(references) @ weights)
+    else:
+        squared = (np.square(x) * weights).sum(axis=-1)[..., None] \
+            - 2.0 * ((x * weights) @ references.T) + weights @ np.square(references).T
+    return np.sqrt(np.maximum(squared.min(axis=-1), 0.0))
+
+
+def eruption_probabilities(state_vectors: np.ndarray, weights: np.ndarray,
+                           references: np.ndarray,
+                           slope: float = PROBABILITY_SLOPE,
+                           midpoint: float = PROBABILITY_MIDPOINT,
+                           valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Eruption probabilities for an array of state vectors.
+
+    Parameters
+    ----------
+    state_vectors : np.ndarray
+        Array of shape (..., 9), or a ``STATE_DTYPE`` record array
+    weights : np.ndarray
+        Parameter weights of shape (9,)
+    references : np.ndarray
+        Reference states of shape (R, 9)
+    slope, midpoint : float
+        Logistic shape
+    valid : np.ndarray, optional
+        Validity mask broadcastable to the vectors (default: the records'
+        ``valid`` field, or the finite entries of a plain array)
+
+    Returns
+    -------
+    np.ndarray
+        Probabilities with the leading shape of ``state_vectors`` (NaN
+        where no parameter is valid)
+    """
+    if valid is None:
+        valid = state_valid(state_vectors)
+    state_vectors = state_values(state_vectors)
+    if not np.all(valid):
+        state_vectors = np.where(valid, state_vectors, 0.0)
+        weights = masked_weights(weights, valid)
+
+    if len(references) == 1:
+        # Single reference: direct form, no expansion round-off
+        deviation = state_vectors - references[0]
+        if weights.ndim == 1:
+            distance = np.sqrt(np.square(deviation) @ weights)
+        else:
+            distance = np.sqrt((np.square(deviation) * weights).sum(axis=-1))
+    else:
+        distance = weighted_distances(state_vectors, weights, references)
+    return 1 / (1 + np.exp(slope * (distance - midpoint)))
+
+
+class EnsembleProbability:
+    """
+    Monte Carlo eruption probability with measurement uncertainty.
+
+    Each call draws ``n_samples`` perturbed state vectors per input vector
+    (Gaussian, per-parameter standard deviation, clipped to [0, 1]) into
+    one preallocated array and scores them in a single pass. Missing
+    parameters are not perturbed and carry no weight.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        Parameter weights of shape (9,)
+    references : np.ndarray
+        Reference states of shape (R, 9)
+    n_samples : int
+        Ensemble size
+    credible : float
+        Central credible interval mass (default 0.9)
+    thresholds : dict, optional
+        Level -> probability for exceedance probabilities
+    slope, midpoint : float
+        Logistic shape
+    seed : int, optional
+        Seed of the random generator
+    """
+
+    def __init__(self, weights: np.ndarray, references: np.ndarray,
+                 n_samples: int = 2000, credible: float = 0.9,
+                 thresholds: Optional[Dict[str, float]] = None,
+                 slope: float = PROBABILITY_SLOPE,
+                 midpoint: float = PROBABILITY_MIDPOINT,
+                 seed: Optional[int] = None):
+        if not 0.0 < credible < 1.0:
+            raise ValueError("credible must be between 0 and 1")
+        self.weights = np.asarray(weights, dtype=float)
+        self.references = np.atleast_2d(np.asarray(references, dtype=float))
+        self.n_samples = int(n_samples)
+        self.credible = credible
+        self.thresholds = dict(thresholds or {})
+        self.slope = slope
+        self.midpoint = midpoint
+        self.rng = np.random.default_rng(seed)
+        self._noise = np.empty((0, self.n_samples, self.weights.size))
+
+    def sample(self, state_vectors: np.ndarray, uncertainties: np.ndarray,
+               valid: Optional[np.ndarray] = None) -> np.ndarray:
+        """Perturbed state vectors of shape (V, n_samples, 9) (missing parameters fixed)."""
+        x = np.atleast_2d(np.asarray(state_vectors, dtype=float))
+        sigma = np.broadcast_to(np.nan_to_num(np.asarray(uncertainties, dtype=float)), x.shape)
+        if valid is not None:
+            x = np.where(valid, x, 0.0)
+            sigma = np.where(valid, sigma, 0.0)
+
+        if self._noise.shape[0] < len(x):
+            self._noise = np.empty((len(x), self.n_samples, x.shape[1]))
+        noise = self._noise[:len(x)]
+        self.rng.standard_normal(out=noise)
+
+        noise *= sigma[:, None, :]
+        noise += x[:, None, :]
+        return np.clip(noise, 0.0, 1.0, out=noise)
+
+    def evaluate(self, state_vectors: np.ndarray, uncertainties: np.ndarray) -> Dict:
+        """
+        Ensemble statistics of the eruption probability.
+
+        Parameters
+        ----------
+        state_vectors : np.ndarray
+            One (9,) state vector or a (V, 9) batch, e.g. every volcano
+        uncertainties : np.ndarray
+            Standard deviations, broadcastable to ``state_vectors``
+
+        Returns
+        -------
+        dict
+            'probability' (deterministic), 'mean', 'std', 'median',
+            'lower' and 'upper' (credible interval bounds) and
+            'exceedance' (level -> fraction of the ensemble above it);
+            floats for a single vector, (V,) arrays for a batch, NaN for
+            a vector without any valid parameter
+        """
+        x = state_values(state_vectors)
+        single = x.ndim == 1
+        x = np.atleast_2d(x)
+        valid = np.atleast_2d(state_valid(state_vectors))
+
+        draws = self.sample(x, uncertainties, valid)
+        p = eruption_probabilities(draws, self.weights, self.references,
+                                   self.slope, self.midpoint, valid=valid[:, None, :])
+        tail = (1.0 - self.credible) / 2.0
+        lower, median, upper = np.quantile(p, [tail, 0.5, 1.0 - tail], axis=1)
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+        result = {
+            'probability': eruption_probabilities(x, self.weights, self.references,
+                                                  self.slope, self.midpoint, valid=valid),
+            'mean': p.mean(axis=1),
+            'std': p.std(axis=1),
+            'median': median,
+            'lower': lower,
+            'upper': upper,
+            'exceedance': {level: np.where(valid.any(axis=1), (p > threshold).mean(axis=1), np.nan)
+                           for level, threshold in self.thresholds.items()},
+        }
+        if single:
+            result = {key: ({k: float(v[0]) for k, v in value.items()}
+                            if isinstance(value, dict) else float(value[0]))
+                      for key, value in result.items()}
+        result['credible'] = self.credible
+        return result
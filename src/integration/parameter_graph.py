@@ -0,0 +1,261 @@
+"""
+Parameter computation graph.
+
+Maps each of the nine parameter indices to its module in ``src/parameters``
+and the data inputs it declares. Every input is prepared once per
+evaluation and shared by all parameters that read it (the earthquake
+catalog feeds both S and P, the tremor series both S and L), and
+parameters whose inputs are ready run concurrently on an executor. With a
+``MemoCache`` attached, a parameter is only recomputed when the content of
+its input datasets or its config changed since it was last computed.
+"""
+
+import importlib
+import logging
+import time
+from concurrent.futures import Executor, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..utils.cache import MemoCache, content_key
+
+logger = logging.getLogger(__name__)
+
+def prepare_catalog(seismic_data):
+    """Earthquake catalog sorted by time, without duplicate or magnitude-less rows."""
+    catalog = seismic_data
+    if 'magnitude' in catalog.columns:
+        catalog = catalog[catalog['magnitude'].notna()]
+    if 'time' in catalog.columns:
+        catalog = catalog.drop_duplicates().sort_values('time', kind='mergesort')
+    return catalog.reset_index(drop=True)
+
+def prepare_time_series(data):
+    """Time series sorted by time with a fresh index."""
+    if 'time' in data.columns:
+        data = data.sort_values('time', kind='mergesort')
+    return data.reset_index(drop=True)
+
+# Shared inputs: name -> source dataset and the preparation applied once
+INPUT_SPECS: Dict[str, Dict[str, Any]] = {
+    'seismic_catalog': {'dataset': 'seismic', 'prepare': prepare_catalog},
+    'tremor': {'dataset': 'tremor', 'prepare': prepare_time_series},
+    'gps': {'dataset': 'gps', 'prepare': prepare_time_series},
+    'gas': {'dataset': 'gas', 'prepare': prepare_time_series},
+    'thermal': {'dataset': 'thermal', 'prepare': prepare_time_series},
+    'self_potential': {'dataset': 'self_potential', 'prepare': prepare_time_series},
+    'hydrology': {'dataset': 'hydrology', 'prepare': prepare_time_series},
+    'resistivity': {'dataset': 'resistivity', 'prepare': prepare_time_series},
+}
+
+# Parameters: module in src/parameters, function, keyword -> input, and the
+# inputs without which the parameter is not computed
+PARAMETER_SPECS: Dict[str, Dict[str, Any]] = {
+    'S': {'module': 'seismic_pulse', 'function': 'calculate_seismic_pulse',
+          'inputs': {'seismic_data': 'seismic_catalog', 'tremor_data': 'tremor'},
+          'required': ('seismic_catalog',)},
+    'P': {'module': 'pressure', 'function': 'calculate_pressure',
+          'inputs': {'seismic_data': 'seismic_catalog'},
+          'required': ('seismic_catalog',)},
+    'G': {'module': 'gas_flux', 'function': 'calculate_gas_flux',
+          'inputs': {'gas_data': 'gas'}, 'required': ('gas',)},
+    'D': {'module': 'deformation', 'function': 'calculate_deformation',
+          'inputs': {'gps_data': 'gps'}, 'required': ('gps',)},
+    'H': {'module': 'heat', 'function': 'calculate_heat',
+          'inputs': {'thermal_data': 'thermal'}, 'required': ('thermal',)},
+    'E': {'module': 'electrokinetic', 'function': 'calculate_electrokinetic',
+          'inputs': {'sp_data': 'self_potential'}, 'required': ('self_potential',)},
+    'W': {'module': 'water_flow', 'function': 'calculate_water_flow',
+          'inputs': {'hydro_data': 'hydrology'}, 'required': ('hydrology',)},
+    'L': {'module': 'lyapunov', 'function': 'calculate_lyapunov',
+          'inputs': {'time_series': 'tremor'}, 'required': ('tremor',)},
+    'R': {'module': 'resistivity', 'function': 'calculate_resistivity',
+          'inputs': {'resistivity_data': 'resistivity'}, 'required': ('resistivity',)},
+}
+
+def resolve_function(module: str, function: str) -> Optional[Callable]:
+    """Parameter function from ``src/parameters``, or None if not implemented."""
+    package = __package__.rsplit('.', 1)[0] + '.parameters'
+    try:
+        return getattr(importlib.import_module(f'{package}.{module}'), function, None)
+    except ImportError as e:
+        logger.warning(f"Could not import parameter module {module}: {e}")
+        return None
+
+def _timed(func: Callable, *args, **kwargs) -> Tuple[Any, float]:
+    """Result of ``func`` and its wall time in seconds."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def _prepare_input(prepare: Callable, data) -> Tuple[Any, float]:
+    """Prepare one shared input (module-level so it can run in a worker process)."""
+    return _timed(prepare, data)
+
+def _compute_parameter(module: str, function: str, kwargs: Dict,
+                       config: Optional[Dict]) -> Tuple[Any, float]:
+    """Evaluate one parameter function (module-level so it can run in a worker process)."""
+    func = resolve_function(module, function)
+    if func is None:
+        raise ImportError(f"{module}.{function} is not available")
+    if config is not None:
+        kwargs = {**kwargs, 'config': config}
+    return _timed(func, **kwargs)
+
+class ParameterGraph:
+    """
+    Dependency graph from monitoring datasets to the nine parameter indices.
+
+    Parameters
+    ----------
+    parameter_specs : dict, optional
+        Parameter name -> module, function, inputs and required inputs
+        (default ``PARAMETER_SPECS``)
+    input_specs : dict, optional
+        Input name -> source dataset and preparation (default ``INPUT_SPECS``)
+    config : dict, optional
+        Parameter name -> config passed to its function
+    max_workers : int, optional
+        Size of the thread pool created when no executor is given
+    executor : concurrent.futures.Executor, optional
+        Executor for inputs and parameters, e.g. a ProcessPoolExecutor for
+        CPU-bound indices; it is not shut down by the graph
+    cache : MemoCache, optional
+        Cache of parameter values keyed on the content of their inputs
+    """
+
+    def __init__(self, parameter_specs: Optional[Dict] = None,
+                 input_specs: Optional[Dict] = None,
+                 config: Optional[Dict] = None,
+                 max_workers: Optional[int] = None,
+                 executor: Optional[Executor] = None,
+                 cache: Optional[MemoCache] = None):
+        self.parameter_specs = parameter_specs or PARAMETER_SPECS
+        self.input_specs = input_specs or INPUT_SPECS
+        self.config = config or {}
+        self.max_workers = max_workers
+        self.executor = executor
+        self.cache = cache
+
+    def evaluate(self, data: Dict[str, Any]) -> Dict[str, Dict]:
+        """
+        Compute every parameter from the available datasets.
+
+        Parameters
+        ----------
+        data : dict
+            Dataset name -> DataFrame (or array), e.g. ``{'seismic': ...}``
+
+        Returns
+        -------
+        dict
+            'values' (parameter -> index or None), 'status' (parameter ->
+            'ok', 'cached', 'no_data', 'unavailable' or 'error'), 'timings'
+            (parameter -> seconds) and 'input_timings' (input -> seconds)
+        """
+        values: Dict[str, Optional[float]] = {name: None for name in self.parameter_specs}
+        status: Dict[str, str] = {}
+        timings: Dict[str, float] = {}
+        input_timings: Dict[str, float] = {}
+
+        # Decide up front which parameters can run and which inputs they need
+        runnable: Dict[str, Dict[str, str]] = {}
+        cache_keys: Dict[str, str] = {}
+        dataset_keys: Dict[str, str] = {}
+        for name, spec in self.parameter_specs.items():
+            if any(self._dataset(data, i) is None for i in spec['required']):
+                status[name] = 'no_data'
+                continue
+            if resolve_function(spec['module'], spec['function']) is None:
+                status[name] = 'unavailable'
+                continue
+            inputs = {key: i for key, i in spec['inputs'].items()
+                      if self._dataset(data, i) is not None}
+            if self.cache is not None:
+                key = self._cache_key(name, spec, inputs, data, dataset_keys)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    values[name] = cached
+                    status[name] = 'cached'
+                    continue
+                cache_keys[name] = key
+            runnable[name] = inputs
+        needed = {i for inputs in runnable.values() for i in inputs.values()}
+        if not runnable:
+            return {'values': values, 'status': status, 'timings': timings,
+                    'input_timings': input_timings}
+
+        executor = self.executor or ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            prepared: Dict[str, Any] = {}
+            pending: Dict[Future, Tuple[str, str]] = {}
+            for i in needed:
+                future = executor.submit(_prepare_input, self.input_specs[i]['prepare'],
+                                         self._dataset(data, i))
+                pending[future] = ('input', i)
+
+            while True:
+                # Launch every parameter whose inputs have all been prepared
+                for name in [n for n, inputs in runnable.items()
+                             if all(i in prepared for i in inputs.values())]:
+                    inputs = runnable.pop(name)
+                    spec = self.parameter_specs[name]
+                    kwargs = {key: prepared[i] for key, i in inputs.items()}
+                    future = executor.submit(_compute_parameter, spec['module'],
+                                             spec['function'], kwargs, self.config.get(name))
+                    pending[future] = ('parameter', name)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, name = pending.pop(future)
+                    try:
+                        result, elapsed = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to compute {kind} {name}: {e}")
+                        if kind == 'input':
+                            # Parameters that needed this input cannot run
+                            for p in [p for p, inputs in runnable.items()
+                                      if name in inputs.values()]:
+                                runnable.pop(p)
+                                status[p] = 'error'
+                        else:
+                            status[name] = 'error'
+                        continue
+
+                    if kind == 'input':
+                        prepared[name] = result
+                        input_timings[name] = elapsed
+                    else:
+                        value = float(result)
+                        values[name] = value
+                        status[name] = 'ok'
+                        timings[name] = elapsed
+                        if self.cache is not None and name in cache_keys:
+                            self.cache.put(cache_keys[name], value)
+        finally:
+            if self.executor is None:
+                executor.shutdown(wait=True)
+
+        return {'values': values, 'status': status, 'timings': timings,
+                'input_timings': input_timings}
+
+    def _cache_key(self, name: str, spec: Dict, inputs: Dict[str, str],
+                   data: Dict[str, Any], dataset_keys: Dict[str, str]) -> str:
+        """Hash of a parameter's function, config and input datasets."""
+        parts = []
+        for key in sorted(inputs):
+            dataset = self.input_specs[inputs[key]]['dataset']
+            if dataset not in dataset_keys:
+                # Datasets shared by several parameters are hashed once
+                dataset_keys[dataset] = content_key(data[dataset])
+            parts.append((key, dataset, dataset_keys[dataset]))
+        return content_key(name, spec['module'], spec['function'],
+                           self.config.get(name), parts)
+
+    def _dataset(self, data: Dict[str, Any], input_name: str):
+        """Source dataset of an input, or None if missing or empty."""
+        dataset = data.get(self.input_specs[input_name]['dataset'])
+        if dataset is None or len(dataset) == 0:
+            return None
+        return dataset
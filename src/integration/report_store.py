@@ -0,0 +1,444 @@
+"""
+Report Store
+integration/report_store.py
+
+Append-only archive of VUAP reports in a single SQLite database.
+
+Every report is one row: the indexed columns a query filters on (volcano,
+assessment time, probability, alert level) next to the full report as
+compact JSON. Reports are buffered and written ``batch_size`` at a time in
+one transaction, so a year of hourly cycles for dozens of volcanoes is one
+file instead of hundreds of thousands, and "all Etna reports in March" is
+an index range scan rather than a directory listing:
+
+    reports(id, volcano, time, probability, alert_level, report)
+    INDEX (volcano, time), INDEX (time)
+
+TXT and JSON files are rendered on demand with ``render`` / ``export``.
+``ReportWriter`` moves the writes to a background thread behind a bounded
+queue, so a monitoring cycle only pays for an enqueue.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .state_vector import HistoryBuffer
+from ..visualization.report_generator import json_default, render, report_filename
+
+logger = logging.getLogger(__name__)
+
+TimeLike = Union[str, datetime, float, None]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    volcano TEXT NOT NULL,
+    time REAL NOT NULL,
+    probability REAL,
+    alert_level TEXT,
+    report TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_volcano_time ON reports (volcano, time);
+CREATE INDEX IF NOT EXISTS reports_time ON reports (time);
+"""
+
+
+def _to_seconds(value: TimeLike) -> Optional[float]:
+    """POSIX seconds of an ISO string, datetime or number (None stays None)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class ReportStore:
+    """
+    Batched, append-only SQLite archive of VUAP reports.
+
+    Parameters
+    ----------
+    path : str
+        Database file (created with its directory if missing)
+    batch_size : int
+        Reports buffered in memory before they are written in one
+        transaction; ``flush`` and ``close`` write the rest
+
+    Notes
+    -----
+    One store may be shared by threads (e.g. the scheduler's report
+    callbacks); writes are serialized by a lock. The database runs in WAL
+    mode, so readers in other processes do not block the writer.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.path = path
+        self.batch_size = int(batch_size)
+        self._pending: List[Tuple] = []
+        self._lock = threading.RLock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def __enter__(self) -> 'ReportStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        """Reports buffered but not yet written."""
+        return len(self._pending)
+
+    @staticmethod
+    def _row(report: Dict) -> Tuple:
+        probability = report.get('eruption_probability')
+        return (
+            report['volcano'],
+            _to_seconds(report['timestamp']),
+            None if probability is None else float(probability),
+            report.get('alert_level'),
+            json.dumps(report, separators=(',', ':'), ensure_ascii=False, default=json_default),
+        )
+
+    def append(self, report: Dict):
+        """Queue one report; the batch is written once it is full."""
+        row = self._row(report)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def extend(self, reports: Iterable[Dict]):
+        """Queue many reports; full batches are written in one transaction."""
+        rows = [self._row(report) for report in reports]
+        with self._lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered reports in one transaction; returns how many."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                with self._connection:
+                    self._connection.executemany(
+                        'INSERT INTO reports (volcano, time, probability, alert_level, report) '
+                        'VALUES (?, ?, ?, ?, ?)', rows)
+            except sqlite3.Error:
+                self._pending = rows + self._pending
+                raise
+            return len(rows)
+
+    def close(self):
+        """Flush and close the database."""
+        with self._lock:
+            if self._connection is None:
+                return
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def _where(self, volcano: Optional[str], start: TimeLike,
+               end: TimeLike) -> Tuple[str, List]:
+        clauses: List[str] = []
+        args: List[Any] = []
+        if volcano is not None:
+            clauses.append('volcano = ?')
+            args.append(volcano)
+        if start is not None:
+            clauses.append('time >= ?')
+            args.append(_to_seconds(start))
+        if end is not None:
+            clauses.append('time < ?')
+            args.append(_to_seconds(end))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', args
+
+    def _select(self, columns: str, volcano: Optional[str], start: TimeLike,
+                end: TimeLike, limit: Optional[int] = None, latest: bool = False) -> List[Tuple]:
+        where, args = self._where(volcano, start, end)
+        order = ' ORDER BY time DESC, id DESC' if latest else ' ORDER BY time, id'
+        sql = f'SELECT {columns} FROM reports{where}{order}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            args.append(int(limit))
+        with self._lock:
+            self.flush()
+            return self._connection.execute(sql, args).fetchall()
+
+    def volcanoes(self) -> List[str]:
+        """Volcanoes with archived reports."""
+        with self._lock:
+            self.flush()
+            rows = self._connection.execute(
+                'SELECT DISTINCT volcano FROM reports ORDER BY volcano').fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, volcano: Optional[str] = None, start: TimeLike = None,
+              end: TimeLike = None) -> int:
+        """Number of archived reports matching the filters."""
+        return self._select('COUNT(*)', volcano, start, end)[0][0]
+
+    def query(self, volcano: Optional[str] = None, start: TimeLike = None,
+              end: TimeLike = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Archived reports in time order.
+
+        Parameters
+        ----------
+        volcano : str, optional
+            Only this volcano
+        start, end : str, datetime or float, optional
+            Assessment time window [start, end)
+        limit : int, optional
+            At most this many reports
+
+        Returns
+        -------
+        list of dict
+            The reports as generated
+        """
+        rows = self._select('report', volcano, start, end, limit)
+        return [json.loads(row[0]) for row in rows]
+
+    def latest(self, volcano: str) -> Optional[Dict]:
+        """Most recent report of a volcano."""
+        rows = self._select('report', volcano, None, None, limit=1, latest=True)
+        return json.loads(rows[0][0]) if rows else None
+
+    def probabilities(self, volcano: str, start: TimeLike = None,
+                      end: TimeLike = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Assessment times (POSIX seconds) and probabilities, read from the index only."""
+        rows = self._select('time, probability', volcano, start, end)
+        table = np.array(rows, dtype=float).reshape(-1, 2)
+        return table[:, 0], table[:, 1]
+
+    def ingest_json(self, paths: Iterable[str]) -> int:
+        """Archive existing per-report JSON files (e.g. ``archive/json_backups``)."""
+        count = 0
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.append(json.load(f))
+                count += 1
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping report {path}: {e}")
+        self.flush()
+        return count
+
+    def export(self, output_dir: str, fmt: str = 'txt', volcano: Optional[str] = None,
+               start: TimeLike = None, end: TimeLike = None) -> List[str]:
+        """Render matching reports to one file each; returns the paths."""
+        os.makedirs(output_dir, exist_ok=True)
+        paths = []
+        for report in self.query(volcano, start, end):
+            path = os.path.join(output_dir, report_filename(report, fmt))
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(render(report, fmt))
+            paths.append(path)
+        return paths
+
+
+def _latency_summary(latencies: HistoryBuffer) -> Dict[str, Optional[float]]:
+    window = latencies.window()
+    if not len(window):
+        return {'mean': None, 'p95': None, 'max': None}
+    return {
+        'mean': float(np.mean(window)),
+        'p95': float(np.percentile(window, 95)),
+        'max': float(np.max(window)),
+    }
+
+
+class ReportWriter:
+    """
+    Background writer that batches reports into a ``ReportStore``.
+
+    ``submit`` only enqueues; a worker thread collects up to ``batch_size``
+    reports, or whatever arrived within ``flush_interval`` seconds of the
+    first one, and writes them in one transaction. ``close`` (also on
+    leaving a ``with`` block) drains the queue, so reports submitted
+    before a ``KeyboardInterrupt`` are not lost.
+
+    Parameters
+    ----------
+    store : ReportStore
+        Destination archive
+    max_queue : int
+        Queue bound; ``submit`` blocks while the queue is full, so a
+        stalled disk slows the producer instead of exhausting memory
+    batch_size : int
+        Reports per transaction
+    flush_interval : float
+        Longest time (seconds) a report waits for its batch to fill
+    """
+
+    def __init__(self, store: ReportStore, max_queue: int = 1000,
+                 batch_size: int = 100, flush_interval: float = 5.0):
+        if max_queue < 1 or batch_size < 1:
+            raise ValueError("max_queue and batch_size must be at least 1")
+        self.store = store
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        # (kind, payload, enqueue time) with kind 'report', 'flush' or 'stop'
+        self._queue: 'queue.Queue[Tuple[str, Any, Optional[float]]]' = queue.Queue(
+            maxsize=max_queue)
+        self._closed = False
+        # Producers register under the lock but put() outside it; close()
+        # waits for registered producers, so nothing is queued after 'stop'
+        self._lock = threading.Condition(threading.Lock())
+        self._producers = 0
+
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.blocked = 0
+        self.max_queue_depth = 0
+        self.write_latencies = HistoryBuffer(1000)   # seconds per batch
+        self.queue_latencies = HistoryBuffer(1000)   # seconds from submit to written
+
+        self._thread = threading.Thread(target=self._run, name='report-writer', daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'ReportWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def queue_depth(self) -> int:
+        """Reports (and control messages) waiting in the queue."""
+        return self._queue.qsize()
+
+    def _enqueue(self, item: Tuple[str, Any, Optional[float]]) -> bool:
+        """Put ``item`` on the queue without holding the lock; False once closed."""
+        with self._lock:
+            if self._closed:
+                return False
+            self._producers += 1
+        try:
+            self._queue.put(item)
+        finally:
+            with self._lock:
+                self._producers -= 1
+                if not self._producers:
+                    self._lock.notify_all()
+        return True
+
+    def submit(self, report: Dict):
+        """Queue a report for writing (blocks only while the queue is full)."""
+        blocked = self._queue.full()
+        if not self._enqueue(('report', report, time.perf_counter())):
+            raise RuntimeError("ReportWriter is closed")
+        with self._lock:
+            self.submitted += 1
+            self.blocked += int(blocked)
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything submitted so far is written.
+
+        Returns False if ``timeout`` passed first; returns at once once the
+        writer is closed (``close`` has already drained the queue).
+        """
+        done = threading.Event()
+        if not self._enqueue(('flush', done, None)):
+            return True
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Write the remaining reports and stop the worker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Producers already past the closed check finish their put first
+            while self._producers:
+                self._lock.wait()
+        self._queue.put(('stop', None, None))
+        self._thread.join(timeout)
+        self.store.flush()
+
+    def _write(self, batch: List):
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            self.store.extend(report for report, _ in batch)
+            self.store.flush()
+        except Exception as e:
+            # Rows stay buffered in the store and are retried with the next batch
+            self.errors += 1
+            logger.error(f"Failed to write {len(batch)} reports: {e}")
+            return
+        finished = time.perf_counter()
+        self.write_latencies.append(finished - started)
+        for _, submitted_at in batch:
+            self.queue_latencies.append(finished - submitted_at)
+        self.written += len(batch)
+        self.batches += 1
+
+    def _run(self):
+        batch, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+            try:
+                kind, payload, submitted_at = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind = 'timeout'
+
+            if kind == 'report':
+                batch.append((payload, submitted_at))
+                if deadline is None:
+                    deadline = time.perf_counter() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            self._write(batch)
+            batch, deadline = [], None
+
+            if kind == 'flush':
+                payload.set()
+            elif kind == 'stop':
+                return
+
+    def metrics(self) -> Dict:
+        """Queue depth, throughput counters and write/queue latencies (seconds)."""
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'submitted': self.submitted,
+            'written': self.written,
+            'batches': self.batches,
+            'errors': self.errors,
+            'blocked': self.blocked,
+            'write_latency': _latency_summary(self.write_latencies),
+            'queue_latency': _latency_summary(self.queue_latencies),
+        }
@@ -0,0 +1,316 @@
+"""
+Concurrent multi-volcano monitoring scheduler.
+
+Runs one asyncio task per volcano listed in ``config/volcano_list.yaml``,
+each on its own interval. Parameter computation is offloaded to a bounded
+process pool; report generation and bookkeeping stay on the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .report_store import ReportStore, ReportWriter
+from .state_vector import HistoryBuffer
+from .vuap import VolcanicMonitoringFramework
+from ..visualization.report_generator import format_probability
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOLCANO_LIST = os.path.join('config', 'volcano_list.yaml')
+
+# Frameworks kept per worker so their parameter caches persist across cycles
+_frameworks: Dict[Tuple[str, Optional[str]], VolcanicMonitoringFramework] = {}
+
+
+def load_volcano_list(path: str = DEFAULT_VOLCANO_LIST) -> Dict[str, Dict]:
+    """
+    Load the monitored volcanoes from a volcano list file.
+
+    Parameters
+    ----------
+    path : str
+        YAML file with a top-level ``volcanoes`` mapping
+
+    Returns
+    -------
+    dict
+        Volcano name -> metadata
+    """
+    import yaml
+
+    with open(path, 'r') as f:
+        content = yaml.safe_load(f) or {}
+
+    return dict(content.get('volcanoes') or {})
+
+
+def compute_parameters(volcano_name: str, config_path: Optional[str] = None,
+                       data_sources: Optional[Dict] = None) -> Dict[str, Dict]:
+    """
+    Compute the nine parameter indices for one volcano.
+
+    Module-level so it can be shipped to worker processes. Returns the
+    'values', 'status' and 'timings' of the parameter graph and the
+    worker's parameter 'cache' statistics.
+    """
+    key = (volcano_name, config_path)
+    framework = _frameworks.get(key)
+    if framework is None:
+        framework = _frameworks[key] = VolcanicMonitoringFramework(volcano_name, config_path)
+    if data_sources:
+        framework.load_data(**data_sources)
+    framework.calculate_parameters()
+    return {
+        'values': {k: None if v is None else float(v) for k, v in framework.parameters.items()},
+        'status': framework.parameter_status,
+        'timings': framework.parameter_timings,
+        'cache': framework.parameter_cache_stats,
+    }
+
+
+class CycleStats:
+    """Per-volcano cycle bookkeeping: latencies, overruns and failures."""
+
+    def __init__(self, capacity: int = 1000):
+        self.latencies = HistoryBuffer(capacity)
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.failures = 0
+
+    def record(self, latency: float):
+        self.cycles += 1
+        self.latencies.append(latency)
+
+    def summary(self) -> Dict[str, float]:
+        """Latency statistics (seconds) over the retained cycles."""
+        latencies = self.latencies.window()
+        summary: Dict[str, float] = {
+            'cycles': self.cycles,
+            'overruns': self.overruns,
+            'skipped_ticks': self.skipped_ticks,
+            'failures': self.failures,
+        }
+        if len(latencies):
+            summary.update({
+                'last': float(latencies[-1]),
+                'mean': float(np.mean(latencies)),
+                'p95': float(np.percentile(latencies, 95)),
+                'max': float(np.max(latencies)),
+            })
+        return summary
+
+
+class MonitoringScheduler:
+    """
+    Run real-time monitoring for many volcanoes in one process.
+
+    Parameters
+    ----------
+    volcanoes : dict
+        Volcano name -> metadata (see ``load_volcano_list``). A
+        ``monitoring_interval`` entry overrides ``default_interval``.
+    default_interval : float
+        Seconds between cycles for volcanoes without their own interval
+    config_path : str, optional
+        Framework configuration file shared by all volcanoes
+    max_workers : int, optional
+        Size of the parameter computation process pool
+    executor : Executor, optional
+        Use this executor instead of creating a process pool
+    on_report : callable, optional
+        Called as ``on_report(framework, report)`` after each cycle;
+        defaults to queueing the report for a background ``ReportWriter``
+        on ``report_store``
+    analogue_index : AnalogueIndex, optional
+        Index of historical state vectors shared by all volcanoes; each
+        report then lists its nearest analogues and adds its own state
+    report_store : ReportStore, optional
+        Archive shared by all volcanoes (default: the one configured by
+        the frameworks' ``report_store`` key, opened on the first report)
+
+    Notes
+    -----
+    Each volcano has at most one cycle in flight. When a cycle overruns
+    its interval the missed ticks are skipped rather than queued, so a slow
+    volcano cannot build a backlog or starve the others; overruns are
+    counted in ``latency_stats()``.
+    """
+
+    def __init__(self, volcanoes: Dict[str, Dict],
+                 default_interval: float = 3600,
+                 config_path: Optional[str] = None,
+                 max_workers: Optional[int] = None,
+                 executor: Optional[Executor] = None,
+                 on_report: Optional[Callable] = None,
+                 analogue_index=None,
+                 report_store: Optional[ReportStore] = None):
+        self.default_interval = default_interval
+        self.config_path = config_path
+        self.max_workers = max_workers or min(len(volcanoes), os.cpu_count() or 1) or 1
+        self.on_report = on_report or self._save_report
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._stop_event: Optional[asyncio.Event] = None
+        self.report_store = report_store
+        self.report_writer: Optional[ReportWriter] = None
+        self._store_lock = threading.Lock()
+
+        self.frameworks = {
+            name: VolcanicMonitoringFramework(name, config_path,
+                                              volcano_type=(meta or {}).get('type'))
+            for name, meta in volcanoes.items()
+        }
+        self.analogue_index = analogue_index
+        for framework in self.frameworks.values():
+            framework.analogue_index = analogue_index
+        self.intervals = {
+            name: float((meta or {}).get('monitoring_interval', default_interval))
+            for name, meta in volcanoes.items()
+        }
+        self.data_sources = {
+            name: dict((meta or {}).get('data_sources', {}))
+            for name, meta in volcanoes.items()
+        }
+        self.stats = {name: CycleStats() for name in volcanoes}
+
+    @classmethod
+    def from_volcano_list(cls, path: str = DEFAULT_VOLCANO_LIST, **kwargs):
+        """Build a scheduler for every volcano in a volcano list file."""
+        return cls(load_volcano_list(path), **kwargs)
+
+    def _save_report(self, framework: VolcanicMonitoringFramework, report: Dict):
+        # One archive and one writer (hence one batch) for all volcanoes
+        with self._store_lock:
+            if self.report_writer is None or self.report_writer.closed:
+                if self.report_store is None:
+                    self.report_store = framework.open_report_store()
+                config = framework.config
+                self.report_writer = ReportWriter(
+                    self.report_store,
+                    max_queue=config['report_queue_size'],
+                    batch_size=config['report_batch_size'],
+                    flush_interval=config['report_flush_interval'],
+                )
+        framework.report_writer = self.report_writer
+        framework._save_report(report)
+
+    def report_writer_stats(self) -> Optional[Dict]:
+        """Queue depth and write latency metrics of the report writer."""
+        return None if self.report_writer is None else self.report_writer.metrics()
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-volcano cycle latency statistics."""
+        return {name: stats.summary() for name, stats in self.stats.items()}
+
+    def stop(self):
+        """Ask all volcano loops to finish after their current cycle."""
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def _run_cycle(self, name: str):
+        loop = asyncio.get_running_loop()
+        framework = self.frameworks[name]
+
+        result = await loop.run_in_executor(
+            self._executor, compute_parameters,
+            name, self.config_path, self.data_sources[name],
+        )
+        framework.parameters = result['values']
+        framework.parameter_status = result['status']
+        framework.parameter_timings = result['timings']
+        framework.parameter_cache_stats = result['cache']
+        report = framework.generate_vuap_report()
+
+        # Report persistence is I/O bound; keep it off the event loop
+        await loop.run_in_executor(None, self.on_report, framework, report)
+        return report
+
+    async def _volcano_loop(self, name: str, max_cycles: Optional[int],
+                            stop_event: asyncio.Event):
+        loop = asyncio.get_running_loop()
+        interval = self.intervals[name]
+        stats = self.stats[name]
+        next_run = loop.time()
+
+        while not stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                report = await self._run_cycle(name)
+                logger.info(f"🌋 {name}: {report['alert_level']} "
+                            f"(probability: {format_probability(report['eruption_probability'])})")
+            except Exception as e:
+                stats.failures += 1
+                logger.error(f"❌ Monitoring cycle failed for {name}: {e}")
+            stats.record(time.perf_counter() - started)
+
+            if max_cycles is not None and stats.cycles >= max_cycles:
+                break
+
+            next_run += interval
+            now = loop.time()
+            if now > next_run:
+                missed = int((now - next_run) // interval) + 1
+                stats.overruns += 1
+                stats.skipped_ticks += missed
+                next_run += missed * interval
+                logger.warning(f"⏱️ {name}: cycle overran its {interval:.0f}s interval, "
+                               f"skipping {missed} tick(s)")
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), next_run - loop.time())
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, max_cycles: Optional[int] = None):
+        """
+        Monitor all volcanoes concurrently until ``stop()`` is called.
+
+        Parameters
+        ----------
+        max_cycles : int, optional
+            Stop each volcano after this many cycles (useful for tests and
+            one-shot sweeps)
+        """
+        stop_event = self._stop_event = asyncio.Event()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        logger.info(f"📡 Monitoring {len(self.frameworks)} volcanoes "
+                    f"with {self.max_workers} workers")
+        try:
+            await asyncio.gather(*(
+                self._volcano_loop(name, max_cycles, stop_event) for name in self.frameworks
+            ))
+        finally:
+            if self._owns_executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            if self.report_writer is not None:
+                self.report_writer.close()
+                for framework in self.frameworks.values():
+                    if framework.report_writer is self.report_writer:
+                        framework.report_writer = None
+            if self.report_store is not None:
+                self.report_store.flush()
+
+    def run_forever(self, max_cycles: Optional[int] = None):
+        """Blocking entry point; stops cleanly on KeyboardInterrupt."""
+        started_at = datetime.now()
+        try:
+            asyncio.run(self.run(max_cycles))
+        except KeyboardInterrupt:
+            logger.info("⏹️ Monitoring stopped by user")
+
+        logger.info(f"✅ Monitoring ran from {started_at:%Y-%m-%d %H:%M:%S} "
+                    f"to {datetime.now():%Y-%m-%d %H:%M:%S}")
+        return self.latency_stats()
@@ -2,12 +2,335 @@
 State Vector
 integration/state_vector.py
 
-Module for state vector.
+Storage for the 9-dimensional state vector and its history.
+
+A state vector is one record of ``STATE_DTYPE``: the nine values, a
+validity mask for parameters that could not be computed, the age of each
+parameter relative to the vector's time and per-parameter uncertainties
+(161 bytes per vector). Collections are record arrays of the same dtype,
+so millions of historical vectors stay compact and their ``values`` field
+is handed to the scoring code as a view, without conversion.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import numpy as np
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+Timestamp = Union[float, datetime, np.datetime64, None]
+
+# Order of the nine parameter indices in every state vector
+PARAMETER_NAMES = ['S', 'P', 'G', 'D', 'H', 'E', 'W', 'L', 'R']
+
+STATE_DTYPE = np.dtype([
+    ('time', np.float64),                               # POSIX seconds
+    ('values', np.float64, (len(PARAMETER_NAMES),)),    # 0.0 where not valid
+    ('valid', np.bool_, (len(PARAMETER_NAMES),)),
+    ('age', np.float32, (len(PARAMETER_NAMES),)),       # seconds before 'time'
+    ('uncertainty', np.float32, (len(PARAMETER_NAMES),)),
+])
+
+
+def _to_epoch_seconds(timestamp: Timestamp) -> float:
+    """Convert a timestamp to POSIX seconds (``None`` means now)."""
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, np.datetime64):
+        return float(timestamp.astype('datetime64[ns]').astype(np.int64)) / 1e9
+    return float(timestamp)
+
+
+class HistoryBuffer:
+    """
+    Fixed-capacity, array-backed ring buffer of timestamped samples.
+
+    Every sample is written twice, at ``head`` and ``head + capacity``, so
+    the most recent ``n`` samples are always one contiguous slice of the
+    backing array. Appends are O(1) and ``window(n)`` returns a view
+    without copying, which lets trend computations read the recent window
+    directly.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of samples retained; older samples are overwritten
+    width : int, optional
+        Number of values per sample (e.g. 9 for state vectors). ``None``
+        stores scalars.
+    dtype : numpy dtype
+        Value dtype (default float64); ``STATE_DTYPE`` keeps whole state
+        vector records
+    """
+
+    def __init__(self, capacity: int, width: Optional[int] = None, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+
+        self.capacity = int(capacity)
+        self.width = width
+        shape = (2 * self.capacity,) if width is None else (2 * self.capacity, width)
+        self._values = np.zeros(shape, dtype=dtype)
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._head = 0
+        self._size = 0
+
+    def append(self, value, timestamp: Timestamp = None):
+        """Append one sample, overwriting the oldest one when full."""
+        ts = _to_epoch_seconds(timestamp)
+        head = self._head
+        self._values[head] = value
+        self._values[head + self.capacity] = value
+        self._timestamps[head] = ts
+        self._timestamps[head + self.capacity] = ts
+
+        self._head = (head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        """Drop all samples (the backing arrays are kept)."""
+        self._head = 0
+        self._size = 0
+
+    def _window_slice(self, n: Optional[int]) -> slice:
+        n = self._size if n is None else max(0, min(int(n), self._size))
+        end = self._head + self.capacity
+        return slice(end - n, end)
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the last ``n`` samples, oldest first."""
+        view = self._values[self._window_slice(n)]
+        view.flags.writeable = False
+        return view
+
+    def timestamps(self, n: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the last ``n`` timestamps (POSIX seconds)."""
+        view = self._timestamps[self._window_slice(n)]
+        view.flags.writeable = False
+        return view
+
+    def since(self, seconds: float, now: Timestamp = None) -> np.ndarray:
+        """View of the samples recorded within the last ``seconds``."""
+        cutoff = _to_epoch_seconds(now) - seconds
+        ts = self.timestamps()
+        start = int(np.searchsorted(ts, cutoff, side='left'))
+        return self.window(self._size - start)
+
+    def rate_of_change(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        Least-squares slope per second over the last ``n`` samples.
+
+        For ``STATE_DTYPE`` buffers the slope of each parameter is fitted
+        to its ``values`` where ``valid`` is set, skipping missing entries.
+
+        Returns
+        -------
+        np.ndarray or float
+            One slope per value column (a scalar for scalar buffers);
+            zero when fewer than two samples or no time spread is available
+        """
+        values = self.window(n)
+        ts = self.timestamps(n)
+        if values.dtype.names is not None:
+            return self._masked_rate_of_change(state_values(values), state_valid(values), ts)
+
+        zeros = np.zeros(values.shape[1:])
+        if len(ts) < 2:
+            return zeros
+
+        dt = ts - ts.mean()
+        denom = np.dot(dt, dt)
+        if denom == 0:
+            return zeros
+        return np.tensordot(dt, values - values.mean(axis=0), axes=(0, 0)) / denom
+
+    @staticmethod
+    def _masked_rate_of_change(values: np.ndarray, valid: np.ndarray,
+                               ts: np.ndarray) -> np.ndarray:
+        """Per-column least-squares slope using only the valid samples."""
+        weights = valid.astype(np.float64)
+        count = weights.sum(axis=0)
+        safe_count = np.maximum(count, 1.0)
+        t_mean = weights.T @ ts / safe_count
+        v_mean = (weights * values).sum(axis=0) / safe_count
+
+        dt = (ts[:, None] - t_mean) * weights
+        denom = (dt * dt).sum(axis=0)
+        numer = (dt * (values - v_mean)).sum(axis=0)
+        fitted = (count >= 2) & (denom > 0)
+        return np.where(fitted, numer / np.where(fitted, denom, 1.0), 0.0)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Read-only view of all retained samples, oldest first."""
+        return self.window()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(self.window())
+
+    def __getitem__(self, index):
+        return self.window()[index]
+
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__name__}(capacity={self.capacity}, "
+                f"width={self.width}, size={self._size})")
+
+
+def state_array(size: int = 0) -> np.recarray:
+    """Record array of ``size`` empty state vectors (nothing valid)."""
+    return np.zeros(size, dtype=STATE_DTYPE).view(np.recarray)
+
+
+def state_valid(state_vectors) -> np.ndarray:
+    """
+    Validity mask of state vectors, shape (..., 9).
+
+    Record arrays and ``StateVector`` objects carry their ``valid`` field;
+    in plain arrays a NaN marks a missing parameter.
+    """
+    if isinstance(state_vectors, StateVector):
+        return state_vectors.valid
+    array = np.asarray(state_vectors)
+    if array.dtype.names is not None:
+        return array['valid']
+    return np.isfinite(array)
+
+
+def state_values(state_vectors) -> np.ndarray:
+    """
+    Values of state vectors as a float array of shape (..., 9).
+
+    Record arrays and ``StateVector`` objects give a view of their
+    ``values`` field; plain arrays are passed through.
+    """
+    if isinstance(state_vectors, StateVector):
+        return state_vectors.values
+    array = np.asarray(state_vectors)
+    if array.dtype.names is not None:
+        return array['values']
+    return array.astype(np.float64, copy=False)
+
+
+class StateVector:
+    """
+    One 9-dimensional state vector with validity, timestamps and uncertainty.
+
+    Wraps a single ``STATE_DTYPE`` record, either its own or a row of a
+    record array (``from_record``), in which case changes write through.
+
+    Parameters
+    ----------
+    values : sequence of float or None, optional
+        Nine parameter values; None (or NaN) marks a missing parameter
+    time : timestamp, optional
+        Time of the vector (default now)
+    parameter_times : sequence of timestamps, optional
+        Time each parameter was observed (default ``time``)
+    uncertainty : sequence of float, optional
+        Standard deviation of each parameter (default 0)
+    """
+
+    __slots__ = ('_record',)
+
+    def __init__(self, values: Optional[Sequence[Optional[float]]] = None,
+                 time: Timestamp = None,
+                 parameter_times: Optional[Sequence[Timestamp]] = None,
+                 uncertainty: Optional[Sequence[float]] = None):
+        record = np.zeros((), dtype=STATE_DTYPE)
+        record['time'] = _to_epoch_seconds(time)
+        if values is not None:
+            array = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            valid = np.isfinite(array)
+            record['values'] = np.where(valid, array, 0.0)
+            record['valid'] = valid
+        if parameter_times is not None:
+            times = [record['time'] if t is None else _to_epoch_seconds(t)
+                     for t in parameter_times]
+            record['age'] = record['time'] - np.asarray(times, dtype=np.float64)
+        if uncertainty is not None:
+            record['uncertainty'] = uncertainty
+        self._record = record
+
+    @classmethod
+    def from_parameters(cls, parameters: Dict[str, Optional[float]], time: Timestamp = None,
+                        parameter_times: Optional[Dict[str, Timestamp]] = None,
+                        uncertainties: Optional[Dict[str, float]] = None) -> 'StateVector':
+        """State vector from parameter name -> value dicts (missing names are invalid)."""
+        parameter_times = parameter_times or {}
+        uncertainties = uncertainties or {}
+        return cls([parameters.get(name) for name in PARAMETER_NAMES], time,
+                   [parameter_times.get(name) for name in PARAMETER_NAMES],
+                   [uncertainties.get(name, 0.0) for name in PARAMETER_NAMES])
+
+    @classmethod
+    def from_record(cls, records: np.ndarray, index: Optional[int] = None) -> 'StateVector':
+        """View of one record (``records[index]``, or a 0-d record) as a StateVector."""
+        state = cls.__new__(cls)
+        records = np.asarray(records)
+        state._record = records if index is None else records[index, ...]
+        return state
+
+    @staticmethod
+    def stack(states: Iterable['StateVector']) -> np.recarray:
+        """Record array holding copies of ``states``."""
+        return np.array([s.record for s in states], dtype=STATE_DTYPE).view(np.recarray)
+
+    @property
+    def record(self) -> np.ndarray:
+        """The underlying 0-d ``STATE_DTYPE`` record."""
+        return self._record
+
+    @property
+    def time(self) -> float:
+        return float(self._record['time'])
+
+    @property
+    def values(self) -> np.ndarray:
+        """Values (0.0 where not valid)."""
+        return self._record['values']
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self._record['valid']
+
+    @property
+    def uncertainty(self) -> np.ndarray:
+        return self._record['uncertainty']
+
+    @property
+    def parameter_times(self) -> np.ndarray:
+        """Observation time of each parameter (POSIX seconds)."""
+        return self.time - self._record['age'].astype(np.float64)
+
+    @property
+    def missing(self) -> List[str]:
+        """Names of the parameters that are not valid."""
+        return [name for name, ok in zip(PARAMETER_NAMES, self.valid) if not ok]
+
+    def filled(self, fill_value: float = 0.0) -> np.ndarray:
+        """Copy of the values with ``fill_value`` for missing parameters."""
+        return np.where(self.valid, self.values, fill_value)
+
+    def masked(self) -> np.ma.MaskedArray:
+        """Values as a masked array (missing parameters masked)."""
+        return np.ma.MaskedArray(self.values, mask=~self.valid)
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        """Parameter name -> value (None where not valid)."""
+        return {name: float(v) if ok else None
+                for name, v, ok in zip(PARAMETER_NAMES, self.values, self.valid)}
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.values, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(PARAMETER_NAMES)
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    def __repr__(self) -> str:
+        values = ', '.join(f"{n}={v:.3f}" if ok else f"{n}=n/a"
+                           for n, v, ok in zip(PARAMETER_NAMES, self.values, self.valid))
+        return f"{self.__class__.__name__}({values})"
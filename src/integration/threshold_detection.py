@@ -2,12 +2,254 @@
 Threshold Detection
 integration/threshold_detection.py
 
-Module for threshold detection.
+Threshold crossings and alert episodes for eruption probability series.
+
+A level is entered when the probability rises above its threshold and left
+only when it falls below the threshold minus ``hysteresis``; a level change
+takes effect once it has held for ``min_dwell`` consecutive samples, so
+noise around a threshold does not make alerts flap. Consecutive samples at
+warning level or above form one alert episode with its onset, peak and
+duration. ``detect_thresholds`` processes a whole series in one vectorized
+pass; ``ThresholdDetector.update`` gives identical results one sample at a
+time with O(1) state.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+LEVELS = ('normal', 'warning', 'critical', 'alert')
+DEFAULT_THRESHOLDS = {'warning': 0.5, 'critical': 0.7, 'alert': 0.85}
+
+
+def _threshold_arrays(thresholds: Optional[Dict[str, float]],
+                      hysteresis: float):
+    """On and off levels for warning, critical and alert, in that order."""
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    on = np.array([float(thresholds[level]) for level in LEVELS[1:]])
+    if np.any(np.diff(on) <= 0):
+        raise ValueError(f"Thresholds must increase from warning to alert, got {on.tolist()}")
+    if hysteresis < 0:
+        raise ValueError("hysteresis must be non-negative")
+    return on, on - hysteresis
+
+
+def hysteresis_levels(probabilities: np.ndarray, on: np.ndarray, off: np.ndarray,
+                      initial: int = 0) -> np.ndarray:
+    """
+    Level index (0 = normal ... 3 = alert) with per-threshold hysteresis.
+
+    Each threshold switches on above ``on`` and off below ``off``; the
+    last decisive sample is forward-filled, NaN samples hold the state.
+    Because the thresholds are nested, the level is the number of
+    thresholds switched on.
+    """
+    p = np.asarray(probabilities, dtype=float)[None, :]
+    decisive = np.full((len(on), p.shape[1]), -1, dtype=np.int8)
+    decisive[p < off[:, None]] = 0
+    decisive[p > on[:, None]] = 1
+    index = np.where(decisive >= 0, np.arange(p.shape[1]), -1)
+    last = np.maximum.accumulate(index, axis=1)
+    rows = np.arange(len(on))[:, None]
+    initial_state = (np.arange(len(on)) < initial).astype(np.int8)[:, None]
+    state = np.where(last >= 0, decisive[rows, np.maximum(last, 0)], initial_state)
+    return state.sum(axis=0).astype(np.int8)
+
+
+def dwell_filter(levels: np.ndarray, min_dwell: int, initial: int = 0) -> np.ndarray:
+    """
+    Levels that take effect only after holding for ``min_dwell`` samples.
+
+    A sample confirms its level once the run of equal levels ending at it
+    is ``min_dwell`` long; every sample carries the last confirmed level.
+    """
+    levels = np.asarray(levels)
+    n = levels.size
+    if n == 0 or min_dwell <= 1:
+        return levels.copy()
+
+    samples = np.arange(n)
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    change[1:] = levels[1:] != levels[:-1]
+    run_start = np.maximum.accumulate(np.where(change, samples, 0))
+    confirmed = samples - run_start + 1 >= min_dwell
+    last = np.maximum.accumulate(np.where(confirmed, samples, -1))
+    return np.where(last >= 0, levels[np.maximum(last, 0)], initial).astype(levels.dtype)
+
+
+def _crossing(index: int, time, level_from: int, level_to: int,
+              probability: float) -> Dict:
+    return {
+        'index': int(index),
+        'time': time,
+        'from': LEVELS[level_from],
+        'to': LEVELS[level_to],
+        'direction': 'up' if level_to > level_from else 'down',
+        'probability': float(probability),
+    }
+
+
+def _episode(onset_index: int, onset_time, peak_index: int, peak_time,
+             peak_level: int, peak_probability: float,
+             end_index: Optional[int], end_time) -> Dict:
+    return {
+        'onset_index': int(onset_index),
+        'onset': onset_time,
+        'end_index': None if end_index is None else int(end_index),
+        'end': end_time,
+        'duration': None if end_index is None else end_time - onset_time,
+        'samples': None if end_index is None else int(end_index - onset_index),
+        'peak_level': LEVELS[peak_level],
+        'peak_probability': float(peak_probability),
+        'peak_index': int(peak_index),
+        'peak_time': peak_time,
+    }
+
+
+def detect_thresholds(probabilities: np.ndarray, times: Optional[Sequence] = None,
+                      thresholds: Optional[Dict[str, float]] = None,
+                      hysteresis: float = 0.05, min_dwell: int = 1) -> Dict:
+    """
+    Find all threshold crossings and alert episodes in a probability series.
+
+    Parameters
+    ----------
+    probabilities : np.ndarray
+        Eruption probabilities in time order (NaN holds the current state)
+    times : sequence, optional
+        Sample times (default: sample indices); durations are differences
+        of these values
+    thresholds : dict, optional
+        'warning', 'critical' and 'alert' probabilities
+        (default ``DEFAULT_THRESHOLDS``)
+    hysteresis : float
+        A level is left only below its threshold minus ``hysteresis``
+    min_dwell : int
+        Samples a level change must hold before it takes effect
+
+    Returns
+    -------
+    dict
+        'levels' (int8 level index per sample, 0 = normal ... 3 = alert),
+        'crossings' (one dict per level change: index, time, from, to,
+        direction, probability) and 'episodes' (one dict per period at
+        warning or above: onset, end, duration, samples, peak_level,
+        peak_probability, peak_time; end and duration are None while the
+        episode is still open at the end of the series)
+    """
+    p = np.asarray(probabilities, dtype=float).ravel()
+    time_axis = np.arange(p.size) if times is None else np.asarray(times)
+    on, off = _threshold_arrays(thresholds, hysteresis)
+
+    levels = dwell_filter(hysteresis_levels(p, on, off), min_dwell)
+
+    previous = np.concatenate([[0], levels[:-1]])
+    changes = np.flatnonzero(levels != previous)
+    crossings = [_crossing(int(i), time_axis[i], int(previous[i]), int(levels[i]), p[i])
+                 for i in changes]
+
+    elevated = np.concatenate([[False], levels > 0, [False]])
+    edges = np.flatnonzero(elevated[1:] != elevated[:-1])
+    episodes = []
+    if edges.size:
+        starts, ends = edges[0::2], edges[1::2]
+        peak_levels = np.maximum.reduceat(levels, starts)
+        for start, end, peak_level in zip(starts, ends, peak_levels):
+            window = p[start:end]
+            peak = start + (int(np.nanargmax(window)) if np.isfinite(window).any() else 0)
+            closed = end < p.size
+            episodes.append(_episode(start, time_axis[start], peak, time_axis[peak], peak_level,
+                                     p[peak], end if closed else None,
+                                     time_axis[end] if closed else None))
+
+    return {'levels': levels, 'crossings': crossings, 'episodes': episodes}
+
+
+class ThresholdDetector:
+    """
+    Streaming threshold crossing and alert episode detection.
+
+    Same rules as ``detect_thresholds``, one sample at a time: feeding a
+    series through ``update`` yields exactly the batch crossings and
+    episodes. State is a handful of scalars, independent of history length.
+
+    Parameters
+    ----------
+    thresholds : dict, optional
+        'warning', 'critical' and 'alert' probabilities
+    hysteresis : float
+        A level is left only below its threshold minus ``hysteresis``
+    min_dwell : int
+        Samples a level change must hold before it takes effect
+    """
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None,
+                 hysteresis: float = 0.05, min_dwell: int = 1):
+        self.on, self.off = _threshold_arrays(thresholds, hysteresis)
+        self.min_dwell = max(int(min_dwell), 1)
+        self.samples = 0
+        self.level = 0          # confirmed level
+        self._raw_level = 0     # level after hysteresis, before the dwell filter
+        self._run_length = 0
+        self.episode: Optional[Dict[str, Any]] = None     # open episode, if any
+
+    @property
+    def level_name(self) -> str:
+        return LEVELS[self.level]
+
+    def update(self, probability: float, time=None) -> List[Dict]:
+        """
+        Process one sample.
+
+        Returns
+        -------
+        list of dict
+            Crossings at this sample (empty or one). A crossing back to
+            normal carries the closed episode under 'episode'.
+        """
+        index = self.samples
+        self.samples += 1
+        time = index if time is None else time
+        p = float(probability)
+
+        # Hysteresis: thresholds above 'on' switch on, below 'off' switch off
+        if not np.isnan(p):
+            up = int(np.count_nonzero(p > self.on))
+            down = int(np.count_nonzero(p >= self.off))
+            raw = max(up, min(self._raw_level, down))
+        else:
+            raw = self._raw_level
+        self._run_length = self._run_length + 1 if raw == self._raw_level else 1
+        self._raw_level = raw
+
+        crossings = []
+        if raw != self.level and self._run_length >= self.min_dwell:
+            crossing = _crossing(index, time, self.level, raw, p)
+            if self.level == 0:
+                self.episode = {'onset_index': index, 'onset': time, 'peak_index': index,
+                                'peak_time': time, 'peak_level': raw, 'peak_probability': p}
+            elif raw == 0 and self.episode is not None:
+                e = self.episode
+                crossing['episode'] = _episode(e['onset_index'], e['onset'], e['peak_index'],
+                                               e['peak_time'], e['peak_level'],
+                                               e['peak_probability'], index, time)
+                self.episode = None
+            self.level = raw
+            crossings.append(crossing)
+
+        if self.level > 0 and self.episode is not None:
+            e = self.episode
+            e['peak_level'] = max(e['peak_level'], self.level)
+            if p > e['peak_probability'] or np.isnan(e['peak_probability']):
+                e['peak_probability'], e['peak_index'], e['peak_time'] = p, index, time
+
+        return crossings
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    def open_episode(self) -> Optional[Dict]:
+        """The episode in progress, in the format of ``detect_thresholds``."""
+        if self.episode is None:
+            return None
+        e = self.episode
+        return _episode(e['onset_index'], e['onset'], e['peak_index'], e['peak_time'],
+                        e['peak_level'], e['peak_probability'], None, None)
@@ -1,34 +1,80 @@
 """
-VUAP (Volcanic Unrest Assessment Protocol) Implementation - TXT Reports Only
+VUAP (Volcanic Unrest Assessment Protocol) Implementation
 """
 
 import numpy as np
-import pandas as pd
-from typing import Dict, List, Tuple, Optional, Any
+from typing import TYPE_CHECKING, Dict, Deque, List, Optional, Any
 import logging
 import os
 from datetime import datetime, timedelta
 import time
+from collections import deque
+
+# The model constants used to live here; re-exported for existing imports
+from .eruption_probability import (  # noqa: F401
+    PROBABILITY_MIDPOINT, PROBABILITY_SLOPE, REFERENCE_STATE,
+)
+from .eruption_probability import EnsembleProbability, eruption_probabilities, reference_states
+from .parameter_graph import INPUT_SPECS, PARAMETER_SPECS, ParameterGraph
+from .report_store import ReportStore, ReportWriter
+from .state_vector import PARAMETER_NAMES, STATE_DTYPE, HistoryBuffer, StateVector, state_values
+from .threshold_detection import ThresholdDetector, detect_thresholds
+from ..utils.cache import MemoCache
+from ..visualization.report_generator import format_probability, render
+
+if TYPE_CHECKING:
+    # Imported lazily by callers: the index needs scipy
+    from .analogues import AnalogueIndex
 
 logger = logging.getLogger(__name__)
 
 class VolcanicMonitoringFramework:
     """Main framework class for volcanic unrest monitoring."""
     
-    def __init__(self, volcano_name: str, config_path: Optional[str] = None):
+    def __init__(self, volcano_name: str, config_path: Optional[str] = None,
+                 volcano_type: Optional[str] = None):
         self.volcano_name = volcano_name
         self.config = self._load_config(config_path)
+        # Selects the pre-eruptive reference states (e.g. 'stratovolcano')
+        self.volcano_type = volcano_type or self.config.get('volcano_type')
+        
+        # Scoring arrays are built once and reused by every probability call
+        self._prepare_scoring()
         
-        # State tracking
-        self.state_vector_history = []
-        self.eruption_probability_history = []
-        self.alerts = []
+        # State tracking (bounded, preallocated ring buffers)
+        capacity = self.config['history_capacity']
+        self.state_vector_history = HistoryBuffer(capacity, dtype=STATE_DTYPE)
+        self.eruption_probability_history = HistoryBuffer(capacity)
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=self.config['alert_capacity'])
+        self.threshold_detector = ThresholdDetector(
+            self._threshold_levels,
+            hysteresis=self.config['threshold_hysteresis'],
+            min_dwell=self.config['threshold_min_dwell'],
+        )
         
         # Parameter indices
-        self.parameters = {
+        self.parameters: Dict[str, Optional[float]] = {
             'S': None, 'P': None, 'G': None, 'D': None,
             'H': None, 'E': None, 'W': None, 'L': None, 'R': None,
         }
+        self.parameter_status: Dict[str, str] = {}
+        self.parameter_timings: Dict[str, float] = {}
+        self.parameter_times: Dict[str, Any] = {}
+        self.state: Optional[StateVector] = None
+        
+        # Parameter values reused across cycles while their inputs are unchanged
+        self.parameter_cache = MemoCache(**self.config['parameter_cache'])
+        self.parameter_cache_stats = self.parameter_cache.stats()
+        self.monitoring_data: Dict[str, Any] = {}
+        self.seismic_data = None
+        
+        # Optional AnalogueIndex shared across volcanoes (see analogues.py)
+        self.analogue_index: Optional['AnalogueIndex'] = None
+        
+        # Report archive, opened on the first saved report; with a writer
+        # running, reports are persisted by its background thread
+        self.report_store: Optional[ReportStore] = None
+        self.report_writer: Optional[ReportWriter] = None
         
         logger.info(f"🌋 Initialized framework for {volcano_name}")
     
@@ -45,6 +91,26 @@ def _load_config(self, config_path: Optional[str] = None) -> Dict:
                 'alert': 0.85
             },
             'monitoring_interval': 3600,
+            'history_capacity': 8760,  # one year of hourly cycles
+            'alert_capacity': 1000,
+            'min_valid_parameters': 3,     # fewer valid indices -> NO DATA level
+            'threshold_hysteresis': 0.05,  # probability drop needed to leave a level
+            'threshold_min_dwell': 1,      # cycles a level change must hold
+            'ensemble_samples': 2000,      # Monte Carlo draws per probability
+            'ensemble_credible': 0.9,      # central credible interval mass
+            'parameter_uncertainty': dict.fromkeys(PARAMETER_NAMES, 0.05),
+            'analogue_k': 10,               # most similar past states per report
+            'analogue_exclude_days': 30,    # own recent states are not analogues
+            'analogue_horizon_days': 30,    # "followed by an eruption" window
+            'report_store': 'results/reports.sqlite',
+            'report_batch_size': 24,        # reports written per transaction
+            'report_queue_size': 1000,      # background writer queue bound
+            'report_flush_interval': 5.0,   # seconds a queued report may wait
+            'parameter_cache': {
+                'max_entries': 256,
+                'ttl': 86400,      # recompute at least daily
+                'cache_dir': None,
+            },
         }
         
         if config_path and os.path.exists(config_path):
@@ -59,10 +125,61 @@ def _load_config(self, config_path: Optional[str] = None) -> Dict:
         
         return config
     
+    def _prepare_scoring(self):
+        """Precompute the weight and reference vectors used for scoring."""
+        weights = self.config['parameter_weights']
+        if all(param in weights for param in PARAMETER_NAMES):
+            values = [weights[param] for param in PARAMETER_NAMES]
+        else:
+            values = list(weights.values())
+        
+        self._weights = np.asarray(values, dtype=float)
+        if self._weights.shape != (len(PARAMETER_NAMES),):
+            raise ValueError(
+                f"Expected {len(PARAMETER_NAMES)} parameter weights, got {self._weights.size}"
+            )
+        self._reference_states = reference_states(self.volcano_type,
+                                                  self.config.get('reference_states'))
+        
+        thresholds = self.config['thresholds']
+        self._threshold_levels = {
+            level: float(thresholds[level])
+            for level in ('warning', 'critical', 'alert') if level in thresholds
+        }
+        
+        uncertainty = self.config['parameter_uncertainty']
+        self._uncertainties = np.array([float(uncertainty.get(p, 0.0)) for p in PARAMETER_NAMES])
+        self.probability_ensemble = EnsembleProbability(
+            self._weights, self._reference_states,
+            n_samples=self.config['ensemble_samples'],
+            credible=self.config['ensemble_credible'],
+            thresholds=self._threshold_levels,
+        )
+    
     def load_data(self, **data_sources):
-        """Load monitoring data from various sources."""
+        """
+        Load monitoring data from various sources.
+        
+        ``data_store`` points at a ``TimeSeriesStore`` directory; only the
+        window ending at ``end`` (default now) and spanning ``window``
+        (default 30 days) is read from each dataset in it.
+        """
+        import pandas as pd
+        
         logger.info(f"📥 Loading data for {self.volcano_name}")
         self.data_sources = data_sources
+        self.monitoring_data = {}
+        
+        if 'data_store' in data_sources:
+            from ..utils.io import TimeSeriesStore
+            
+            store = TimeSeriesStore(data_sources['data_store'])
+            end = pd.Timestamp(data_sources.get('end') or datetime.now())
+            start = end - pd.Timedelta(data_sources.get('window', '30D'))
+            for dataset in data_sources.get('datasets') or store.datasets():
+                self.monitoring_data[dataset] = store.read(dataset, start, end)
+            if 'seismic' in self.monitoring_data:
+                self.seismic_data = self.monitoring_data['seismic']
         
         # Simplified data loading for demo
         if 'seismic_file' in data_sources:
@@ -71,49 +188,214 @@ def load_data(self, **data_sources):
             except:
                 logger.warning("Could not load seismic data")
     
-    def calculate_parameters(self):
-        """Calculate all nine parameter indices."""
+    def calculate_parameters(self, max_workers: Optional[int] = None, executor=None):
+        """
+        Calculate all nine parameter indices from the loaded monitoring data.
+        
+        Independent indices run concurrently (see ``ParameterGraph``); indices
+        without data or without an implementation are left as None, and
+        indices whose inputs are unchanged are taken from the cache.
+        """
         logger.info("🧮 Calculating parameter indices...")
         
-        # Generate random parameters for demo
-        import numpy as np
-        for param in self.parameters:
-            self.parameters[param] = np.random.uniform(0.2, 0.8)
-            logger.info(f"{param}: {self.parameters[param]:.3f}")
+        data = dict(self.monitoring_data)
+        if self.seismic_data is not None:
+            data.setdefault('seismic', self.seismic_data)
+        
+        graph = ParameterGraph(config=self.config.get('parameter_config'),
+                               max_workers=max_workers, executor=executor,
+                               cache=self.parameter_cache)
+        result = graph.evaluate(data)
+        self.parameters = result['values']
+        self.parameter_status = result['status']
+        self.parameter_timings = result['timings']
+        self.parameter_cache_stats = self.parameter_cache.stats()
+        self.parameter_times = self._parameter_times(data)
+        
+        for param, value in self.parameters.items():
+            if value is None:
+                logger.info(f"{param}: n/a ({self.parameter_status.get(param)})")
+            elif param in self.parameter_timings:
+                logger.info(f"{param}: {value:.3f} ({self.parameter_timings[param] * 1000:.1f} ms)")
+            else:
+                logger.info(f"{param}: {value:.3f} (cached)")
         
         return self.parameters
     
-    def get_state_vector(self) -> np.ndarray:
-        """Construct the 9-dimensional state vector."""
-        state_vector = np.array([
-            self.parameters['S'] or 0.0,
-            self.parameters['P'] or 0.0,
-            self.parameters['G'] or 0.0,
-            self.parameters['D'] or 0.0,
-            self.parameters['H'] or 0.0,
-            self.parameters['E'] or 0.0,
-            self.parameters['W'] or 0.0,
-            self.parameters['L'] or 0.0,
-            self.parameters['R'] or 0.0,
-        ])
-        
-        self.state_vector_history.append(state_vector)
-        return state_vector
+    def _parameter_times(self, data: Dict) -> Dict[str, datetime]:
+        """Latest observation time in the inputs of each computed parameter."""
+        latest = {}
+        for dataset, frame in data.items():
+            if (hasattr(frame, 'columns') and 'time' in frame.columns and len(frame)
+                    and frame['time'].dtype.kind == 'M'):
+                latest[dataset] = frame['time'].max()
+        
+        times = {}
+        for param, spec in PARAMETER_SPECS.items():
+            if self.parameters.get(param) is None:
+                continue
+            observed = [latest[INPUT_SPECS[i]['dataset']] for i in spec['inputs'].values()
+                        if INPUT_SPECS[i]['dataset'] in latest]
+            if observed:
+                times[param] = max(observed)
+        return times
+    
+    def get_state(self, timestamp: Optional[datetime] = None) -> StateVector:
+        """Current state vector with validity mask, observation times and uncertainties."""
+        return StateVector.from_parameters(
+            self.parameters, timestamp,
+            parameter_times=self.parameter_times,
+            uncertainties=dict(zip(PARAMETER_NAMES, self._uncertainties)),
+        )
+    
+    def get_state_vector(self, timestamp: Optional[datetime] = None) -> np.ndarray:
+        """
+        Construct the 9-dimensional state vector.
+        
+        Missing parameters are NaN, which the scoring functions leave out;
+        ``self.state`` keeps the full ``StateVector`` record, which is also
+        what ``state_vector_history`` stores.
+        """
+        return self._record_state(timestamp).filled(np.nan)
+    
+    def _record_state(self, timestamp: Optional[datetime] = None) -> StateVector:
+        """Current ``StateVector``, kept as ``self.state`` and appended to the history."""
+        state = self.get_state(timestamp)
+        self.state = state
+        self.state_vector_history.append(state.record, state.time)
+        return state
     
-    def calculate_eruption_probability(self, state_vector: np.ndarray) -> float:
+    def calculate_eruption_probability(self, state_vector: np.ndarray,
+                                       timestamp: Optional[datetime] = None) -> float:
         """Calculate eruption probability based on state vector."""
-        reference_state = np.array([0.8, 0.7, 0.75, 0.7, 0.6, 0.5, 0.6, 0.25, 0.7])
-        weights = np.array(list(self.config['parameter_weights'].values()))
-        distance = np.sqrt(np.sum(weights * (state_vector - reference_state) ** 2))
-        probability = 1 / (1 + np.exp(2.5 * (distance - 0.3)))
+        probability = float(self.calculate_eruption_probabilities(state_vector))
         
-        self.eruption_probability_history.append(probability)
+        self.eruption_probability_history.append(probability, timestamp)
         logger.debug(f"Eruption probability: {probability:.3f}")
         
         return probability
     
+    def calculate_eruption_probabilities(self, state_vectors: np.ndarray) -> np.ndarray:
+        """
+        Calculate eruption probabilities for many state vectors at once.
+        
+        Parameters
+        ----------
+        state_vectors : np.ndarray
+            Array of shape (..., 9), e.g. (N, 9) or (volcanoes, time, 9),
+            with NaN for missing parameters, or ``STATE_DTYPE`` records
+            
+        Returns
+        -------
+        np.ndarray
+            Probabilities with the leading shape of ``state_vectors`` (NaN
+            where no parameter is valid)
+            
+        Notes
+        -----
+        Unlike ``calculate_eruption_probability`` this does not touch the
+        probability history, so it can be used for backtests and replays.
+        """
+        shape = state_values(state_vectors).shape
+        if shape[-1:] != (len(PARAMETER_NAMES),):
+            raise ValueError(
+                f"State vectors must have {len(PARAMETER_NAMES)} components "
+                f"in the last axis, got shape {shape}"
+            )
+        
+        return eruption_probabilities(state_vectors, self._weights, self._reference_states)
+    
+    def calculate_probability_ensemble(self, state_vectors: np.ndarray,
+                                       uncertainties: Optional[np.ndarray] = None) -> Dict:
+        """
+        Monte Carlo probability with credible interval (see ``EnsembleProbability``).
+        
+        ``uncertainties`` are per-parameter standard deviations, by default
+        those carried by ``StateVector`` records or else the
+        ``parameter_uncertainty`` config.
+        """
+        if uncertainties is None:
+            if isinstance(state_vectors, StateVector):
+                uncertainties = state_vectors.uncertainty
+            elif getattr(state_vectors, 'dtype', None) is not None and state_vectors.dtype.names:
+                uncertainties = state_vectors['uncertainty']
+            else:
+                uncertainties = self._uncertainties
+        return self.probability_ensemble.evaluate(state_vectors, uncertainties)
+    
+    def classify_probabilities(self, probabilities: np.ndarray) -> Dict[str, np.ndarray]:
+        """Vectorized counterpart of ``check_thresholds`` (no alerts recorded)."""
+        probabilities = np.asarray(probabilities, dtype=float)
+        return {
+            level: probabilities > threshold
+            for level, threshold in self._threshold_levels.items()
+        }
+    
+    def detect_alert_episodes(self, probabilities: np.ndarray, times=None) -> Dict:
+        """Crossings and alert episodes of a probability series (see ``detect_thresholds``)."""
+        return detect_thresholds(probabilities, times, self._threshold_levels,
+                                 hysteresis=self.config['threshold_hysteresis'],
+                                 min_dwell=self.config['threshold_min_dwell'])
+    
+    def score_state_vectors(self, state_vectors: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of state vectors in a single NumPy pass.
+        
+        Parameters
+        ----------
+        state_vectors : np.ndarray
+            Array of shape (..., 9)
+            
+        Returns
+        -------
+        dict
+            ``eruption_probability`` plus one boolean array per threshold
+            level (``warning``, ``critical``, ``alert``), all with the
+            leading shape of ``state_vectors``
+        """
+        probabilities = self.calculate_eruption_probabilities(state_vectors)
+        scores = {'eruption_probability': probabilities}
+        scores.update(self.classify_probabilities(probabilities))
+        return scores
+    
+    def find_analogues(self, state_vector: np.ndarray,
+                       timestamp: Optional[datetime] = None) -> Dict:
+        """Most similar archived states in ``analogue_index`` and what followed them."""
+        if self.analogue_index is None:
+            raise ValueError("No analogue_index attached to this framework")
+        day = 86400.0
+        result = self.analogue_index.query(
+            state_vector, k=self.config['analogue_k'], volcano=self.volcano_name,
+            time=timestamp, exclude_window=self.config['analogue_exclude_days'] * day,
+        )
+        found = result['index'] >= 0
+        horizon = self.config['analogue_horizon_days'] * day
+        followed = result['time_to_eruption'][found] <= horizon
+        
+        return {
+            'k': int(found.sum()),
+            'horizon_days': self.config['analogue_horizon_days'],
+            'eruption_fraction': float(followed.mean()) if found.any() else None,
+            'matches': [
+                {
+                    'volcano': result['volcano'][i],
+                    'time': datetime.fromtimestamp(result['time'][i]).isoformat(),
+                    'distance': float(result['distance'][i]),
+                    'days_to_eruption': (None if np.isinf(result['time_to_eruption'][i])
+                                         else float(result['time_to_eruption'][i] / day)),
+                }
+                for i in np.flatnonzero(found)
+            ],
+        }
+    
     def check_thresholds(self, probability: float) -> Dict[str, bool]:
-        """Check probability against warning and critical thresholds."""
+        """
+        Check probability against warning and critical thresholds.
+        
+        Alerts are recorded when the hysteresis/dwell-filtered level
+        escalates (see ``ThresholdDetector``), not on every cycle above a
+        threshold.
+        """
         thresholds = self.config['thresholds']
         
         status = {
@@ -123,11 +405,18 @@ def check_thresholds(self, probability: float) -> Dict[str, bool]:
         }
         
         current_time = datetime.now()
-        if status['alert']:
-            alert_msg = f"🚨 ALERT: Eruption probability {probability:.2f} > {thresholds['alert']}"
+        for crossing in self.threshold_detector.update(probability, current_time):
+            if crossing['direction'] != 'up':
+                logger.info(f"Level lowered to {crossing['to'].upper()} (p={probability:.2f})")
+                continue
+            # With hysteresis the level can rise while p is below its
+            # nominal threshold, so the message states the level, not "p > x"
+            level = crossing['to']
+            alert_msg = (f"{'🚨' if level == 'alert' else '⚠️'} "
+                         f"Level raised to {level.upper()} (p={probability:.2f})")
             self.alerts.append({
                 'timestamp': current_time,
-                'type': 'alert',
+                'type': level,
                 'probability': probability,
                 'message': alert_msg
             })
@@ -144,12 +433,29 @@ def generate_vuap_report(self) -> Dict:
             self.calculate_parameters()
         
         # Get current state
-        state_vector = self.get_state_vector()
-        probability = self.calculate_eruption_probability(state_vector)
-        threshold_status = self.check_thresholds(probability)
+        assessed_at = datetime.now()
+        current = self._record_state(assessed_at)
+        state = current.record
+        probability = self.calculate_eruption_probability(state, assessed_at)
+        ensemble = self.calculate_probability_ensemble(state)
+
+        # Without enough data the level is unknown, never NORMAL; the
+        # threshold detector sees a missing sample and holds its state
+        n_valid = len(PARAMETER_NAMES) - len(current.missing)
+        no_data = (not np.isfinite(probability)
+                   or n_valid < self.config['min_valid_parameters'])
+        threshold_status = self.check_thresholds(np.nan if no_data else probability)
+        
+        analogues = None
+        if self.analogue_index is not None:
+            analogues = self.find_analogues(state, assessed_at)
+            self.analogue_index.add(self.volcano_name, state, assessed_at)
         
         # Determine alert level
-        if threshold_status['alert']:
+        if no_data:
+            alert_level = "⚪ NO DATA"
+            color_code = "GRAY"
+        elif threshold_status['alert']:
             alert_level = "🚨 ALERT"
             color_code = "RED"
         elif threshold_status['critical']:
@@ -165,27 +471,49 @@ def generate_vuap_report(self) -> Dict:
         # Generate report dictionary
         report = {
             'volcano': self.volcano_name,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': assessed_at.isoformat(),
             'alert_level': alert_level,
             'color_code': color_code,
-            'state_vector': state_vector.tolist(),
-            'eruption_probability': probability,
+            'state_vector': list(current.to_dict().values()),
+            'missing_parameters': current.missing,
+            'eruption_probability': probability if np.isfinite(probability) else None,
+            'probability_ensemble': ensemble,
             'threshold_status': threshold_status,
             'parameter_values': self.parameters,
-            'recommendations': self._generate_recommendations(probability, threshold_status),
-            'next_assessment': (datetime.now() + 
+            'parameter_status': dict(self.parameter_status),
+            'parameter_timings': dict(self.parameter_timings),
+            'parameter_cache': dict(self.parameter_cache_stats),
+            'analogues': analogues,
+            'recommendations': self._generate_recommendations(
+                probability, threshold_status, missing=current.missing if no_data else None),
+            'next_assessment': (assessed_at + 
                                timedelta(seconds=self.config['monitoring_interval'])).isoformat(),
         }
         
-        logger.info(f"✅ Report generated: {alert_level} (probability: {probability:.1%})")
+        logger.info(f"✅ Report generated: {alert_level} "
+                    f"(probability: {format_probability(probability)})")
         
         return report
     
-    def _generate_recommendations(self, probability: float, status: Dict) -> List[str]:
-        """Generate recommendations based on current status."""
+    def _generate_recommendations(self, probability: float, status: Dict,
+                                  missing: Optional[List[str]] = None) -> List[str]:
+        """
+        Generate recommendations based on current status.
+
+        ``missing`` (the unavailable parameters) marks an assessment without
+        enough data, which gets data-recovery recommendations instead.
+        """
         recommendations = []
         
-        if status['alert']:
+        if missing is not None:
+            available = len(PARAMETER_NAMES) - len(missing)
+            recommendations.extend([
+                f"Restore monitoring data: {available} of {len(PARAMETER_NAMES)} "
+                f"parameters available (missing: {', '.join(missing) or 'none'})",
+                "Assess unrest from field observations until data is restored",
+                "Do not treat this assessment as an all-clear",
+            ])
+        elif status['alert']:
             recommendations.extend([
                 "Issue immediate eruption alert",
                 "Evacuate high-risk zones",
@@ -210,63 +538,53 @@ def _generate_recommendations(self, probability: float, status: Dict) -> List[st
         
         return recommendations
     
-    def _save_report(self, report: Dict):
-        """Save report as TXT file only."""
+    def open_report_store(self) -> ReportStore:
+        """The report archive (config key ``report_store``), opened on first use."""
+        if self.report_store is None:
+            self.report_store = ReportStore(self.config['report_store'],
+                                            batch_size=self.config['report_batch_size'])
+        return self.report_store
+    
+    def open_report_writer(self) -> ReportWriter:
+        """Start the background report writer; ``_save_report`` then only enqueues."""
+        if self.report_writer is None:
+            self.report_writer = ReportWriter(
+                self.open_report_store(),
+                max_queue=self.config['report_queue_size'],
+                batch_size=self.config['report_batch_size'],
+                flush_interval=self.config['report_flush_interval'],
+            )
+        return self.report_writer
+    
+    def close_report_writer(self) -> Optional[Dict]:
+        """Drain and stop the background writer; returns its final metrics."""
+        if self.report_writer is None:
+            return None
+        writer, self.report_writer = self.report_writer, None
+        writer.close()
+        return writer.metrics()
+    
+    def _save_report(self, report: Dict) -> Optional[str]:
+        """Archive the report; TXT/JSON are rendered on demand from the store."""
         try:
-            reports_dir = "results/reports"
-            os.makedirs(reports_dir, exist_ok=True)
-            
-            # Create safe filename (TXT only)
-            volcano_safe = ''.join(c if c.isalnum() else '_' for c in self.volcano_name)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{reports_dir}/{volcano_safe}_{timestamp}.txt"
-            
-            # Format TXT report
-            with open(filename, 'w') as f:
-                f.write("=" * 60 + "\n")
-                f.write(f"🌋 VUAP REPORT: {report['volcano']}\n")
-                f.write("=" * 60 + "\n\n")
-                
-                f.write(f"📅 TIMESTAMP: {report['timestamp']}\n")
-                f.write(f"🚨 ALERT LEVEL: {report['alert_level']}\n")
-                f.write(f"📊 ERUPTION PROBABILITY: {report['eruption_probability']:.2%}\n\n")
-                
-                f.write("📈 STATE VECTOR:\n")
-                params = ['S', 'P', 'G', 'D', 'H', 'E', 'W', 'L', 'R']
-                for i, (param, value) in enumerate(zip(params, report['state_vector'])):
-                    f.write(f"  {param}: {value:.3f}")
-                    if (i + 1) % 3 == 0:
-                        f.write("\n")
-                    else:
-                        f.write(" | ")
-                f.write("\n\n")
-                
-                f.write("🚦 THRESHOLD STATUS:\n")
-                for key, value in report['threshold_status'].items():
-                    status = "ACTIVE" if value else "INACTIVE"
-                    f.write(f"  • {key.upper()}: {status}\n")
-                f.write("\n")
-                
-                f.write("💡 RECOMMENDATIONS:\n")
-                for i, rec in enumerate(report['recommendations'], 1):
-                    f.write(f"  {i}. {rec}\n")
-                f.write("\n")
-                
-                f.write("📋 PARAMETER VALUES:\n")
-                for param, value in report['parameter_values'].items():
-                    f.write(f"  {param}: {value:.3f}\n")
-                f.write("\n")
-                
-                f.write(f"⏭️  NEXT ASSESSMENT: {report['next_assessment']}\n")
-                f.write("=" * 60 + "\n")
-            
-            logger.debug(f"TXT report saved to {filename}")
-            return filename
-            
+            if self.report_writer is not None and not self.report_writer.closed:
+                self.report_writer.submit(report)
+                return self.report_writer.store.path
+            store = self.open_report_store()
+            store.append(report)
+            logger.debug(f"Report archived in {store.path} ({store.pending} pending)")
+            return store.path
         except Exception as e:
-            logger.error(f"Failed to save TXT report: {e}")
+            logger.error(f"Failed to archive report: {e}")
             return None
     
+    def flush_reports(self):
+        """Write reports still queued or buffered for the report store."""
+        if self.report_writer is not None:
+            self.report_writer.flush()
+        if self.report_store is not None:
+            self.report_store.flush()
+    
     def run_real_time_monitoring(self, interval: Optional[int] = None):
         """Run continuous real-time monitoring."""
         interval = interval or self.config['monitoring_interval']
@@ -279,6 +597,7 @@ def run_real_time_monitoring(self, interval: Optional[int] = None):
         print(f"{'='*60}")
         
         cycle_count = 0
+        writer = self.open_report_writer()
         try:
             while True:
                 cycle_count += 1
@@ -290,13 +609,12 @@ def run_real_time_monitoring(self, interval: Optional[int] = None):
                 report = self.generate_vuap_report()
                 
                 # Display summary
-                print(f"🎯 Probability: {report['eruption_probability']:.1%}")
+                print(f"🎯 Probability: {format_probability(report['eruption_probability'])}")
                 print(f"🚦 Status: {report['alert_level']}")
                 
-                # Save TXT report
-                saved_file = self._save_report(report)
-                if saved_file:
-                    print(f"💾 Report saved: {os.path.basename(saved_file)}")
+                # Queue report for archiving (written by the background writer)
+                if self._save_report(report):
+                    print(f"💾 Report queued ({writer.queue_depth} waiting)")
                 
                 # Wait for next interval
                 print(f"\n⏳ Next update in {interval} seconds...")
@@ -309,18 +627,20 @@ def run_real_time_monitoring(self, interval: Optional[int] = None):
             print(f"{'='*60}")
         except Exception as e:
             logger.error(f"❌ Monitoring error: {e}")
+        finally:
+            metrics = self.close_report_writer()
+            if metrics is not None:
+                write_latency = metrics['write_latency']['mean']
+                print(f"💾 Archived {metrics['written']}/{metrics['submitted']} reports"
+                      + (f", {write_latency * 1000:.1f} ms per batch"
+                         if write_latency is not None else ""))
 
 # Helper functions
-def calculate_all_parameters(data_dict: Dict) -> Dict[str, float]:
-    """Calculate all nine parameter indices from data."""
-    parameters = {}
-    import numpy as np
-    
-    param_names = ['S', 'P', 'G', 'D', 'H', 'E', 'W', 'L', 'R']
-    for param in param_names:
-        parameters[param] = np.random.uniform(0.2, 0.8)
-    
-    return parameters
+def calculate_all_parameters(data_dict: Dict, max_workers: Optional[int] = None,
+                             executor=None) -> Dict[str, Optional[float]]:
+    """Calculate all nine parameter indices from data (None where unavailable)."""
+    graph = ParameterGraph(max_workers=max_workers, executor=executor)
+    return graph.evaluate(data_dict)['values']
 
 def generate_vuap_report(volcano_name: str, parameters: Dict) -> Dict:
     """Generate VUAP report from pre-calculated parameters."""
@@ -339,7 +659,7 @@ def run_real_time_monitoring(volcano_name: str, data_sources: Dict, interval: in
     import logging
     logging.basicConfig(level=logging.INFO)
     
-    print("🌋 Volcano Monitoring Framework - TXT Reports Only")
+    print("🌋 Volcano Monitoring Framework")
     print("="*50)
     
     volcano = VolcanicMonitoringFramework("Example Volcano")
@@ -351,12 +671,11 @@ def run_real_time_monitoring(volcano_name: str, data_sources: Dict, interval: in
     
     report = volcano.generate_vuap_report()
     saved_file = volcano._save_report(report)
+    volcano.flush_reports()
     
     if saved_file:
-        print(f"\n✅ Example report saved as: {saved_file}")
+        print(f"\n✅ Example report archived in: {saved_file}")
         print("Preview of TXT report:")
         print("-"*40)
-        with open(saved_file, 'r') as f:
-            for i, line in enumerate(f):
-                if i < 15:  # Show first 15 lines
-                    print(line.rstrip())
+        for line in render(report, 'txt').splitlines()[:15]:
+            print(line)
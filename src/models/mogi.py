@@ -3,26 +3,108 @@
 Calculates surface displacement from a pressurized spherical source.
 """
 
+import hashlib
+import os
 import numpy as np
-from typing import Tuple, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Tuple, Optional, Sequence, Union
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # elements evaluated per block
+
+def _mogi_into(x: np.ndarray, y: np.ndarray,
+               source_x: float, source_y: float,
+               source_depth, volume_change,
+               poisson_ratio: float,
+               out: Tuple[np.ndarray, ...],
+               accumulate: bool, chunk_size: int, dtype):
+    """
+    Evaluate (or add) Mogi displacements into ``out`` block by block.
+    
+    Uses ux = C x / R^3, uy = C y / R^3, uz = C d / R^3 with
+    R^2 = x^2 + y^2 + d^2, which is the usual ur * x / r form without the
+    division by r, so points directly above the source are well defined.
+    Only two chunk-sized scratch buffers are allocated.
+    """
+    shape = out[0].shape
+    xb = np.broadcast_to(x, shape)
+    yb = np.broadcast_to(y, shape)
+    db = np.broadcast_to(source_depth, shape)
+    cb = np.broadcast_to(np.asarray(volume_change) * (1 - poisson_ratio) / np.pi, shape)
+    
+    if len(shape) == 0:
+        xb, yb, db, cb = (a.reshape(1) for a in (xb, yb, db, cb))
+        out = tuple(u.reshape(1) for u in out)
+        shape = (1,)
+    
+    row_size = int(np.prod(shape[1:]))
+    step = max(1, chunk_size // max(row_size, 1))
+    scratch = np.empty((min(step, shape[0]),) + shape[1:], dtype=dtype)
+    scratch2 = np.empty_like(scratch)
+    
+    for start in range(0, shape[0], step):
+        block = slice(start, start + step)
+        n = len(range(*block.indices(shape[0])))
+        r3 = scratch[:n]
+        tmp = scratch2[:n]
+        
+        # Coordinates relative to the source
+        dx = np.subtract(xb[block], source_x, out=tmp)
+        np.square(dx, out=r3)
+        dy = np.subtract(yb[block], source_y, out=tmp)
+        r3 += np.square(dy, out=tmp)
+        r3 += np.square(db[block], out=tmp)
+        np.power(r3, -1.5, out=r3)
+        r3 *= cb[block]
+        
+        for component, (coordinate, offset) in zip(
+                out, ((xb, source_x), (yb, source_y), (db, 0.0))):
+            np.subtract(coordinate[block], offset, out=tmp)
+            tmp *= r3
+            if accumulate:
+                component[block] += tmp
+            else:
+                component[block] = tmp
+
+def _prepare_out(shape: Tuple[int, ...], out, dtype):
+    """Validate a caller-supplied (ux, uy, uz) buffer or allocate one."""
+    if out is None:
+        return tuple(np.empty(shape, dtype=dtype) for _ in range(3))
+    
+    out = tuple(out)
+    if len(out) != 3 or any(u.shape != shape for u in out):
+        raise ValueError(f"out must be three arrays of shape {shape}")
+    return out
 
 def calculate_displacement(x: np.ndarray, y: np.ndarray, 
-                          source_depth: float, 
-                          volume_change: float,
-                          poisson_ratio: float = 0.25) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+                          source_depth: Union[float, np.ndarray], 
+                          volume_change: Union[float, np.ndarray],
+                          poisson_ratio: float = 0.25,
+                          out: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                          dtype=None,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Calculate surface displacement from Mogi source.
     
     Parameters
     ----------
     x, y : np.ndarray
-        Surface coordinates relative to source (meters)
-    source_depth : float
-        Depth of source (meters, positive downward)
-    volume_change : float
+        Surface coordinates relative to source (meters); any shapes that
+        broadcast together, e.g. a (1, nx) row and an (ny, 1) column
+    source_depth : float or np.ndarray
+        Depth of source (meters, positive downward); arrays broadcast
+        against x and y
+    volume_change : float or np.ndarray
         Volume change of magma chamber (cubic meters)
     poisson_ratio : float
         Poisson's ratio of half-space (default 0.25)
+    out : tuple of np.ndarray, optional
+        Preallocated (ux, uy, uz) arrays to write into
+    dtype : numpy dtype, optional
+        Computation dtype, e.g. ``np.float32`` for large InSAR grids
+        (default: dtype of ``out``, else float64)
+    chunk_size : int
+        Approximate number of points evaluated per block; bounds the
+        size of the temporaries
         
     Returns
     -------
@@ -33,58 +115,480 @@ def calculate_displacement(x: np.ndarray, y: np.ndarray,
     x = np.asarray(x)
     y = np.asarray(y)
     
-    # Radial distance from source
-    r = np.sqrt(x**2 + y**2)
+    shape = np.broadcast_shapes(x.shape, y.shape, np.shape(source_depth),
+                                np.shape(volume_change))
+    if dtype is None:
+        dtype = out[0].dtype if out is not None else np.float64
+    out = _prepare_out(shape, out, dtype)
+    
+    _mogi_into(x, y, 0.0, 0.0, source_depth, volume_change, poisson_ratio,
+               out, accumulate=False, chunk_size=chunk_size, dtype=dtype)
+    
+    return out
+
+def calculate_multi_source_displacement(
+        x: np.ndarray, y: np.ndarray,
+        sources: Sequence,
+        poisson_ratio: float = 0.25,
+        out: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+        dtype=None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Summed surface displacement from several Mogi sources.
+    
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Surface coordinates (meters), broadcastable against each other
+    sources : sequence
+        Sources as (source_x, source_y, source_depth, volume_change)
+        tuples or dicts with those keys (as returned by ``invert_mogi``)
+    poisson_ratio : float
+        Poisson's ratio of half-space (default 0.25)
+    out : tuple of np.ndarray, optional
+        Preallocated (ux, uy, uz) arrays; overwritten with the sum
+    dtype : numpy dtype, optional
+        Computation dtype (default: dtype of ``out``, else float64)
+    chunk_size : int
+        Approximate number of points evaluated per block
+        
+    Returns
+    -------
+    ux, uy, uz : np.ndarray
+        Displacement components (east, north, up) in meters
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    
+    shape = np.broadcast_shapes(x.shape, y.shape)
+    if dtype is None:
+        dtype = out[0].dtype if out is not None else np.float64
+    out = _prepare_out(shape, out, dtype)
+    for component in out:
+        component[...] = 0
+    
+    for source in sources:
+        if isinstance(source, dict):
+            source = (source['source_x'], source['source_y'],
+                      source['source_depth'], source['volume_change'])
+        source_x, source_y, source_depth, volume_change = source
+        _mogi_into(x, y, source_x, source_y, source_depth, volume_change,
+                   poisson_ratio, out, accumulate=True,
+                   chunk_size=chunk_size, dtype=dtype)
+    
+    return out
+
+def mogi_jacobian(x: np.ndarray, y: np.ndarray,
+                  source_x: float, source_y: float,
+                  source_depth: float, volume_change: float,
+                  poisson_ratio: float = 0.25) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mogi displacements and their analytic Jacobian.
+    
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Observation coordinates (meters)
+    source_x, source_y, source_depth, volume_change : float
+        Source parameters (meters, meters, meters positive downward, m^3)
+    poisson_ratio : float
+        Poisson's ratio of half-space (default 0.25)
+        
+    Returns
+    -------
+    u : np.ndarray
+        Displacements of shape (3, n) stacked as (ux, uy, uz)
+    jac : np.ndarray
+        Derivatives of shape (3, n, 4) with respect to
+        (source_x, source_y, source_depth, volume_change)
+    """
+    dx = np.asarray(x, dtype=float).ravel() - source_x
+    dy = np.asarray(y, dtype=float).ravel() - source_y
     d = source_depth
     
-    # Calculate vertical displacement
-    uz = (volume_change * (1 - poisson_ratio) / np.pi) * (d / (r**2 + d**2)**1.5)
+    k = (1 - poisson_ratio) / np.pi
+    c = volume_change * k
+    inv_r3 = (dx**2 + dy**2 + d**2) ** -1.5
+    inv_r5 = inv_r3 ** (5.0 / 3.0)
     
-    # Calculate horizontal displacements
-    if np.any(r > 0):
-        ur = (volume_change * (1 - poisson_ratio) / np.pi) * (r / (r**2 + d**2)**1.5)
-        ux = ur * (x / r)
-        uy = ur * (y / r)
-    else:
-        ux = np.zeros_like(uz)
-        uy = np.zeros_like(uz)
+    u = np.stack([dx, dy, np.full_like(dx, d)]) * (c * inv_r3)
+    
+    jac = np.empty((3, dx.size, 4))
+    # d/d(source_x): dx depends on source_x with a minus sign
+    jac[0, :, 0] = -c * (inv_r3 - 3 * dx**2 * inv_r5)
+    jac[1, :, 0] = 3 * c * dx * dy * inv_r5
+    jac[2, :, 0] = 3 * c * d * dx * inv_r5
+    # d/d(source_y)
+    jac[0, :, 1] = jac[1, :, 0]
+    jac[1, :, 1] = -c * (inv_r3 - 3 * dy**2 * inv_r5)
+    jac[2, :, 1] = 3 * c * d * dy * inv_r5
+    # d/d(source_depth)
+    jac[0, :, 2] = -3 * c * d * dx * inv_r5
+    jac[1, :, 2] = -3 * c * d * dy * inv_r5
+    jac[2, :, 2] = c * (inv_r3 - 3 * d**2 * inv_r5)
+    # d/d(volume_change): displacements are linear in volume change
+    jac[:, :, 3] = u / volume_change if volume_change != 0 else (
+        np.stack([dx, dy, np.full_like(dx, d)]) * (k * inv_r3))
+    
+    return u, jac
+
+def _bounds_arrays(bounds: Optional[Sequence], default_lower: np.ndarray,
+                   default_upper: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert [(min, max), ...] bounds to lower/upper arrays (None = default)."""
+    lower = default_lower.copy()
+    upper = default_upper.copy()
+    for i, pair in enumerate(bounds or []):
+        if i >= lower.size or pair is None:
+            continue
+        lo, hi = pair
+        if lo is not None:
+            lower[i] = lo
+        if hi is not None:
+            upper[i] = hi
+    return lower, upper
+
+def _best_volume(u_obs: np.ndarray, mask: np.ndarray, x: np.ndarray, y: np.ndarray,
+                 source_x: float, source_y: float, source_depth: float,
+                 poisson_ratio: float) -> float:
+    """Least-squares volume change for a fixed source position (linear solve)."""
+    g, _ = mogi_jacobian(x, y, source_x, source_y, source_depth, 1.0, poisson_ratio)
+    g = g[mask]
+    denom = np.dot(g, g)
+    return float(np.dot(g, u_obs[mask]) / denom) if denom > 0 else 0.0
+
+def _solve_from_start(args) -> dict:
+    """Run one bounded least-squares inversion (module-level for process pools)."""
+    from scipy.optimize import least_squares
+    
+    x0, u_obs, mask, x, y, lower, upper, poisson_ratio = args
+    
+    def residuals(p):
+        u, _ = mogi_jacobian(x, y, p[0], p[1], p[2], p[3], poisson_ratio)
+        return (u - u_obs)[mask]
     
-    return ux, uy, uz
+    def jacobian(p):
+        _, jac = mogi_jacobian(x, y, p[0], p[1], p[2], p[3], poisson_ratio)
+        return jac[mask]
+    
+    fit = least_squares(residuals, x0, jac=jacobian, bounds=(lower, upper),
+                        x_scale='jac', method='trf')
+    return {
+        'params': fit.x,
+        'cost': float(fit.cost),
+        'success': bool(fit.success),
+        'nfev': int(fit.nfev),
+        'message': fit.message,
+    }
 
 def invert_mogi(ux_obs: np.ndarray, uy_obs: np.ndarray, uz_obs: np.ndarray,
                 x_coords: np.ndarray, y_coords: np.ndarray,
                 initial_depth: float = 5000.0,
-                bounds: Optional[Tuple] = None) -> dict:
+                bounds: Optional[Tuple] = None,
+                poisson_ratio: float = 0.25,
+                n_starts: int = 8,
+                initial_guess: Optional[Sequence[float]] = None,
+                max_workers: Optional[int] = None,
+                executor: Optional[Executor] = None,
+                random_state: Optional[int] = None) -> dict:
     """
     Invert Mogi source parameters from observed displacements.
     
+    Solves the bounded nonlinear least-squares problem for source x, y,
+    depth and volume change using the analytic Jacobian of the Mogi
+    solution. Several starting points are tried and the best fit is kept.
+    
     Parameters
     ----------
     ux_obs, uy_obs, uz_obs : np.ndarray
-        Observed displacement components
+        Observed displacement components (meters); NaN marks a missing
+        component (e.g. InSAR pixels without horizontal motion)
     x_coords, y_coords : np.ndarray
         Observation coordinates
     initial_depth : float
         Initial guess for source depth
     bounds : tuple, optional
-        Bounds for parameters [(x_min, x_max), (y_min, y_max), ...]
+        Bounds for parameters [(x_min, x_max), (y_min, y_max), ...] in
+        the order x, y, depth, volume change; ``None`` entries are unbounded
+    poisson_ratio : float
+        Poisson's ratio of half-space (default 0.25)
+    n_starts : int
+        Number of multi-start initial guesses
+    initial_guess : sequence of float, optional
+        Source (x, y, depth) for the first start, e.g. from ``MogiGridSearch``;
+        by default the first start sits below the peak uplift
+    max_workers : int, optional
+        Run the starts on a new process pool of this size; by default
+        (or with 1) they run serially in this process, since a pool costs
+        more to start than a typical inversion takes
+    executor : Executor, optional
+        Existing executor to run the starts on; preferred over
+        ``max_workers`` when inverting every monitoring cycle
+    random_state : int, optional
+        Seed for the multi-start initial guesses
         
     Returns
     -------
     dict
         Inverted source parameters
     """
-    # For demo purposes, return mock inversion results
-    import numpy as np
+    x = np.asarray(x_coords, dtype=float).ravel()
+    y = np.asarray(y_coords, dtype=float).ravel()
+    u_obs = np.stack([np.asarray(u, dtype=float).ravel()
+                      for u in (ux_obs, uy_obs, uz_obs)])
+    mask = np.isfinite(u_obs)
+    u_obs = np.where(mask, u_obs, 0.0)
+    
+    span = max(np.ptp(x), np.ptp(y), initial_depth)
+    default_lower = np.array([x.min() - span, y.min() - span, 1.0, -np.inf])
+    default_upper = np.array([x.max() + span, y.max() + span, 10 * span, np.inf])
+    lower, upper = _bounds_arrays(bounds, default_lower, default_upper)
+    
+    # First start sits below the peak uplift; the rest are spread across the bounds
+    rng = np.random.default_rng(random_state)
+    peak = int(np.argmax(np.abs(u_obs[2]) * mask[2])) if mask[2].any() else 0
+    centre = np.array([x[peak], y[peak], initial_depth])
+    if initial_guess is not None:
+        centre = np.asarray(initial_guess, dtype=float)[:3]
+    starts_xyz = [centre]
+    lo_xyz = np.maximum(lower[:3], centre - span / 2)
+    hi_xyz = np.minimum(upper[:3], centre + span / 2)
+    lo_xyz[2] = max(lower[2], initial_depth * 0.25)
+    hi_xyz[2] = min(upper[2], initial_depth * 2.5)
+    for _ in range(max(n_starts, 1) - 1):
+        starts_xyz.append(rng.uniform(lo_xyz, hi_xyz))
+    
+    tasks = []
+    for xs, ys, ds in starts_xyz:
+        xs, ys, ds = np.clip([xs, ys, ds], lower[:3], upper[:3])
+        dv = _best_volume(u_obs, mask, x, y, xs, ys, ds, poisson_ratio)
+        dv = float(np.clip(dv, lower[3], upper[3]))
+        x0 = np.array([xs, ys, ds, dv])
+        # least_squares needs a strictly feasible start
+        x0 = np.clip(x0, np.nextafter(lower, np.inf), np.nextafter(upper, -np.inf))
+        tasks.append((x0, u_obs, mask, x, y, lower, upper, poisson_ratio))
+    
+    if executor is not None:
+        fits = list(executor.map(_solve_from_start, tasks))
+    elif len(tasks) == 1 or max_workers is None or max_workers <= 1:
+        fits = [_solve_from_start(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            fits = list(pool.map(_solve_from_start, tasks))
+    
+    best = min(fits, key=lambda fit: fit['cost'])
+    source_x, source_y, source_depth, volume_change = best['params']
     
     result = {
-        'source_x': np.mean(x_coords) + np.random.uniform(-1000, 1000),
-        'source_y': np.mean(y_coords) + np.random.uniform(-1000, 1000),
-        'source_depth': initial_depth * np.random.uniform(0.8, 1.2),
-        'volume_change': 1e6 * np.random.uniform(0.5, 2.0),  # 0.5-2 million m^3
-        'poisson_ratio': 0.25,
-        'residual_norm': np.random.uniform(0.01, 0.1),
-        'success': True,
+        'source_x': float(source_x),
+        'source_y': float(source_y),
+        'source_depth': float(source_depth),
+        'volume_change': float(volume_change),
+        'poisson_ratio': poisson_ratio,
+        'residual_norm': float(np.sqrt(2 * best['cost'])),
+        'rms': float(np.sqrt(2 * best['cost'] / max(int(mask.sum()), 1))),
+        'success': best['success'],
+        'n_starts': len(fits),
+        'nfev': sum(fit['nfev'] for fit in fits),
+        'message': best['message'],
     }
     
     return result
+
+def _geometry_key(*arrays, poisson_ratio: float) -> str:
+    """Stable hash of the observation geometry and search grid."""
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(repr(float(poisson_ratio)).encode())
+    return digest.hexdigest()[:16]
+
+def build_greens_table(x_obs: np.ndarray, y_obs: np.ndarray, nodes: np.ndarray,
+                       poisson_ratio: float = 0.25,
+                       out: Optional[np.ndarray] = None,
+                       chunk_size: int = 4096) -> np.ndarray:
+    """
+    Unit-volume Mogi displacements for every source node.
+    
+    Parameters
+    ----------
+    x_obs, y_obs : np.ndarray
+        Observation coordinates (meters)
+    nodes : np.ndarray
+        Source positions of shape (n_nodes, 3) as (x, y, depth)
+    poisson_ratio : float
+        Poisson's ratio of half-space (default 0.25)
+    out : np.ndarray, optional
+        Preallocated (n_nodes, 3 * n_obs) array (e.g. a memory map)
+    chunk_size : int
+        Nodes evaluated per vectorized block
+        
+    Returns
+    -------
+    np.ndarray
+        Table of shape (n_nodes, 3 * n_obs); each row is (ux, uy, uz)
+        concatenated for a 1 m^3 volume change
+    """
+    x_obs = np.asarray(x_obs, dtype=float).ravel()
+    y_obs = np.asarray(y_obs, dtype=float).ravel()
+    nodes = np.asarray(nodes, dtype=float).reshape(-1, 3)
+    n_obs = x_obs.size
+    
+    if out is None:
+        out = np.empty((len(nodes), 3 * n_obs))
+    
+    for start in range(0, len(nodes), chunk_size):
+        block = nodes[start:start + chunk_size]
+        dx = x_obs[None, :] - block[:, 0:1]
+        dy = y_obs[None, :] - block[:, 1:2]
+        ux, uy, uz = calculate_displacement(dx, dy, block[:, 2:3], 1.0, poisson_ratio)
+        rows = out[start:start + len(block)]
+        rows[:, :n_obs] = ux
+        rows[:, n_obs:2 * n_obs] = uy
+        rows[:, 2 * n_obs:] = uz
+    
+    return out
+
+class MogiGridSearch:
+    """
+    Global Mogi source search over a fixed (x, y, depth) grid.
+    
+    The observation geometry of a GPS network rarely changes, so the
+    unit-volume Green's functions are computed once per grid and, when
+    ``cache_dir`` is given, stored as ``.npy`` files that are reopened as
+    read-only memory maps. For each epoch the best volume change at every
+    node is a linear solve, so scoring the whole grid is one matrix product.
+    
+    Parameters
+    ----------
+    x_obs, y_obs : np.ndarray
+        Observation coordinates (meters)
+    grid_x, grid_y, grid_depth : np.ndarray
+        1-D grid axes for source x, y and depth (meters)
+    poisson_ratio : float
+        Poisson's ratio of half-space (default 0.25)
+    cache_dir : str, optional
+        Directory for cached Green's function tables
+    """
+    
+    def __init__(self, x_obs: np.ndarray, y_obs: np.ndarray,
+                 grid_x: np.ndarray, grid_y: np.ndarray, grid_depth: np.ndarray,
+                 poisson_ratio: float = 0.25,
+                 cache_dir: Optional[str] = None):
+        self.x_obs = np.asarray(x_obs, dtype=float).ravel()
+        self.y_obs = np.asarray(y_obs, dtype=float).ravel()
+        self.poisson_ratio = poisson_ratio
+        
+        gx, gy, gd = np.meshgrid(np.asarray(grid_x, dtype=float),
+                                 np.asarray(grid_y, dtype=float),
+                                 np.asarray(grid_depth, dtype=float), indexing='ij')
+        self.grid_shape = gx.shape
+        self.nodes = np.column_stack([gx.ravel(), gy.ravel(), gd.ravel()])
+        
+        self.key = _geometry_key(self.x_obs, self.y_obs, grid_x, grid_y, grid_depth,
+                                 poisson_ratio=poisson_ratio)
+        self.table = self._load_table(cache_dir)
+        self._norms = np.einsum('ij,ij->i', self.table, self.table)
+    
+    def _load_table(self, cache_dir: Optional[str]) -> np.ndarray:
+        if cache_dir is None:
+            return build_greens_table(self.x_obs, self.y_obs, self.nodes, self.poisson_ratio)
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, f"mogi_greens_{self.key}.npy")
+        if not os.path.exists(path):
+            shape = (len(self.nodes), 3 * self.x_obs.size)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64,
+                                              shape=shape)
+            build_greens_table(self.x_obs, self.y_obs, self.nodes,
+                               self.poisson_ratio, out=table)
+            table.flush()
+            del table
+            os.replace(tmp_path, path)
+        
+        return np.load(path, mmap_mode='r')
+    
+    def misfit(self, ux_obs, uy_obs, uz_obs) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best volume change and residual sum of squares at every node.
+        
+        Observations may be 1-D (one epoch) or 2-D (n_obs, n_epochs);
+        NaN marks a missing component.
+        
+        Returns
+        -------
+        volume_change, rss : np.ndarray
+            Arrays of shape (n_nodes,) or (n_nodes, n_epochs)
+        """
+        u = np.concatenate([np.asarray(c, dtype=float).reshape(self.x_obs.size, -1)
+                            for c in (ux_obs, uy_obs, uz_obs)])
+        single_epoch = np.ndim(ux_obs) == 1
+        mask = np.isfinite(u).all(axis=1)
+        
+        if mask.all():
+            table, norms = self.table, self._norms
+        else:
+            table = np.asarray(self.table)[:, mask]
+            norms = np.einsum('ij,ij->i', table, table)
+            u = u[mask]
+        
+        projection = table @ u
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume = np.where(norms[:, None] > 0, projection / norms[:, None], 0.0)
+        rss = np.sum(u**2, axis=0)[None, :] - volume * projection
+        
+        if single_epoch:
+            return volume[:, 0], rss[:, 0]
+        return volume, rss
+    
+    def search(self, ux_obs, uy_obs, uz_obs) -> dict:
+        """Best grid node and volume change for one epoch."""
+        volume, rss = self.misfit(ux_obs, uy_obs, uz_obs)
+        best = int(np.argmin(rss))
+        source_x, source_y, source_depth = self.nodes[best]
+        
+        return {
+            'source_x': float(source_x),
+            'source_y': float(source_y),
+            'source_depth': float(source_depth),
+            'volume_change': float(volume[best]),
+            'poisson_ratio': self.poisson_ratio,
+            'residual_norm': float(np.sqrt(max(rss[best], 0.0))),
+            'node_index': best,
+        }
+    
+    def search_epochs(self, ux_obs, uy_obs, uz_obs) -> dict:
+        """
+        Best grid node for every epoch of (n_obs, n_epochs) observations.
+        
+        Returns
+        -------
+        dict
+            Arrays ``source_x``, ``source_y``, ``source_depth``,
+            ``volume_change`` and ``residual_norm`` of length n_epochs
+        """
+        volume, rss = self.misfit(ux_obs, uy_obs, uz_obs)
+        best = np.argmin(rss, axis=0)
+        epochs = np.arange(rss.shape[1])
+        
+        return {
+            'source_x': self.nodes[best, 0],
+            'source_y': self.nodes[best, 1],
+            'source_depth': self.nodes[best, 2],
+            'volume_change': volume[best, epochs],
+            'residual_norm': np.sqrt(np.maximum(rss[best, epochs], 0.0)),
+            'node_index': best,
+        }
+    
+    def refine(self, ux_obs, uy_obs, uz_obs, **kwargs) -> dict:
+        """Grid search followed by the local ``invert_mogi`` optimizer."""
+        coarse = self.search(ux_obs, uy_obs, uz_obs)
+        kwargs.setdefault('n_starts', 1)
+        kwargs.setdefault('initial_depth', coarse['source_depth'])
+        return invert_mogi(ux_obs, uy_obs, uz_obs, self.x_obs, self.y_obs,
+                           poisson_ratio=self.poisson_ratio,
+                           initial_guess=(coarse['source_x'], coarse['source_y'],
+                                          coarse['source_depth']),
+                           **kwargs)
@@ -5,17 +5,67 @@
 
 import numpy as np
 import pandas as pd
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Sequence
+
+DEFAULT_CONFIG = {
+    'weight_horizontal': 0.6,
+    'weight_vertical': 0.4,
+    'threshold_slow': 10,  # mm/day for slow deformation
+    'threshold_rapid': 50,  # mm/day for rapid deformation
+}
+
+def _regression_slope(t: np.ndarray, y: np.ndarray) -> float:
+    """Least-squares slope of y against t, ignoring NaN samples."""
+    valid = np.isfinite(t) & np.isfinite(y)
+    if valid.sum() < 2:
+        return 0.0
+    
+    t = t[valid] - t[valid].mean()
+    denom = np.dot(t, t)
+    if denom == 0:
+        return 0.0
+    return float(np.dot(t, y[valid] - y[valid].mean()) / denom)
+
+def _deformation_score(horizontal_rate, vertical_rate, config: Dict):
+    """
+    Combine horizontal and vertical rates (mm/day) into D(t) in [0, 1].
+    
+    Works element-wise on arrays; NaN marks a missing component, which is
+    then left out of the weighted average.
+    """
+    horizontal_rate = np.asarray(horizontal_rate, dtype=float)
+    vertical_rate = np.asarray(vertical_rate, dtype=float)
+    
+    # Normalize rates (uplift is typically smaller than horizontal)
+    horizontal_norm = np.minimum(np.abs(horizontal_rate) / config['threshold_rapid'], 1.0)
+    vertical_norm = np.minimum(np.abs(vertical_rate) / (config['threshold_rapid'] * 0.5), 1.0)
+    
+    has_h = np.isfinite(horizontal_norm)
+    has_v = np.isfinite(vertical_norm)
+    weighted = (np.where(has_h, config['weight_horizontal'] * horizontal_norm, 0.0) +
+                np.where(has_v, config['weight_vertical'] * vertical_norm, 0.0))
+    total_weight = (has_h * config['weight_horizontal'] + has_v * config['weight_vertical'])
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        d_index = np.where(total_weight > 0, weighted / total_weight, 0.0)
+    
+    # Ensure value is in [0, 1]
+    return np.clip(d_index, 0.0, 1.0)
 
 def calculate_deformation(gps_data: pd.DataFrame, 
                          config: Optional[Dict] = None) -> float:
     """
     Calculate Deformation Index D(t).
     
+    Velocities are least-squares rates over the whole series rather than
+    the difference of the first and last samples, so a single noisy epoch
+    does not dominate the index.
+    
     Parameters
     ----------
     gps_data : pd.DataFrame
         GPS deformation data with columns: time, easting, northing, vertical
+        (positions in mm; without a time column samples are taken as daily)
     config : dict, optional
         Configuration parameters
         
@@ -28,80 +78,267 @@ def calculate_deformation(gps_data: pd.DataFrame,
         return 0.0
     
     if config is None:
-        config = {
-            'weight_horizontal': 0.6,
-            'weight_vertical': 0.4,
-            'threshold_slow': 10,  # mm/day for slow deformation
-            'threshold_rapid': 50,  # mm/day for rapid deformation
-        }
+        config = DEFAULT_CONFIG
+    
+    # Time axis in days (not written back to the caller's frame)
+    if 'time' in gps_data.columns:
+        times = pd.to_datetime(gps_data['time'])
+        t = ((times - times.iloc[0]).dt.total_seconds() / 86400).to_numpy(dtype=float)
+    else:
+        t = np.arange(len(gps_data), dtype=float)
     
-    # Calculate deformation rates
-    deformation_metrics = {}
+    def rate(column: str) -> float:
+        return _regression_slope(t, gps_data[column].to_numpy(dtype=float))
     
+    horizontal_rate = np.nan
+    vertical_rate = np.nan
     if 'easting' in gps_data.columns and 'northing' in gps_data.columns:
-        # Calculate horizontal deformation
-        easting_change = gps_data['easting'].iloc[-1] - gps_data['easting'].iloc[0]
-        northing_change = gps_data['northing'].iloc[-1] - gps_data['northing'].iloc[0]
-        
-        horizontal_deformation = np.sqrt(easting_change**2 + northing_change**2)
-        
-        # Calculate time span in days
-        if 'time' in gps_data.columns:
-            gps_data['time'] = pd.to_datetime(gps_data['time'])
-            time_span = (gps_data['time'].iloc[-1] - gps_data['time'].iloc[0]).total_seconds() / 86400
-            if time_span > 0:
-                horizontal_rate = abs(horizontal_deformation) / time_span
-            else:
-                horizontal_rate = 0.0
-        else:
-            horizontal_rate = abs(horizontal_deformation)
+        horizontal_rate = np.hypot(rate('easting'), rate('northing'))
+    if 'vertical' in gps_data.columns:
+        vertical_rate = rate('vertical')
+    
+    return float(_deformation_score(horizontal_rate, vertical_rate, config))
+
+def calculate_insar_deformation(velocity_map: np.ndarray, percentile: float = 99.0,
+                                config: Optional[Dict] = None) -> float:
+    """
+    Calculate Deformation Index D(t) from an InSAR LOS velocity map.
+
+    LOS motion is scored as the vertical component, using a high
+    percentile of the absolute rate so a few unwrapping errors do not
+    set the index.
+
+    Parameters
+    ----------
+    velocity_map : np.ndarray
+        LOS velocities in meters per year (e.g. the ``velocity`` output of
+        ``preprocessing.insar_processing.sbas_invert``); NaN pixels ignored
+    percentile : float
+        Percentile of the absolute rate used for the index
+    config : dict, optional
+        Configuration parameters
+
+    Returns
+    -------
+    float
+        Deformation Index normalized to [0, 1]
+    """
+    rates = np.abs(np.asarray(velocity_map, dtype=float))
+    rates = rates[np.isfinite(rates)]
+    if rates.size == 0:
+        return 0.0
+
+    if config is None:
+        config = DEFAULT_CONFIG
+
+    # m/yr -> mm/day
+    vertical_rate = np.percentile(rates, percentile) * 1000.0 / 365.25
+    return float(_deformation_score(np.nan, vertical_rate, config))
+
+class StreamingDeformation:
+    """
+    Sliding-window GPS velocities and D(t) for a whole station network.
+    
+    Every station keeps running regression sums (n, sum t, sum t^2,
+    sum y, sum t*y) over the last ``window`` epochs, so adding an epoch
+    costs O(1) per station and all stations are updated in one vectorized
+    step. The sums are rebuilt from the window buffer once per window
+    length to bound floating-point drift.
+    
+    Parameters
+    ----------
+    stations : sequence of str
+        Station codes, in the column order of the positions passed to
+        ``update``
+    window : int
+        Number of epochs in the regression window
+    outlier_threshold : float, optional
+        Reject epochs whose residual from the current fit exceeds this many
+        running standard deviations (``None`` disables rejection)
+    max_consecutive_outliers : int
+        After this many consecutive rejections a station is assumed to have
+        a real offset and its window is restarted at the new level
+    config : dict, optional
+        Configuration parameters (as for ``calculate_deformation``)
+    """
+    
+    def __init__(self, stations: Sequence[str], window: int = 288,
+                 outlier_threshold: Optional[float] = None,
+                 max_consecutive_outliers: int = 10,
+                 config: Optional[Dict] = None):
+        if window < 2:
+            raise ValueError(f"window must be at least 2 epochs, got {window}")
+        
+        self.stations = list(stations)
+        self.window = int(window)
+        self.outlier_threshold = outlier_threshold
+        self.max_consecutive_outliers = max_consecutive_outliers
+        self.config = config or DEFAULT_CONFIG
+        
+        n = len(self.stations)
+        self._times = np.zeros(self.window)
+        self._positions = np.zeros((self.window, n, 3))
+        self._valid = np.zeros((self.window, n), dtype=bool)
+        self._head = 0
+        self._epochs = 0
+        self._origin: Optional[float] = None
+        
+        self._n = np.zeros(n)
+        self._st = np.zeros(n)
+        self._stt = np.zeros(n)
+        self._sy = np.zeros((n, 3))
+        self._sty = np.zeros((n, 3))
         
-        # Normalize rate
-        horizontal_norm = min(horizontal_rate / config['threshold_rapid'], 1.0)
-        deformation_metrics['horizontal'] = horizontal_norm
+        self._scale = np.full((n, 3), np.nan)
+        self._rejections = np.zeros(n, dtype=int)
+        self.outliers = np.zeros(n, dtype=int)
     
-    if 'vertical' in gps_data.columns:
-        # Calculate vertical deformation
-        vertical_change = gps_data['vertical'].iloc[-1] - gps_data['vertical'].iloc[0]
+    def _accumulate(self, t: np.ndarray, y: np.ndarray, weight: np.ndarray):
+        """Add (weight=1) or remove (weight=-1) one sample per station."""
+        self._n += weight
+        self._st += weight * t
+        self._stt += weight * t * t
+        self._sy += weight[:, None] * y
+        self._sty += (weight * t)[:, None] * y
+    
+    def _rebuild(self):
+        """Recompute the sums from the window buffer with a fresh time origin."""
+        filled = min(self._epochs, self.window)
+        shift = self._times[:filled].min()
+        self._origin += shift
+        self._times[:filled] -= shift
+        
+        valid = self._valid[:filled].astype(float)
+        t = self._times[:filled, None] * valid
+        y = np.where(self._valid[:filled, :, None], self._positions[:filled], 0.0)
+        self._n = valid.sum(axis=0)
+        self._st = t.sum(axis=0)
+        self._stt = (t * t).sum(axis=0)
+        self._sy = y.sum(axis=0)
+        self._sty = (t[:, :, None] * y).sum(axis=0)
+    
+    def _fit(self):
+        """Intercepts and slopes (per day) of the current window, per station."""
+        denom = self._n * self._stt - self._st ** 2
+        ok = (self._n >= 2) & (denom > 1e-12 * np.maximum(self._n * self._stt, 1.0))
+        safe = np.where(ok, denom, 1.0)
+        slope = (self._n[:, None] * self._sty - self._st[:, None] * self._sy) / safe[:, None]
+        slope[~ok] = 0.0
+        safe_n = np.maximum(self._n, 1.0)
+        intercept = (self._sy - slope * self._st[:, None]) / safe_n[:, None]
+        return intercept, slope, ok
+    
+    def reset_station(self, index: int):
+        """Forget a station's window (e.g. after an antenna change)."""
+        self._valid[:, index] = False
+        self._n[index] = self._st[index] = self._stt[index] = 0.0
+        self._sy[index] = self._sty[index] = 0.0
+        self._scale[index] = np.nan
+        self._rejections[index] = 0
+    
+    def update(self, time, positions: np.ndarray):
+        """
+        Add one network epoch.
         
-        if 'time' in gps_data.columns and time_span > 0:
-            vertical_rate = abs(vertical_change) / time_span
+        Parameters
+        ----------
+        time : timestamp or float
+            Epoch time (a float is taken to be in days)
+        positions : np.ndarray
+            Array of shape (n_stations, 3) with east, north, up positions
+            (mm); NaN rows mark stations without a solution
+        """
+        if isinstance(time, (int, float, np.integer, np.floating)):
+            t_days = float(time)
         else:
-            vertical_rate = abs(vertical_change)
+            t_days = pd.Timestamp(time).value / 86400e9
+        if self._origin is None:
+            self._origin = t_days
+        t = t_days - self._origin
+        
+        y = np.asarray(positions, dtype=float).reshape(len(self.stations), 3)
+        valid = np.isfinite(y).all(axis=1)
+        y = np.where(valid[:, None], y, 0.0)
+        
+        if self.outlier_threshold is not None:
+            valid = self._screen_outliers(t, y, valid)
         
-        # Normalize rate (uplift is typically smaller than horizontal)
-        vertical_norm = min(vertical_rate / (config['threshold_rapid'] * 0.5), 1.0)
-        deformation_metrics['vertical'] = vertical_norm
+        # Evict the sample this epoch overwrites
+        head = self._head
+        if self._epochs >= self.window:
+            old_valid = self._valid[head]
+            self._accumulate(np.full(len(self.stations), self._times[head]),
+                             self._positions[head], -old_valid.astype(float))
+        
+        self._times[head] = t
+        self._positions[head] = y
+        self._valid[head] = valid
+        self._accumulate(np.full(len(self.stations), t), y, valid.astype(float))
+        
+        self._head = (head + 1) % self.window
+        self._epochs += 1
+        if self._head == 0:
+            self._rebuild()
     
-    # If no specific deformation calculated, use random value for demo
-    if not deformation_metrics:
-        # For demo purposes, return random value
-        d_index = np.random.uniform(0.2, 0.7)
-    else:
-        # Calculate weighted index
-        d_index = 0.0
-        total_weight = 0.0
+    def _screen_outliers(self, t: float, y: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        intercept, slope, ok = self._fit()
+        residual = np.abs(y - (intercept + slope * t))
         
-        if 'horizontal' in deformation_metrics:
-            d_index += config['weight_horizontal'] * deformation_metrics['horizontal']
-            total_weight += config['weight_horizontal']
+        # Screen only once the fit and the noise scale are established
+        settled = ok & (self._n >= min(10, self.window))
+        known = settled[:, None] & np.isfinite(self._scale)
+        limit = self.outlier_threshold * self._scale
+        outlier = valid & (known & (residual > limit)).any(axis=1)
         
-        if 'vertical' in deformation_metrics:
-            d_index += config['weight_vertical'] * deformation_metrics['vertical']
-            total_weight += config['weight_vertical']
+        # A sustained run of "outliers" is a real offset: restart the window
+        self._rejections = np.where(outlier, self._rejections + 1, 0)
+        for index in np.flatnonzero(self._rejections > self.max_consecutive_outliers):
+            self.reset_station(int(index))
+            outlier[index] = False
         
-        if total_weight > 0:
-            d_index /= total_weight
-        else:
-            d_index = 0.0
+        self.outliers += outlier
+        accepted = valid & ~outlier
+        
+        # Running standard deviation from the mean absolute residual
+        sigma = 1.2533 * residual
+        update = accepted[:, None] & ok[:, None]
+        alpha = 0.05
+        self._scale = np.where(
+            update,
+            np.where(np.isfinite(self._scale), (1 - alpha) * self._scale + alpha * sigma, sigma),
+            self._scale)
+        return accepted
     
-    # Add some noise for demo
-    d_index += np.random.uniform(-0.05, 0.05)
+    def velocities(self) -> np.ndarray:
+        """Per-station (east, north, up) velocities in mm/day; NaN if unknown."""
+        _, slope, ok = self._fit()
+        return np.where(ok[:, None], slope, np.nan)
     
-    # Ensure value is in [0, 1]
-    d_index = max(0.0, min(1.0, d_index))
+    def station_indices(self) -> np.ndarray:
+        """Per-station D(t) values from the windowed velocities."""
+        velocity = self.velocities()
+        horizontal = np.hypot(velocity[:, 0], velocity[:, 1])
+        return _deformation_score(horizontal, velocity[:, 2], self.config)
     
-    return float(d_index)
+    def deformation_index(self, aggregate: str = 'max') -> float:
+        """
+        Network Deformation Index D(t).
+        
+        Parameters
+        ----------
+        aggregate : str
+            How station indices are combined: ``'max'``, ``'mean'`` or
+            ``'median'``
+        """
+        _, _, ok = self._fit()
+        if not ok.any():
+            return 0.0
+        
+        reducers: Dict[str, Callable[..., Any]] = {'max': np.max, 'mean': np.mean,
+                                                   'median': np.median}
+        if aggregate not in reducers:
+            raise ValueError(f"Unknown aggregate '{aggregate}'")
+        return float(reducers[aggregate](self.station_indices()[ok]))
 
 def calculate_inflation_rate(deformation_data: pd.DataFrame) -> float:
     """
@@ -1,13 +1,89 @@
 """
-Gas Flux
-parameters/gas_flux.py
-
-Module for gas flux.
+Gas Flux Index (G(t)) calculation.
+Measures degassing from SO2 flux, its trend and the CO2/SO2 ratio.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict
+
+DEFAULT_CONFIG = {
+    'weight_flux': 0.5,
+    'weight_trend': 0.2,
+    'weight_ratio': 0.3,
+    'so2_flux_high': 5000.0,   # t/day scored as 1.0
+    'so2_trend_high': 1000.0,  # t/day per day scored as 1.0
+    'co2_so2_low': 2.0,        # molar ratio of shallow, degassed magma
+    'co2_so2_high': 20.0,      # molar ratio of deep, gas-rich recharge
+}
+
+def _gas_score(flux, trend, ratio, config: Dict) -> float:
+    """
+    Combine SO2 flux (t/day), its trend (t/day per day) and the CO2/SO2
+    ratio into G(t) in [0, 1]; NaN components are left out of the average.
+    """
+    flux_norm = np.clip(flux / config['so2_flux_high'], 0.0, 1.0)
+    trend_norm = np.clip(trend / config['so2_trend_high'], 0.0, 1.0)
+    ratio_norm = np.clip(
+        np.log(ratio / config['co2_so2_low']) /
+        np.log(config['co2_so2_high'] / config['co2_so2_low']), 0.0, 1.0
+    ) if ratio > 0 else np.nan
+
+    components = np.array([flux_norm, trend_norm, ratio_norm], dtype=float)
+    weights = np.array([config['weight_flux'], config['weight_trend'], config['weight_ratio']])
+    present = np.isfinite(components)
+    if not present.any():
+        return 0.0
+
+    g_index = np.dot(weights[present], components[present]) / weights[present].sum()
+    return float(np.clip(g_index, 0.0, 1.0))
+
+def calculate_gas_flux(gas_data: pd.DataFrame,
+                       config: Optional[Dict] = None) -> float:
+    """
+    Calculate Gas Flux Index G(t).
+
+    Uses the median SO2 flux and its least-squares trend over the window,
+    and the median of the valid CO2/SO2 ratios, so single bad scans or
+    out-of-plume readings do not set the index.
+
+    Parameters
+    ----------
+    gas_data : pd.DataFrame
+        Gas data with columns time, so2_flux (t/day) and optionally
+        co2_so2 (molar ratio), e.g. the merged outputs of
+        ``preprocessing.gas_processing.GasStreamProcessor``
+    config : dict, optional
+        Configuration parameters
+
+    Returns
+    -------
+    float
+        Gas Flux Index normalized to [0, 1]
+    """
+    if gas_data.empty:
+        return 0.0
+
+    if config is None:
+        config = DEFAULT_CONFIG
+
+    flux = trend = ratio = np.nan
+    if 'so2_flux' in gas_data.columns:
+        so2 = gas_data['so2_flux'].to_numpy(dtype=float)
+        valid = np.isfinite(so2)
+        if valid.any():
+            flux = float(np.median(so2[valid]))
+        if 'time' in gas_data.columns and valid.sum() >= 2:
+            times = pd.to_datetime(gas_data['time'])
+            t = ((times - times.iloc[0]).dt.total_seconds() / 86400).to_numpy(dtype=float)
+            t = t[valid] - t[valid].mean()
+            if np.dot(t, t) > 0:
+                trend = float(np.dot(t, so2[valid] - so2[valid].mean()) / np.dot(t, t))
+
+    if 'co2_so2' in gas_data.columns:
+        ratios = gas_data['co2_so2'].to_numpy(dtype=float)
+        ratios = ratios[np.isfinite(ratios)]
+        if ratios.size:
+            ratio = float(np.median(ratios))
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    return _gas_score(flux, trend, ratio, config)
@@ -1,13 +1,372 @@
 """
-Lyapunov
-parameters/lyapunov.py
-
-Module for lyapunov.
+Lyapunov Exponent (L(t)) calculation.
+Measures dynamical instability of a monitoring time series (e.g. hourly
+tremor amplitude) from its largest Lyapunov exponent.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict, Tuple, Union
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.spatial import cKDTree
+
+DEFAULT_CONFIG = {
+    'embedding_dimension': 3,
+    'delay': None,          # samples; None estimates it from the autocorrelation
+    'theiler': None,        # samples; None uses the mean period of the series
+    'horizon': 20,          # divergence steps followed
+    'fit_steps': 8,         # leading steps used for the slope
+    'lambda_high': 0.5,     # exponent (per sample) scored as 1.0
+}
+
+ArrayLike = Union[np.ndarray, pd.Series, pd.DataFrame]
+
+def _as_series(time_series: ArrayLike) -> np.ndarray:
+    """Values of a time series; DataFrames use 'value' or their first numeric column."""
+    if isinstance(time_series, pd.DataFrame):
+        if 'value' in time_series.columns:
+            time_series = time_series['value']
+        else:
+            numeric = time_series.select_dtypes('number')
+            if numeric.empty:
+                return np.empty(0)
+            time_series = numeric.iloc[:, 0]
+    values = np.asarray(time_series, dtype=float).ravel()
+    return values[np.isfinite(values)]
+
+def estimate_delay(x: np.ndarray, max_lag: Optional[int] = None) -> int:
+    """Embedding delay: first lag where the autocorrelation drops below 1/e."""
+    x = np.asarray(x, dtype=float) - np.mean(x)
+    n = x.size
+    if n < 4 or not np.any(x):
+        return 1
+    spectrum = np.fft.rfft(x, 2 * n)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    acf /= acf[0]
+    max_lag = max_lag or n // 10
+    below = np.flatnonzero(acf[1:max_lag + 1] < 1 / np.e)
+    return int(below[0] + 1) if below.size else max(1, max_lag)
+
+def mean_period(x: np.ndarray) -> int:
+    """Mean period (samples) from the power-weighted mean frequency."""
+    x = np.asarray(x, dtype=float) - np.mean(x)
+    power = np.abs(np.fft.rfft(x)) ** 2
+    freqs = np.fft.rfftfreq(x.size)
+    if power[1:].sum() == 0:
+        return 1
+    mean_freq = np.dot(freqs[1:], power[1:]) / power[1:].sum()
+    return int(np.ceil(1.0 / mean_freq)) if mean_freq > 0 else 1
+
+def delay_embedding(x: np.ndarray, dimension: int, delay: int) -> np.ndarray:
+    """
+    Delay vectors [x_i, x_{i+delay}, ..., x_{i+(dimension-1)delay}].
+
+    Returns a strided view of ``x`` of shape (points, dimension); no data
+    is copied.
+    """
+    span = (dimension - 1) * delay + 1
+    if x.size < span:
+        return np.empty((0, dimension))
+    return sliding_window_view(x, span)[:, ::delay]
+
+def _squared_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances between the rows of ``a`` and ``b``."""
+    return np.einsum('ijk,ijk->ij', a[:, None, :] - b[None, :, :], a[:, None, :] - b[None, :, :])
+
+def _dense_neighbours(points: np.ndarray, rows: np.ndarray, theiler: int,
+                      block: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest neighbour (index, squared distance) of ``points[rows]`` outside
+    the Theiler window, by blocked brute force; index -1 when there is none.
+    """
+    index = np.arange(len(points))
+    neighbour = np.full(rows.size, -1)
+    distance = np.full(rows.size, np.inf)
+    for start in range(0, rows.size, block):
+        chunk = rows[start:start + block]
+        d2 = _squared_distances(points[chunk], points)
+        d2[np.abs(chunk[:, None] - index[None, :]) <= theiler] = np.inf
+        best = np.argmin(d2, axis=1)
+        found = np.isfinite(d2[np.arange(chunk.size), best])
+        neighbour[start:start + chunk.size] = np.where(found, best, -1)
+        distance[start:start + chunk.size] = d2[np.arange(chunk.size), best]
+    return neighbour, distance
+
+def _nearest_neighbours(points: np.ndarray, theiler: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest neighbour of every point outside its Theiler window.
+
+    Uses a KD-tree k-query, doubling k only for the points whose k
+    nearest neighbours are all temporal neighbours. When the Theiler
+    window covers a large share of the points the k-query degenerates
+    into a scan of the whole tree, and a blocked dense pass is faster.
+    """
+    n = len(points)
+    k = min(n, 2 * theiler + 8)
+    if 4 * k >= n:
+        neighbour, _ = _dense_neighbours(points, np.arange(n), theiler)
+        valid = neighbour >= 0
+        return np.flatnonzero(valid), neighbour[valid]
+
+    tree = cKDTree(points)
+    index = np.arange(n)
+    neighbour = np.full(n, -1)
+    pending = index
+    while pending.size:
+        _, found = tree.query(points[pending], k=k)
+        found = np.atleast_2d(found).reshape(pending.size, -1)
+        ok = (np.abs(found - pending[:, None]) > theiler) & (found < n)
+        has = ok.any(axis=1)
+        neighbour[pending[has]] = found[has, np.argmax(ok[has], axis=1)]
+        if k >= n:
+            break
+        pending = pending[~has]
+        k = min(n, 2 * k)
+    valid = neighbour >= 0
+    return index[valid], neighbour[valid]
+
+def divergence_curve(points: np.ndarray, theiler: int, horizon: int,
+                     pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """
+    Mean log distance between initially nearest trajectories (Rosenstein et al., 1993).
+
+    Parameters
+    ----------
+    points : np.ndarray
+        Delay vectors of shape (points, dimension)
+    theiler : int
+        Minimum temporal separation of neighbours
+    horizon : int
+        Number of steps to follow each pair
+    pairs : (np.ndarray, np.ndarray), optional
+        Precomputed (point, nearest neighbour) indices
+
+    Returns
+    -------
+    np.ndarray
+        Mean log divergence for steps 0 .. horizon - 1 (NaN where no pair
+        can be followed that far)
+    """
+    n = len(points)
+    curve = np.full(horizon, np.nan)
+    if n < 2:
+        return curve
+    i, j = _nearest_neighbours(points, theiler) if pairs is None else pairs
+    if i.size == 0:
+        return curve
+
+    steps = np.arange(horizon)
+    ii = i[:, None] + steps
+    jj = j[:, None] + steps
+    valid = (ii < n) & (jj < n)
+    ii, jj = np.where(valid, ii, 0), np.where(valid, jj, 0)
+    distance = np.linalg.norm(points[ii] - points[jj], axis=2)
+    valid &= distance > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.where(valid, np.log(np.where(valid, distance, 1.0)), 0.0)
+        counts = valid.sum(axis=0)
+        curve = np.where(counts > 0, logs.sum(axis=0) / np.maximum(counts, 1), np.nan)
+    return curve
+
+def _curve_slope(curve: np.ndarray, fit_steps: int) -> float:
+    y = curve[:fit_steps]
+    t = np.arange(y.size, dtype=float)
+    ok = np.isfinite(y)
+    if ok.sum() < 2:
+        return 0.0
+    t, y = t[ok] - t[ok].mean(), y[ok]
+    return float(np.dot(t, y - y.mean()) / np.dot(t, t))
+
+def largest_lyapunov_exponent(x: np.ndarray, dimension: int = 3,
+                              delay: Optional[int] = None,
+                              theiler: Optional[int] = None,
+                              horizon: int = 20, fit_steps: int = 8,
+                              dt: float = 1.0) -> float:
+    """
+    Largest Lyapunov exponent by the Rosenstein method.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Evenly sampled series
+    dimension, delay : int
+        Embedding dimension and delay (delay estimated when ``None``)
+    theiler : int, optional
+        Minimum temporal separation of neighbours (default: mean period)
+    horizon, fit_steps : int
+        Steps of divergence followed, and leading steps fitted
+    dt : float
+        Sampling interval; the exponent is returned per unit of ``dt``
+
+    Returns
+    -------
+    float
+        Largest Lyapunov exponent
+    """
+    x = np.asarray(x, dtype=float)
+    if delay is None:
+        delay = estimate_delay(x)
+    if theiler is None:
+        theiler = mean_period(x)
+    points = delay_embedding(x, dimension, delay)
+    if len(points) <= 2 * theiler + 2:
+        return 0.0
+    return _curve_slope(divergence_curve(points, theiler, horizon), fit_steps) / dt
+
+def calculate_lyapunov(time_series: ArrayLike,
+                       config: Optional[Dict] = None) -> float:
+    """
+    Calculate Lyapunov Index L(t).
+
+    Parameters
+    ----------
+    time_series : array-like or pd.DataFrame
+        Evenly sampled series, e.g. hourly RSAM; DataFrames use their
+        'value' column or first numeric column
+    config : dict, optional
+        Configuration parameters
+
+    Returns
+    -------
+    float
+        Lyapunov Index normalized to [0, 1]
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    x = _as_series(time_series)
+    if x.size < 10:
+        return 0.0
+
+    exponent = largest_lyapunov_exponent(
+        x, config['embedding_dimension'], config['delay'], config['theiler'],
+        config['horizon'], config['fit_steps'])
+    return float(np.clip(exponent / config['lambda_high'], 0.0, 1.0))
+
+class StreamingLyapunov:
+    """
+    Sliding-window L(t) that reuses work between cycles.
+
+    Samples are kept in a buffer of twice the window length and the delay
+    vectors are a strided view of it, so appending a sample never
+    re-embeds the series; the buffer is compacted once per window. The
+    nearest neighbour of every delay vector is cached: a new vector is
+    searched against the window, retained vectors only check whether a new
+    one is closer, and vectors whose neighbour has left the window are
+    searched again. Each new sample therefore costs O(W) instead of
+    rebuilding the neighbour search over the whole window, and the result
+    equals the batch estimate on the same window.
+
+    Parameters
+    ----------
+    window : int
+        Samples per estimate (e.g. 720 for 30 days of hourly data)
+    config : dict, optional
+        Configuration parameters (as for ``calculate_lyapunov``). A
+        ``None`` delay or Theiler window is estimated from the first full
+        window and then kept fixed, so estimates stay comparable.
+    """
+
+    def __init__(self, window: int = 720, config: Optional[Dict] = None):
+        self.window = int(window)
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.delay = self.config['delay']
+        self.theiler = self.config['theiler']
+
+        self._buffer = np.empty(2 * self.window)
+        self._end = 0
+        self._total = 0
+        self._exponent: Optional[float] = None
+
+        # Cached neighbours: absolute point index and squared distance
+        self._first = 0
+        self._neighbour = np.empty(0, dtype=int)
+        self._distance = np.empty(0)
+
+    def __len__(self) -> int:
+        return min(self._end, self.window)
+
+    def update(self, values) -> None:
+        """Append one or more samples (NaN samples are skipped)."""
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        values = values[np.isfinite(values)][-self.window:]
+        if values.size == 0:
+            return
+
+        if self._end + values.size > self._buffer.size:
+            keep = self.window - values.size
+            self._buffer[:keep] = self._buffer[self._end - keep:self._end]
+            self._end = keep
+        self._buffer[self._end:self._end + values.size] = values
+        self._end += values.size
+        self._total += values.size
+        self._exponent = None
+
+    def samples(self) -> np.ndarray:
+        """View of the samples in the current window."""
+        return self._buffer[max(0, self._end - self.window):self._end]
+
+    def _update_neighbours(self, points: np.ndarray, first: int) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(points)
+        theiler = self.theiler
+        neighbour = np.full(n, -1)
+        distance = np.full(n, np.inf)
+
+        # Carry over the points that are still in the window
+        old_first, old_n = self._first, self._neighbour.size
+        lo, hi = max(first, old_first), min(first + n, old_first + old_n)
+        n_old = max(0, hi - first) if hi > lo else 0
+        if n_old:
+            neighbour[lo - first:hi - first] = self._neighbour[lo - old_first:hi - old_first]
+            distance[lo - first:hi - first] = self._distance[lo - old_first:hi - old_first]
+        expired = neighbour < first
+        neighbour[expired] = -1
+        distance[expired] = np.inf
+
+        # A new point may be closer than a retained point's neighbour
+        if 0 < n_old < n:
+            d2 = _squared_distances(points[:n_old], points[n_old:])
+            index = np.arange(n)
+            d2[np.abs(index[:n_old, None] - index[None, n_old:]) <= theiler] = np.inf
+            best = np.argmin(d2, axis=1)
+            closer = d2[np.arange(n_old), best] < distance[:n_old]
+            closer &= neighbour[:n_old] >= 0
+            neighbour[:n_old][closer] = first + n_old + best[closer]
+            distance[:n_old][closer] = d2[np.arange(n_old), best][closer]
+
+        # Full search for new points and points whose neighbour expired
+        redo = np.flatnonzero(neighbour < 0)
+        if redo.size:
+            found, d2 = _dense_neighbours(points, redo, theiler)
+            neighbour[redo] = np.where(found >= 0, first + found, -1)
+            distance[redo] = d2
+
+        self._first, self._neighbour, self._distance = first, neighbour, distance
+        valid = neighbour >= 0
+        return np.flatnonzero(valid), neighbour[valid] - first
+
+    def exponent(self) -> float:
+        """Largest Lyapunov exponent (per sample) of the current window."""
+        if self._exponent is not None:
+            return self._exponent
+
+        x = self.samples()
+        cfg = self.config
+        if x.size < self.window:
+            return 0.0
+        if self.delay is None:
+            self.delay = estimate_delay(x)
+        if self.theiler is None:
+            self.theiler = mean_period(x)
+
+        points = delay_embedding(x, cfg['embedding_dimension'], self.delay)
+        if len(points) <= 2 * self.theiler + 2:
+            self._exponent = 0.0
+        else:
+            pairs = self._update_neighbours(points, self._total - x.size)
+            curve = divergence_curve(points, self.theiler, cfg['horizon'], pairs)
+            self._exponent = _curve_slope(curve, cfg['fit_steps'])
+        return self._exponent
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    def value(self) -> float:
+        """L(t) of the current window, normalized to [0, 1]."""
+        return float(np.clip(self.exponent() / self.config['lambda_high'], 0.0, 1.0))
@@ -1,13 +1,82 @@
 """
-Pressure
-parameters/pressure.py
-
-Module for pressure.
+Pressure Index (P(t)) calculation.
+Measures magmatic pressurization from b-value drop and seismic energy release.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict
+
+from .seismic_pulse import calculate_b_value
+
+DEFAULT_CONFIG = {
+    'weight_b_value': 0.5,
+    'weight_energy': 0.5,
+    'mc': 1.0,                   # magnitude of completeness for the b-value
+    'b_value_reference': 1.0,    # background (tectonic) b-value scored as 0.0
+    'b_value_low': 0.6,          # b-value of a highly stressed source scored as 1.0
+    'energy_rate_low': 1e8,      # J/day scored as 0.0
+    'energy_rate_high': 1e13,    # J/day scored as 1.0
+}
+
+def seismic_energy(magnitudes: np.ndarray) -> np.ndarray:
+    """Radiated seismic energy in joules (Gutenberg-Richter, log10 E = 1.5M + 4.8)."""
+    return 10.0 ** (1.5 * np.asarray(magnitudes, dtype=float) + 4.8)
+
+def _energy_rate(seismic_data: pd.DataFrame) -> float:
+    """Seismic energy release rate in J/day (one-day window if untimed)."""
+    mags = seismic_data['magnitude'].to_numpy(dtype=float)
+    mags = mags[np.isfinite(mags)]
+    if mags.size == 0:
+        return 0.0
+
+    days = 1.0
+    if 'time' in seismic_data.columns and len(seismic_data) > 1:
+        times = pd.to_datetime(seismic_data['time'])
+        days = max((times.max() - times.min()).total_seconds() / 86400, 1.0)
+
+    return float(seismic_energy(mags).sum() / days)
+
+def _pressure_score(b_value: float, energy_rate: float, config: Dict) -> float:
+    """Combine b-value drop and energy release rate into P(t) in [0, 1]."""
+    b_span = config['b_value_reference'] - config['b_value_low']
+    b_norm = np.clip((config['b_value_reference'] - b_value) / b_span, 0.0, 1.0)
+
+    if energy_rate > 0:
+        low, high = np.log10(config['energy_rate_low']), np.log10(config['energy_rate_high'])
+        energy_norm = np.clip((np.log10(energy_rate) - low) / (high - low), 0.0, 1.0)
+    else:
+        energy_norm = 0.0
+
+    p_index = config['weight_b_value'] * b_norm + config['weight_energy'] * energy_norm
+    return float(np.clip(p_index, 0.0, 1.0))
+
+def calculate_pressure(seismic_data: pd.DataFrame,
+                       config: Optional[Dict] = None) -> float:
+    """
+    Calculate Pressure Index P(t).
+
+    A falling b-value and an accelerating release of seismic energy both
+    indicate rising stress around a pressurizing source. The index reads
+    the same earthquake catalog as S(t).
+
+    Parameters
+    ----------
+    seismic_data : pd.DataFrame
+        Earthquake catalog with columns time and magnitude
+    config : dict, optional
+        Configuration parameters
+
+    Returns
+    -------
+    float
+        Pressure Index normalized to [0, 1]
+    """
+    if seismic_data.empty or 'magnitude' not in seismic_data.columns:
+        return 0.0
+
+    if config is None:
+        config = DEFAULT_CONFIG
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    b_value = calculate_b_value(seismic_data, mc=config['mc'])
+    return _pressure_score(b_value, _energy_rate(seismic_data), config)
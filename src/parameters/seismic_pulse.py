@@ -5,10 +5,107 @@
 
 import numpy as np
 import pandas as pd
-from typing import Optional, Dict, Any
+from collections import deque
+from typing import Optional, Dict, Deque, Tuple
+
+DEFAULT_CONFIG = {
+    'weight_rate': 0.4,
+    'weight_magnitude': 0.3,
+    'weight_depth': 0.2,
+    'weight_tremor': 0.1,
+    'tremor_recent_samples': 6,   # RSAM samples compared with the background
+    'tremor_ratio_max': 10.0,     # recent/background RSAM ratio scored as 1.0
+}
+
+def _rate_factor(n_events: int, time_range: float) -> float:
+    """Normalized earthquake rate (100 events/day = 1.0)."""
+    if time_range > 0:
+        rate = n_events / (time_range / 86400)  # events per day
+        return min(rate / 100, 1.0)
+    return 0.0
+
+def _magnitude_factor(avg_magnitude: float) -> float:
+    """Normalized mean magnitude (M4 = 1.0)."""
+    return min(avg_magnitude / 4.0, 1.0)
+
+def _depth_factor(avg_depth: float) -> float:
+    """Shallow earthquakes weighted higher (0km = 1.0, 20km = 0.0)."""
+    return max(0, 1.0 - (avg_depth / 20.0))
+
+def _combine_factors(rate_norm: float, mag_factor: float, depth_factor: float,
+                     tremor_factor: Optional[float], config: Dict) -> float:
+    """Weighted S(t) from its component factors, clipped to [0, 1]."""
+    s_index = (
+        config['weight_rate'] * rate_norm +
+        config['weight_magnitude'] * mag_factor +
+        config['weight_depth'] * depth_factor
+    )
+    if tremor_factor is None:
+        # No tremor information: renormalize over the catalog factors
+        s_index /= config['weight_rate'] + config['weight_magnitude'] + config['weight_depth']
+    else:
+        s_index += config['weight_tremor'] * tremor_factor
+    
+    # Ensure value is in [0, 1]
+    return float(max(0.0, min(1.0, s_index)))
+
+def _b_value(n_events: int, n_above_mc: int, sum_above_mc: float, mc: float) -> float:
+    """Aki maximum-likelihood b-value from magnitude sums (see calculate_b_value)."""
+    if n_events < 10 or n_above_mc < 5:
+        return 1.0  # Default value
+    
+    avg_mag = sum_above_mc / n_above_mc
+    return float(np.log10(np.e) / (avg_mag - mc + 0.05))
+
+def _to_seconds(timestamp) -> float:
+    """Event time as POSIX seconds; numbers are taken to be seconds already."""
+    if isinstance(timestamp, (int, float, np.integer, np.floating)):
+        return float(timestamp)
+    return pd.Timestamp(timestamp).value / 1e9
+
+def calculate_tremor_factor(tremor_data: pd.DataFrame,
+                            config: Optional[Dict] = None) -> float:
+    """
+    Normalized tremor amplitude from an RSAM series.
+    
+    The median of the most recent RSAM samples is compared with the
+    median of the whole series (the background); a ratio of
+    ``tremor_ratio_max`` or more scores 1.0, on a log scale.
+    
+    Parameters
+    ----------
+    tremor_data : pd.DataFrame
+        Tremor series with an ``rsam`` column in time order, e.g. from
+        ``preprocessing.seismic_processing.SeismicStreamProcessor``
+    config : dict, optional
+        Configuration parameters
+        
+    Returns
+    -------
+    float
+        Tremor factor in [0, 1]
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    if 'rsam' not in tremor_data.columns:
+        return 0.0
+    
+    rsam = tremor_data['rsam'].to_numpy(dtype=float)
+    rsam = rsam[np.isfinite(rsam)]
+    if rsam.size == 0:
+        return 0.0
+    
+    background = np.median(rsam)
+    recent = np.median(rsam[-int(config['tremor_recent_samples']):])
+    if background <= 0 or recent <= 0:
+        return 0.0
+    
+    factor = np.log10(recent / background) / np.log10(config['tremor_ratio_max'])
+    return float(np.clip(factor, 0.0, 1.0))
 
 def calculate_seismic_pulse(seismic_data: pd.DataFrame, 
-                           config: Optional[Dict] = None) -> float:
+                           config: Optional[Dict] = None,
+                           tremor_factor: Optional[float] = None,
+                           tremor_data: Optional[pd.DataFrame] = None) -> float:
     """
     Calculate Seismic Pulse Index S(t).
     
@@ -18,6 +115,12 @@ def calculate_seismic_pulse(seismic_data: pd.DataFrame,
         Seismic data with columns: time, magnitude, depth, latitude, longitude
     config : dict, optional
         Configuration parameters
+    tremor_factor : float, optional
+        Normalized tremor amplitude in [0, 1]; when neither it nor
+        ``tremor_data`` is given the tremor term is left out
+    tremor_data : pd.DataFrame, optional
+        RSAM tremor series used for the tremor factor when
+        ``tremor_factor`` is not given (see ``calculate_tremor_factor``)
         
     Returns
     -------
@@ -28,54 +131,32 @@ def calculate_seismic_pulse(seismic_data: pd.DataFrame,
         return 0.0
     
     if config is None:
-        config = {
-            'weight_rate': 0.4,
-            'weight_magnitude': 0.3,
-            'weight_depth': 0.2,
-            'weight_tremor': 0.1,
-        }
-    
-    # Calculate earthquake rate (events per day)
+        config = DEFAULT_CONFIG
+    
+    if tremor_factor is None and tremor_data is not None:
+        tremor_factor = calculate_tremor_factor(tremor_data, config)
+    
+    # Calculate earthquake rate (events per day) without touching the caller's frame
     if 'time' in seismic_data.columns:
-        seismic_data['time'] = pd.to_datetime(seismic_data['time'])
-        time_range = (seismic_data['time'].max() - seismic_data['time'].min()).total_seconds()
-        if time_range > 0:
-            rate = len(seismic_data) / (time_range / 86400)  # events per day
-            rate_norm = min(rate / 100, 1.0)  # Normalize (100 events/day = 1.0)
-        else:
-            rate_norm = 0.0
+        times = pd.to_datetime(seismic_data['time'])
+        time_range = (times.max() - times.min()).total_seconds()
+        rate_norm = _rate_factor(len(seismic_data), time_range)
     else:
         rate_norm = 0.0
     
     # Calculate magnitude factor
     if 'magnitude' in seismic_data.columns:
-        avg_magnitude = seismic_data['magnitude'].mean()
-        mag_factor = min(avg_magnitude / 4.0, 1.0)  # M4 = 1.0
+        mag_factor = _magnitude_factor(seismic_data['magnitude'].mean())
     else:
         mag_factor = 0.0
     
-    # Calculate depth factor (shallow earthquakes weighted higher)
+    # Calculate depth factor
     if 'depth' in seismic_data.columns:
-        avg_depth = seismic_data['depth'].mean()
-        depth_factor = max(0, 1.0 - (avg_depth / 20.0))  # 0km = 1.0, 20km = 0.0
+        depth_factor = _depth_factor(seismic_data['depth'].mean())
     else:
         depth_factor = 0.0
     
-    # For demo, add some random tremor simulation
-    tremor_factor = np.random.uniform(0.1, 0.5)
-    
-    # Calculate weighted index
-    s_index = (
-        config['weight_rate'] * rate_norm +
-        config['weight_magnitude'] * mag_factor +
-        config['weight_depth'] * depth_factor +
-        config['weight_tremor'] * tremor_factor
-    )
-    
-    # Ensure value is in [0, 1]
-    s_index = max(0.0, min(1.0, s_index))
-    
-    return float(s_index)
+    return _combine_factors(rate_norm, mag_factor, depth_factor, tremor_factor, config)
 
 def calculate_b_value(seismic_data: pd.DataFrame, mc: float = 1.0) -> float:
     """
@@ -93,16 +174,120 @@ def calculate_b_value(seismic_data: pd.DataFrame, mc: float = 1.0) -> float:
     float
         b-value
     """
-    if 'magnitude' not in seismic_data.columns or len(seismic_data) < 10:
+    if 'magnitude' not in seismic_data.columns:
         return 1.0  # Default value
     
     mags = seismic_data[seismic_data['magnitude'] >= mc]['magnitude'].values
     
-    if len(mags) < 5:
-        return 1.0
-    
     # Maximum likelihood estimation of b-value
-    avg_mag = np.mean(mags)
-    b_value = np.log10(np.e) / (avg_mag - mc + 0.05)
+    return _b_value(len(seismic_data), len(mags), float(np.sum(mags)), mc)
+
+class StreamingSeismicPulse:
+    """
+    Incremental Seismic Pulse Index over a sliding time window.
+    
+    Keeps running sums of the events inside the window so that each event
+    entering or leaving the window costs O(1). ``value()`` matches
+    ``calculate_seismic_pulse`` and ``b_value()`` matches
+    ``calculate_b_value`` evaluated on the events currently in the window.
+    
+    Parameters
+    ----------
+    window : float
+        Window length in seconds (default one day)
+    mc : float
+        Magnitude of completeness for the b-value
+    config : dict, optional
+        Configuration parameters (as for ``calculate_seismic_pulse``)
+        
+    Notes
+    -----
+    Events are expected in non-decreasing time order, as delivered by a
+    real-time catalog feed.
+    """
+    
+    def __init__(self, window: float = 86400.0, mc: float = 1.0,
+                 config: Optional[Dict] = None):
+        self.window = float(window)
+        self.mc = mc
+        self.config = config or DEFAULT_CONFIG
+        self._events: Deque[Tuple[float, float, float]] = deque()
+        self._latest = -np.inf
+        
+        self._n_mag = 0
+        self._sum_mag = 0.0
+        self._n_depth = 0
+        self._sum_depth = 0.0
+        self._n_above_mc = 0
+        self._sum_above_mc = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._events)
+    
+    def _accumulate(self, magnitude: float, depth: float, sign: int):
+        if not np.isnan(magnitude):
+            self._n_mag += sign
+            self._sum_mag += sign * magnitude
+            if magnitude >= self.mc:
+                self._n_above_mc += sign
+                self._sum_above_mc += sign * magnitude
+        if not np.isnan(depth):
+            self._n_depth += sign
+            self._sum_depth += sign * depth
+    
+    def add_event(self, time, magnitude: float = np.nan, depth: float = np.nan):
+        """Add one catalog event and evict events that left the window."""
+        t = _to_seconds(time)
+        magnitude = float(magnitude)
+        depth = float(depth)
+        
+        self._events.append((t, magnitude, depth))
+        self._accumulate(magnitude, depth, +1)
+        self._latest = max(self._latest, t)
+        self.advance(self._latest)
+    
+    def add_events(self, seismic_data: pd.DataFrame):
+        """Add a batch of events with columns time, magnitude, depth."""
+        if seismic_data.empty:
+            return
+        
+        times = pd.to_datetime(seismic_data['time']).astype('datetime64[ns]')
+        seconds = times.to_numpy().astype(np.int64) / 1e9
+        n = len(seismic_data)
+        magnitudes = (seismic_data['magnitude'].to_numpy(dtype=float)
+                      if 'magnitude' in seismic_data.columns else np.full(n, np.nan))
+        depths = (seismic_data['depth'].to_numpy(dtype=float)
+                  if 'depth' in seismic_data.columns else np.full(n, np.nan))
+        
+        for t, magnitude, depth in zip(seconds, magnitudes, depths):
+            self.add_event(float(t), magnitude, depth)
+    
+    def advance(self, now):
+        """Evict events older than ``now - window`` (e.g. on a quiet clock tick)."""
+        cutoff = _to_seconds(now) - self.window
+        events = self._events
+        while events and events[0][0] < cutoff:
+            _, magnitude, depth = events.popleft()
+            self._accumulate(magnitude, depth, -1)
+        
+        if not events:
+            # Reset sums so floating-point residue cannot accumulate
+            self._n_mag = self._n_depth = self._n_above_mc = 0
+            self._sum_mag = self._sum_depth = self._sum_above_mc = 0.0
+    
+    def value(self, tremor_factor: Optional[float] = None) -> float:
+        """Current Seismic Pulse Index S(t) for the events in the window."""
+        if not self._events:
+            return 0.0
+        
+        time_range = self._events[-1][0] - self._events[0][0]
+        rate_norm = _rate_factor(len(self._events), time_range)
+        mag_factor = _magnitude_factor(self._sum_mag / self._n_mag) if self._n_mag else 0.0
+        depth_factor = _depth_factor(self._sum_depth / self._n_depth) if self._n_depth else 0.0
+        
+        return _combine_factors(rate_norm, mag_factor, depth_factor,
+                                tremor_factor, self.config)
     
-    return float(b_value)
+    def b_value(self) -> float:
+        """Current b-value for the events in the window."""
+        return _b_value(len(self._events), self._n_above_mc, self._sum_above_mc, self.mc)
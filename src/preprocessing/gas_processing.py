@@ -2,12 +2,333 @@
 Gas Processing
 preprocessing/gas_processing.py
 
-Module for gas processing.
+Scanning-DOAS and MultiGAS preprocessing: SO2 columns, plume fluxes and
+CO2/SO2 ratios.
+
+Spectra and readings are processed in batches: the DOAS fit is a fixed
+linear least-squares problem, so every spectrum in a batch is retrieved
+with one matrix product, and plume traverses are integrated for all scans
+at once. Rolling CO2/SO2 ratios come from running regression sums carried
+between batches, so a stream can be fed in chunks of any size.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+AVOGADRO = 6.02214076e23
+MOLAR_MASS = {'SO2': 64.066e-3, 'CO2': 44.009e-3}  # kg/mol
+SECONDS_PER_DAY = 86400.0
+
+
+class DOASRetrieval:
+    """
+    Batched DOAS retrieval of slant column densities.
+
+    The optical depth ln(I0 / I) over the fit window is modelled as a
+    linear combination of absorption cross-sections plus a low-order
+    polynomial for broadband extinction. The design matrix does not
+    depend on the spectrum, so its pseudo-inverse is computed once and
+    each batch of spectra is fitted with one matrix product.
+
+    Parameters
+    ----------
+    wavelengths : np.ndarray
+        Spectrometer wavelength grid (nm)
+    cross_sections : dict
+        Species name -> absorption cross-section on ``wavelengths``
+        (cm^2/molecule), e.g. ``{'SO2': ..., 'O3': ...}``
+    fit_window : (float, float)
+        Wavelength range used in the fit (nm)
+    poly_order : int
+        Order of the broadband polynomial
+    """
+
+    def __init__(self, wavelengths: np.ndarray, cross_sections: Dict[str, np.ndarray],
+                 fit_window: Tuple[float, float] = (310.0, 325.0), poly_order: int = 3):
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        self.window = (wavelengths >= fit_window[0]) & (wavelengths <= fit_window[1])
+        if self.window.sum() <= len(cross_sections) + poly_order + 1:
+            raise ValueError(f"Fit window {fit_window} has too few spectral pixels")
+
+        self.species = list(cross_sections)
+        wl = wavelengths[self.window]
+        centred = (wl - wl.mean()) / np.ptp(wl)
+        columns = [np.asarray(cross_sections[name], dtype=float)[self.window]
+                   for name in self.species]
+        columns += [centred ** k for k in range(poly_order + 1)]
+        self.design = np.column_stack(columns)
+
+        # Cross-sections (~1e-19) and polynomial terms (~1) differ by many
+        # orders of magnitude; normalize the columns so the pseudo-inverse
+        # does not treat the absorbers as numerically zero
+        scale = np.linalg.norm(self.design, axis=0)
+        scale[scale == 0] = 1.0
+        self._pinv = np.linalg.pinv(self.design / scale) / scale[:, None]
+
+    def retrieve(self, spectra: np.ndarray, reference: np.ndarray) -> np.ndarray:
+        """
+        Slant column densities of a batch of spectra.
+
+        Parameters
+        ----------
+        spectra : np.ndarray
+            Dark-corrected spectra of shape (n_spectra, pixels)
+        reference : np.ndarray
+            Plume-free (clear-sky) spectrum, shape (pixels,)
+
+        Returns
+        -------
+        np.ndarray
+            Columns of shape (n_spectra, species) in molecules/cm^2;
+            NaN where a spectrum has non-positive intensities
+        """
+        spectra = np.atleast_2d(np.asarray(spectra, dtype=float))[:, self.window]
+        reference = np.asarray(reference, dtype=float)[self.window]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            optical_depth = np.log(reference) - np.log(spectra)
+        fit = optical_depth @ self._pinv[:len(self.species)].T
+        fit[~np.isfinite(optical_depth).all(axis=1)] = np.nan
+        return fit
+
+
+def _trapezoid(y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Trapezoidal integral along the last axis, skipping NaN segments."""
+    segments = 0.5 * (y[..., 1:] + y[..., :-1]) * np.diff(x, axis=-1)
+    return np.nansum(segments, axis=-1)
+
+
+def plume_flux(columns: np.ndarray, angles: np.ndarray, plume_distance: float,
+               wind_speed, wind_direction=None, scan_azimuth: Optional[float] = None,
+               species: str = 'SO2', background_percentile: float = 10.0) -> np.ndarray:
+    """
+    Integrate scanned plume cross-sections into gas fluxes.
+
+    Slant columns are converted to vertical columns, the clear-sky
+    background of each scan is removed and the cross-section is integrated
+    across the plume, which is assumed to be a flat layer
+    ``plume_distance`` meters above the scanner.
+
+    Parameters
+    ----------
+    columns : np.ndarray
+        Slant columns (molecules/cm^2) of shape (scans, angles)
+    angles : np.ndarray
+        Scan elevation angles from zenith (degrees), shape (angles,) or
+        (scans, angles)
+    plume_distance : float
+        Vertical distance to the plume (meters)
+    wind_speed : float or np.ndarray
+        Plume speed (m/s), scalar or one per scan
+    wind_direction, scan_azimuth : float or np.ndarray, optional
+        Direction the wind blows towards and azimuth of the scan plane
+        (degrees); only the wind component normal to the scan plane
+        transports gas through it. Both omitted means a normal wind.
+    species : str
+        Key of ``MOLAR_MASS``
+    background_percentile : float
+        Percentile of each scan taken as the plume-free background
+
+    Returns
+    -------
+    np.ndarray
+        Flux per scan in tonnes/day
+    """
+    columns = np.atleast_2d(np.asarray(columns, dtype=float))
+    theta = np.radians(np.broadcast_to(np.asarray(angles, dtype=float), columns.shape))
+
+    vertical = columns * np.cos(theta)
+    background = np.nanpercentile(vertical, background_percentile, axis=1, keepdims=True)
+    position = plume_distance * np.tan(theta)
+
+    order = np.argsort(position, axis=1)
+    vertical = np.take_along_axis(vertical - background, order, axis=1)
+    position = np.take_along_axis(position, order, axis=1)
+    integrated = _trapezoid(vertical, position) * 1e4  # molecules/cm^2 * m -> molecules/m
+
+    speed = np.asarray(wind_speed, dtype=float)
+    if wind_direction is not None and scan_azimuth is not None:
+        speed = speed * np.abs(np.sin(np.radians(np.asarray(wind_direction) - scan_azimuth)))
+
+    kg_per_second = integrated * speed * MOLAR_MASS[species] / AVOGADRO
+    return kg_per_second * SECONDS_PER_DAY / 1000.0
+
+
+def rolling_ratio(x: np.ndarray, y: np.ndarray, window: int,
+                  history: Optional[np.ndarray] = None,
+                  min_r2: float = 0.0, min_x_std: float = 0.0
+                  ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling least-squares slope of ``y`` against ``x`` (e.g. CO2 vs SO2).
+
+    The slope over the last ``window`` samples (missing ones skipped) is taken
+    from running sums (n, sum x, sum y, sum x^2, sum y^2, sum xy) via
+    cumulative sums, so every sample costs O(1).
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Concentration series of equal length; NaN samples are skipped
+    window : int
+        Samples per regression window
+    history : np.ndarray, optional
+        The last ``window - 1`` (x, y) pairs of the previous batch, shape
+        (2, k), so windows continue across batches
+    min_r2 : float
+        Slopes with a coefficient of determination below this are NaN
+    min_x_std : float
+        Slopes from windows where ``x`` varies less than this (standard
+        deviation) are NaN, e.g. MultiGAS readings outside the plume
+
+    Returns
+    -------
+    slope, r2 : np.ndarray
+        Per-sample slope and r^2 (NaN with fewer than 3 valid samples)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    k = 0
+    if history is not None and history.size:
+        k = history.shape[1]
+        x = np.concatenate([history[0], x])
+        y = np.concatenate([history[1], y])
+
+    valid = np.isfinite(x) & np.isfinite(y)
+    xv, yv = np.where(valid, x, 0.0), np.where(valid, y, 0.0)
+    # Centre before accumulating to limit cancellation in the variances
+    x0 = xv[valid].mean() if valid.any() else 0.0
+    y0 = yv[valid].mean() if valid.any() else 0.0
+    xc, yc = np.where(valid, xv - x0, 0.0), np.where(valid, yv - y0, 0.0)
+
+    sums = np.cumsum(np.stack([valid.astype(float), xc, yc, xc * xc, yc * yc, xc * yc]), axis=1)
+    sums = np.concatenate([np.zeros((6, 1)), sums], axis=1)
+    end = np.arange(k + 1, x.size + 1)
+    n, sx, sy, sxx, syy, sxy = sums[:, end] - sums[:, np.maximum(end - window, 0)]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        slope = cov / var_x
+        r2 = cov * cov / (var_x * var_y)
+    bad = (n < 3) | ~(var_x > 0) | ~(var_x >= n * min_x_std ** 2)
+    slope[bad] = np.nan
+    r2[bad] = np.nan
+    slope[~(r2 >= min_r2)] = np.nan
+    return slope, r2
+
+
+def _as_seconds(times) -> np.ndarray:
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype('datetime64[ns]').astype(np.int64) / 1e9
+    return times.astype(float)
+
+
+class GasStreamProcessor:
+    """
+    Streaming gas pipeline from DOAS scans and MultiGAS readings to fluxes.
+
+    Parameters
+    ----------
+    retrieval : DOASRetrieval
+        SO2 retrieval for the scanner spectra
+    angles : np.ndarray
+        Scan elevation angles from zenith (degrees), one per spectrum of a scan
+    plume_distance : float
+        Vertical distance to the plume (meters)
+    ratio_window : int
+        MultiGAS samples per CO2/SO2 regression window (e.g. 600 at 1 Hz)
+    min_r2 : float
+        Ratios from windows with a poorer CO2-SO2 correlation are dropped
+    min_so2 : float
+        Windows whose SO2 standard deviation (ppm) is below this are
+        outside the plume and give no ratio
+
+    Notes
+    -----
+    ``process_scans`` and ``process_multigas`` accept batches of any size;
+    the only state carried between batches is the tail of the MultiGAS
+    regression window and the latest CO2/SO2 ratio, which converts each
+    SO2 flux to a CO2 flux.
+    """
+
+    def __init__(self, retrieval: DOASRetrieval, angles: Sequence[float],
+                 plume_distance: float, ratio_window: int = 600,
+                 min_r2: float = 0.8, min_so2: float = 0.2):
+        self.retrieval = retrieval
+        self.angles = np.asarray(angles, dtype=float)
+        self.plume_distance = float(plume_distance)
+        self.ratio_window = int(ratio_window)
+        self.min_r2 = min_r2
+        self.min_so2 = min_so2
+
+        self._so2_index = retrieval.species.index('SO2')
+        self._history = np.empty((2, 0))
+        self.ratio = np.nan
+
+    def process_scans(self, times, spectra: np.ndarray, reference: np.ndarray,
+                      wind_speed, wind_direction=None,
+                      scan_azimuth: Optional[float] = None) -> pd.DataFrame:
+        """
+        Retrieve and integrate a batch of complete scans.
+
+        Parameters
+        ----------
+        times : array-like
+            Start time of every scan (POSIX seconds or datetime64)
+        spectra : np.ndarray
+            Spectra of shape (scans, angles, pixels)
+        reference : np.ndarray
+            Clear-sky spectrum (pixels,)
+        wind_speed, wind_direction, scan_azimuth
+            See ``plume_flux``
+
+        Returns
+        -------
+        pd.DataFrame
+            ``time``, ``so2_flux`` and ``co2_flux`` (tonnes/day), the
+            latter from the current CO2/SO2 molar ratio
+        """
+        spectra = np.asarray(spectra, dtype=float)
+        n_scans, n_angles, n_pixels = spectra.shape
+        columns = self.retrieval.retrieve(spectra.reshape(-1, n_pixels), reference)
+        so2 = columns[:, self._so2_index].reshape(n_scans, n_angles)
+        flux = plume_flux(so2, self.angles, self.plume_distance, wind_speed,
+                          wind_direction, scan_azimuth)
+
+        co2_flux = flux * self.ratio * MOLAR_MASS['CO2'] / MOLAR_MASS['SO2']
+        return pd.DataFrame({
+            'time': pd.to_datetime(_as_seconds(times), unit='s'),
+            'so2_flux': flux,
+            'co2_flux': co2_flux,
+        })
+
+    def process_multigas(self, times, so2: np.ndarray, co2: np.ndarray) -> pd.DataFrame:
+        """
+        Rolling CO2/SO2 molar ratios for a batch of MultiGAS readings.
+
+        Returns
+        -------
+        pd.DataFrame
+            ``time``, ``co2_so2`` (NaN outside the plume or for poorly
+            correlated windows) and ``r2`` per reading
+        """
+        so2 = np.asarray(so2, dtype=float)
+        co2 = np.asarray(co2, dtype=float)
+        ratio, r2 = rolling_ratio(so2, co2, self.ratio_window, self._history,
+                                  self.min_r2, self.min_so2)
+
+        keep = self.ratio_window - 1
+        self._history = np.stack([np.concatenate([self._history[0], so2])[-keep:],
+                                  np.concatenate([self._history[1], co2])[-keep:]])
+        finite = np.isfinite(ratio)
+        if finite.any():
+            self.ratio = float(ratio[finite][-1])
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+        return pd.DataFrame({
+            'time': pd.to_datetime(_as_seconds(times), unit='s'),
+            'co2_so2': ratio,
+            'r2': r2,
+        })
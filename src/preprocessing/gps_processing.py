@@ -2,12 +2,458 @@
 Gps Processing
 preprocessing/gps_processing.py
 
-Module for gps processing.
+Network preprocessing of high-rate GPS position solutions.
+
+All functions work on stacked arrays of shape (stations, epochs, 3) holding
+east, north and up positions, with NaN for missing solutions.
+``GPSNetworkProcessor`` chains them over day-sized chunks so long records
+never have to be held in memory at once.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import warnings
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _nanmedian(a: np.ndarray, axis, keepdims: bool = False) -> np.ndarray:
+    """np.nanmedian without the all-NaN slice warnings."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmedian(a, axis=axis, keepdims=keepdims)
+
+
+def _rolling_median(positions: np.ndarray, before: int, after: int) -> np.ndarray:
+    """Median over epochs [i - before, i + after) for every epoch i."""
+    padded = np.pad(positions, ((0, 0), (before, after), (0, 0)),
+                    constant_values=np.nan)
+    windows = sliding_window_view(padded, before + after, axis=1)
+    return _nanmedian(windows[:, :positions.shape[1]], axis=-1)
+
+
+def _as_seconds(times) -> np.ndarray:
+    """Epoch times as float POSIX seconds."""
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype('datetime64[ns]').astype(np.int64) / 1e9
+    return times.astype(float)
+
+
+def remove_common_mode(positions: np.ndarray, min_stations: int = 3,
+                       reference: Optional[np.ndarray] = None
+                       ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Remove network common-mode noise.
+
+    Each station is referenced to its own median, and the median of these
+    residuals across stations at every epoch is taken as the common mode.
+    The median keeps a localized volcanic signal at a few stations from
+    leaking into the estimate.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Array of shape (stations, epochs, 3)
+    min_stations : int
+        Epochs observed by fewer stations are left uncorrected
+    reference : np.ndarray, optional
+        Per-station reference positions of shape (stations, 3); defaults
+        to each station's median. Pass a fixed reference when filtering a
+        series chunk by chunk so the common mode stays continuous.
+
+    Returns
+    -------
+    filtered : np.ndarray
+        Positions with the common mode removed
+    common_mode : np.ndarray
+        Common-mode series of shape (epochs, 3)
+    """
+    if reference is None:
+        reference = _nanmedian(positions, axis=1)
+    residuals = positions - reference[:, None, :]
+    common_mode = _nanmedian(residuals, axis=0)
+    enough = np.isfinite(positions).all(axis=2).sum(axis=0) >= min_stations
+    common_mode = np.where(enough[:, None] & np.isfinite(common_mode), common_mode, 0.0)
+    return positions - common_mode[None], common_mode
+
+
+def detect_outliers(positions: np.ndarray, window: int = 21,
+                    threshold: float = 5.0) -> np.ndarray:
+    """
+    Flag epochs that deviate from a rolling median.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Array of shape (stations, epochs, 3)
+    window : int
+        Rolling median length in epochs
+    threshold : float
+        Rejection level in robust standard deviations (1.4826 * MAD of the
+        residuals, per station and component)
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of shape (stations, epochs), True for outliers
+    """
+    half = window // 2
+    residuals = positions - _rolling_median(positions, half, window - half)
+    scale = 1.4826 * _nanmedian(np.abs(residuals), axis=1, keepdims=True)
+    scale = np.where(scale > 0, scale, np.inf)
+    with np.errstate(invalid='ignore'):
+        return (np.abs(residuals) > threshold * scale).any(axis=2)
+
+
+def _rolling_mean(positions: np.ndarray, before: int, after: int) -> np.ndarray:
+    """NaN-aware mean over epochs [i - before, i + after) via cumulative sums."""
+    valid = np.isfinite(positions)
+    sums = np.cumsum(np.where(valid, positions, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    zeros = np.zeros_like(sums[:, :1])
+    sums = np.concatenate([zeros, sums], axis=1)
+    counts = np.concatenate([zeros, counts], axis=1)
+
+    n_epochs = positions.shape[1]
+    index = np.arange(n_epochs)
+    lo = np.clip(index - before, 0, n_epochs)
+    hi = np.clip(index + after, 0, n_epochs)
+    total = sums[:, hi] - sums[:, lo]
+    count = counts[:, hi] - counts[:, lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _step_series(positions: np.ndarray, window: int) -> np.ndarray:
+    """Mean after minus mean before every epoch, less the steady-velocity part."""
+    n_epochs = positions.shape[1]
+    step = _rolling_mean(positions, 0, window) - _rolling_mean(positions, window, 0)
+    step -= _nanmedian(step[:, window:n_epochs - window + 1], axis=1, keepdims=True)
+    return step
+
+
+def detect_offsets(positions: np.ndarray, window: int = 120,
+                   threshold: float = 8.0) -> List[Dict]:
+    """
+    Detect step offsets (antenna changes, co-seismic jumps).
+
+    The step at epoch i is the mean of the ``window`` epochs from i on
+    minus the mean of the ``window`` epochs before it, less the median step
+    over the series (the part explained by a steady velocity). Steps above
+    ``threshold`` standard errors that are also the largest within
+    +/- ``window`` epochs are reported. Outliers should be removed first.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        Array of shape (stations, epochs, 3)
+    window : int
+        Epochs on each side of a candidate offset
+    threshold : float
+        Detection level in standard errors of the step
+
+    Returns
+    -------
+    list of dict
+        ``station`` (index), ``epoch`` (index of the first shifted epoch),
+        ``step`` (east, north, up) and ``score`` (in standard errors) for
+        each offset
+    """
+    n_stations, n_epochs, _ = positions.shape
+    if n_epochs < 2 * window:
+        return []
+
+    step = _step_series(positions, window)
+
+    # White-noise level from first differences (insensitive to the offsets)
+    noise = 1.4826 * _nanmedian(np.abs(np.diff(positions, axis=1)), axis=1,
+                                keepdims=True) / np.sqrt(2)
+    noise = np.where(noise > 0, noise, np.inf)
+    with np.errstate(invalid='ignore'):
+        score = np.abs(step) / (noise * np.sqrt(2.0 / window))
+    score = np.max(np.where(np.isfinite(score), score, 0.0), axis=2)
+    score[:, :window] = 0.0
+    score[:, n_epochs - window + 1:] = 0.0
+
+    padded = np.pad(score, ((0, 0), (window, window)))
+    local_max = sliding_window_view(padded, 2 * window + 1, axis=1).max(axis=-1)
+    candidates = (score > threshold) & (score >= local_max)
+
+    offsets = []
+    for station, epoch in zip(*np.nonzero(candidates)):
+        # Keep only the first epoch of a flat-topped maximum
+        if epoch > 0 and candidates[station, epoch - 1]:
+            continue
+        offsets.append({'station': int(station), 'epoch': int(epoch),
+                        'step': step[station, epoch].copy(),
+                        'score': float(score[station, epoch])})
+    return offsets
+
+
+def correct_offsets(positions: np.ndarray, offsets: Iterable[Dict]) -> np.ndarray:
+    """Subtract detected steps from every epoch after them (in place)."""
+    for offset in offsets:
+        positions[offset['station'], offset['epoch']:] -= offset['step']
+    return positions
+
+
+def resample(times: np.ndarray, positions: np.ndarray,
+             interval: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Average positions into clock-aligned bins of ``interval`` seconds.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        Sorted epoch times (POSIX seconds or datetime64)
+    positions : np.ndarray
+        Array of shape (stations, epochs, 3)
+    interval : float
+        Bin length in seconds (e.g. the monitoring interval)
+
+    Returns
+    -------
+    bin_times : np.ndarray
+        Bin start times in POSIX seconds
+    values : np.ndarray
+        Bin means of shape (stations, bins, 3); NaN for empty bins
+    counts : np.ndarray
+        Valid samples per station and bin
+    """
+    seconds = _as_seconds(times)
+    if seconds.size == 0:
+        return seconds, positions[:, :0], np.zeros((positions.shape[0], 0), dtype=int)
+
+    bins = np.floor(seconds / interval).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, np.diff(bins) != 0])
+
+    valid = np.isfinite(positions).all(axis=2)
+    sums = np.add.reduceat(np.where(valid[:, :, None], positions, 0.0), starts, axis=1)
+    counts = np.add.reduceat(valid.astype(int), starts, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = np.where(counts[:, :, None] > 0, sums / counts[:, :, None], np.nan)
+
+    # Insert empty bins so the output is on a regular grid
+    bin_ids = bins[starts]
+    grid = np.arange(bin_ids[0], bin_ids[-1] + 1)
+    index = bin_ids - bin_ids[0]
+    regular = np.full((positions.shape[0], grid.size, 3), np.nan)
+    regular[:, index] = values
+    regular_counts = np.zeros((positions.shape[0], grid.size), dtype=int)
+    regular_counts[:, index] = counts
+    return grid * float(interval), regular, regular_counts
+
+
+def fill_gaps(positions: np.ndarray, max_gap: int = 3) -> np.ndarray:
+    """
+    Linearly interpolate runs of up to ``max_gap`` missing epochs.
+
+    Longer gaps and gaps at either end of the series stay NaN.
+    """
+    n_stations, n_epochs, n_comp = positions.shape
+    rows = np.moveaxis(positions, 1, 2).reshape(-1, n_epochs)
+    valid = np.isfinite(rows)
+    index = np.arange(n_epochs)
+
+    prev = np.maximum.accumulate(np.where(valid, index, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(valid, index, n_epochs)[:, ::-1], axis=1)[:, ::-1]
+    fill = ~valid & (prev >= 0) & (nxt < n_epochs) & (nxt - prev - 1 <= max_gap)
+
+    r, c = np.nonzero(fill)
+    p, n = prev[r, c], nxt[r, c]
+    filled = rows.copy()
+    filled[r, c] = rows[r, p] + (rows[r, n] - rows[r, p]) * (c - p) / (n - p)
+    return np.moveaxis(filled.reshape(n_stations, n_comp, n_epochs), 2, 1)
+
+
+class GPSNetworkProcessor:
+    """
+    Streaming preprocessing of a GPS network, one chunk at a time.
+
+    Each chunk goes through outlier removal, common-mode filtering, offset
+    detection and correction, resampling to ``interval`` and gap filling.
+    The last ``offset_window`` epochs of every chunk are held back until the
+    next one so offsets near a chunk boundary are seen with full context;
+    ``flush()`` releases them at the end of a stream.
+
+    Parameters
+    ----------
+    stations : sequence of str
+        Station codes (first axis of the position arrays)
+    interval : float
+        Output sampling interval in seconds
+    outlier_window, outlier_threshold : int, float
+        See ``detect_outliers``
+    offset_window, offset_threshold : int, float
+        See ``detect_offsets``
+    max_gap : int
+        Longest run of missing output bins to interpolate
+    min_stations : int
+        See ``remove_common_mode``
+    """
+
+    def __init__(self, stations: Sequence[str], interval: float = 3600.0,
+                 outlier_window: int = 21, outlier_threshold: float = 5.0,
+                 offset_window: int = 120, offset_threshold: float = 8.0,
+                 max_gap: int = 3, min_stations: int = 3):
+        self.stations = list(stations)
+        self.interval = float(interval)
+        self.outlier_window = outlier_window
+        self.outlier_threshold = outlier_threshold
+        self.offset_window = offset_window
+        self.offset_threshold = offset_threshold
+        self.max_gap = max_gap
+        self.min_stations = min_stations
+
+        n = len(self.stations)
+        self.corrections = np.zeros((n, 3))
+        self._reference = np.full((n, 3), np.nan)
+        self.offsets: List[Dict] = []
+        self._history = (np.empty(0), np.empty((n, 0, 3)))  # emitted, kept as context
+        self._held = (np.empty(0), np.empty((n, 0, 3)))     # not yet emitted
+        self._partial_bin = (np.empty(0), np.empty((n, 0, 3)))
+        self._last_bin: Optional[np.ndarray] = None
+        self._epoch_offset = 0
+
+    def _clean(self, times: np.ndarray, positions: np.ndarray,
+               final: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Clean one chunk and return the epochs that are ready to emit."""
+        w = self.offset_window
+
+        # Held-back and new epochs in raw form (only known offsets removed),
+        # preceded by already-emitted cleaned epochs as context
+        held_t, held_x = self._held
+        raw_t = np.concatenate([held_t, times])
+        raw = np.concatenate([held_x, positions - self.corrections[:, None, :]], axis=1)
+        hist_t, hist_x = self._history
+        n_hist = hist_t.size
+        ctx_t = np.concatenate([hist_t, raw_t])
+
+        # A fixed per-station reference keeps the common mode continuous
+        # across chunks; stations are referenced when first observed
+        if raw_t.size:
+            first_seen = _nanmedian(raw, axis=1)
+            self._reference = np.where(np.isnan(self._reference), first_seen, self._reference)
+
+        # Offsets are accepted once they are past the emitted history and,
+        # unless flushing, have a full window of epochs after them. An
+        # offset also shifts the network median, so they are applied one at
+        # a time, strongest first, re-estimating the common mode in between.
+        last = ctx_t.size if final else ctx_t.size - w
+        outliers = None
+        while True:
+            filtered, _ = remove_common_mode(raw, self.min_stations, self._reference)
+            ctx = np.concatenate([hist_x, filtered], axis=1)
+            if outliers is None:
+                outliers = detect_outliers(ctx, self.outlier_window, self.outlier_threshold)
+            ctx = np.where(outliers[:, :, None], np.nan, ctx)
+
+            candidates = [offset for offset in detect_offsets(ctx, w, self.offset_threshold)
+                          if n_hist <= offset['epoch'] < last]
+            if not candidates:
+                break
+            offset = max(candidates, key=lambda o: o['score'])
+            station, epoch = offset['station'], offset['epoch']
+
+            # Re-measure the step against a common mode that excludes the
+            # station, which the offset itself has biased
+            others = raw.copy()
+            others[station] = np.nan
+            _, common_mode = remove_common_mode(others, self.min_stations, self._reference)
+            series = np.concatenate([hist_x[station], raw[station] - common_mode])
+            series = np.where(outliers[station, :, None], np.nan, series)
+            step = _step_series(series[None], w)[0, epoch]
+            if not np.all(np.isfinite(step)):
+                step = offset['step']
+
+            correct_offsets(raw, [{'station': station, 'epoch': epoch - n_hist, 'step': step}])
+            self._record_offset(station, self._epoch_offset + epoch - n_hist,
+                                float(ctx_t[epoch]), step)
+
+        emit_end = ctx_t.size if final else max(n_hist, ctx_t.size - w)
+        emit_t, emit_x = ctx_t[n_hist:emit_end], ctx[:, n_hist:emit_end]
+        self._epoch_offset += emit_t.size
+
+        self._held = (raw_t[emit_end - n_hist:], raw[:, emit_end - n_hist:])
+        if emit_t.size:
+            keep = min(w, emit_end)
+            self._history = (ctx_t[emit_end - keep:emit_end], ctx[:, emit_end - keep:emit_end])
+        return emit_t, emit_x
+
+    def _record_offset(self, station: int, epoch: int, time: float, step: np.ndarray):
+        self.corrections[station] += step
+        for offset in self.offsets:
+            # A refinement of an offset that was already applied
+            if offset['station'] == station and offset['epoch'] == epoch:
+                offset['step'] = offset['step'] + step
+                return
+        self.offsets.append({'station': station, 'epoch': epoch, 'time': time, 'step': step})
+
+    def _bin(self, times: np.ndarray, positions: np.ndarray,
+             final: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Resample emitted epochs, carrying an incomplete last bin forward."""
+        part_t, part_x = self._partial_bin
+        times = np.concatenate([part_t, times])
+        positions = np.concatenate([part_x, positions], axis=1)
+        if not times.size:
+            return times, positions
+
+        if final:
+            cut = times.size
+        else:
+            last_bin = np.floor(times[-1] / self.interval)
+            cut = int(np.searchsorted(np.floor(times / self.interval), last_bin, side='left'))
+        self._partial_bin = (times[cut:], positions[:, cut:])
+
+        bin_times, values, _ = resample(times[:cut], positions[:, :cut], self.interval)
+        if not bin_times.size:
+            return bin_times, values
+
+        if self._last_bin is not None:
+            values = fill_gaps(np.concatenate([self._last_bin, values], axis=1),
+                               self.max_gap)[:, 1:]
+        else:
+            values = fill_gaps(values, self.max_gap)
+        self._last_bin = values[:, -1:]
+        return bin_times, values
+
+    def process_chunk(self, times: np.ndarray,
+                      positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Process one chunk of raw solutions.
+
+        Parameters
+        ----------
+        times : np.ndarray
+            Sorted epoch times (POSIX seconds or datetime64), continuing
+            the previous chunk
+        positions : np.ndarray
+            Array of shape (stations, epochs, 3)
+
+        Returns
+        -------
+        bin_times, values : np.ndarray
+            Completed output bins (POSIX seconds) and positions of shape
+            (stations, bins, 3)
+        """
+        emit_t, emit_x = self._clean(_as_seconds(times), np.asarray(positions, dtype=float),
+                                     final=False)
+        return self._bin(emit_t, emit_x, final=False)
+
+    def flush(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Release the held-back epochs and the last partial bin."""
+        n = len(self.stations)
+        emit_t, emit_x = self._clean(np.empty(0), np.empty((n, 0, 3)), final=True)
+        return self._bin(emit_t, emit_x, final=True)
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    def process_stream(self, chunks: Iterable[Tuple[np.ndarray, np.ndarray]]
+                       ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Process (times, positions) chunks, yielding output bins as they complete."""
+        for times, positions in chunks:
+            bin_times, values = self.process_chunk(times, positions)
+            if bin_times.size:
+                yield bin_times, values
+        bin_times, values = self.flush()
+        if bin_times.size:
+            yield bin_times, values
@@ -2,12 +2,282 @@
 Insar Processing
 preprocessing/insar_processing.py
 
-Module for insar processing.
+Small-baseline subset (SBAS) time-series inversion of interferogram stacks.
+
+Stacks are (interferograms, rows, cols) ``.npy`` files that are opened as
+memory maps and processed in spatial tiles, so only one tile of the stack
+is ever resident. Pixels sharing the same set of valid interferograms are
+solved together with one pseudo-inverse, and tiles run on a process pool
+that writes straight into memory-mapped outputs:
+
+    <out_dir>/displacement.npy    (dates, rows, cols) cumulative LOS displacement
+    <out_dir>/velocity.npy        (rows, cols) LOS velocity per year
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365.25
+
+
+def _as_days(dates) -> np.ndarray:
+    """Acquisition dates as float days (datetime64 or numeric days)."""
+    dates = np.asarray(dates)
+    if np.issubdtype(dates.dtype, np.datetime64):
+        return dates.astype('datetime64[s]').astype(np.int64) / 86400.0
+    return dates.astype(float)
+
+
+def sbas_design_matrix(dates, pairs: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """
+    SBAS design matrix relating interferograms to interval velocities.
+
+    Following Berardino et al. (2002) the unknowns are the mean velocities
+    between consecutive acquisitions, so the minimum-norm solution stays
+    physically sensible when the small-baseline network is disconnected.
+
+    Parameters
+    ----------
+    dates : array-like
+        Sorted acquisition dates (datetime64 or days)
+    pairs : sequence of (int, int)
+        Reference and secondary acquisition index of every interferogram
+
+    Returns
+    -------
+    np.ndarray
+        Matrix of shape (interferograms, dates - 1) in days
+    """
+    days = _as_days(dates)
+    if np.any(np.diff(days) <= 0):
+        raise ValueError("Acquisition dates must be strictly increasing")
+
+    intervals = np.diff(days)
+    design = np.zeros((len(pairs), intervals.size))
+    for k, (reference, secondary) in enumerate(pairs):
+        if not 0 <= reference < secondary < days.size:
+            raise ValueError(f"Invalid interferogram pair {(reference, secondary)}")
+        design[k, reference:secondary] = intervals[reference:secondary]
+    return design
+
+
+def invert_pixels(observations: np.ndarray, design: np.ndarray,
+                  min_valid: Optional[int] = None) -> np.ndarray:
+    """
+    Solve the small-baseline network for a block of pixels.
+
+    Parameters
+    ----------
+    observations : np.ndarray
+        Unwrapped displacements of shape (interferograms, pixels); NaN
+        marks an interferogram that is missing at a pixel
+    design : np.ndarray
+        Output of ``sbas_design_matrix``
+    min_valid : int, optional
+        Pixels with fewer valid interferograms are left NaN (default: the
+        number of unknowns)
+
+    Returns
+    -------
+    np.ndarray
+        Interval velocities of shape (dates - 1, pixels) per day
+    """
+    n_ifg, n_pix = observations.shape
+    if min_valid is None:
+        min_valid = design.shape[1]
+
+    valid = np.isfinite(observations)
+    velocities = np.full((design.shape[1], n_pix), np.nan)
+    usable = valid.sum(axis=0) >= min_valid
+    if not usable.any():
+        return velocities
+
+    # One pseudo-inverse per distinct pattern of valid interferograms
+    packed = np.packbits(valid[:, usable], axis=0)
+    patterns, inverse = np.unique(packed, axis=1, return_inverse=True)
+    inverse = inverse.ravel()
+    columns = np.flatnonzero(usable)
+    for p in range(patterns.shape[1]):
+        rows = np.unpackbits(patterns[:, p], count=n_ifg).astype(bool)
+        pixels = columns[inverse == p]
+        velocities[:, pixels] = np.linalg.pinv(design[rows]) @ observations[np.ix_(rows, pixels)]
+    return velocities
+
+
+def tile_slices(shape: Tuple[int, int], tile_size: int) -> List[Tuple[slice, slice]]:
+    """Row/column slices covering a (rows, cols) grid in square tiles."""
+    rows, cols = shape
+    return [(slice(r, min(r + tile_size, rows)), slice(c, min(c + tile_size, cols)))
+            for r in range(0, rows, tile_size)
+            for c in range(0, cols, tile_size)]
+
+
+def _invert_tile(args) -> int:
+    """
+    Invert one tile and write it into the output memory maps.
+
+    Module-level so it can be shipped to worker processes; workers reopen
+    the stack and outputs by path instead of receiving arrays.
+    """
+    (stack, out_dir, tile, design, days, scale, reference_values, min_valid) = args
+    if isinstance(stack, str):
+        stack = np.load(stack, mmap_mode='r')
+    rows, cols = tile
+
+    block = np.asarray(stack[:, rows, cols], dtype=np.float64)
+    n_ifg, n_rows, n_cols = block.shape
+    observations = block.reshape(n_ifg, -1) * scale
+    if reference_values is not None:
+        observations -= reference_values[:, None]
+
+    velocities = invert_pixels(observations, design, min_valid)
+    displacement = np.zeros((days.size, velocities.shape[1]))
+    displacement[1:] = np.cumsum(velocities * np.diff(days)[:, None], axis=0)
+    displacement[:, np.isnan(velocities).any(axis=0)] = np.nan
+
+    # Linear trend of the cumulative displacement, per year
+    dt = days - days.mean()
+    trend = (dt / np.dot(dt, dt)) @ displacement * DAYS_PER_YEAR
+
+    out = np.load(os.path.join(out_dir, 'displacement.npy'), mmap_mode='r+')
+    out[:, rows, cols] = displacement.reshape(days.size, n_rows, n_cols)
+    out.flush()
+    out = np.load(os.path.join(out_dir, 'velocity.npy'), mmap_mode='r+')
+    out[rows, cols] = trend.reshape(n_rows, n_cols)
+    out.flush()
+    return n_rows * n_cols
+
+
+def sbas_invert(stack: Union[str, np.ndarray], dates,
+                pairs: Sequence[Tuple[int, int]], out_dir: str,
+                wavelength: Optional[float] = None,
+                reference_pixel: Optional[Tuple[int, int]] = None,
+                min_valid: Optional[int] = None,
+                tile_size: int = 256,
+                max_workers: Optional[int] = None,
+                executor: Optional[Executor] = None,
+                dtype=np.float32) -> Dict:
+    """
+    SBAS time-series inversion of an interferogram stack, tile by tile.
+
+    Parameters
+    ----------
+    stack : str or np.ndarray
+        Path to a (interferograms, rows, cols) ``.npy`` stack, which is
+        memory-mapped, or an array. Arrays are processed in this process;
+        pass a path to run tiles on a process pool.
+    dates : array-like
+        Sorted acquisition dates (datetime64 or days)
+    pairs : sequence of (int, int)
+        Reference and secondary acquisition index of every interferogram
+    out_dir : str
+        Directory for the ``displacement.npy`` and ``velocity.npy`` outputs
+    wavelength : float, optional
+        Radar wavelength (meters); when given the stack holds unwrapped
+        phase in radians, otherwise LOS displacement in meters
+    reference_pixel : (int, int), optional
+        Pixel whose displacement is subtracted from every interferogram
+    min_valid : int, optional
+        See ``invert_pixels``
+    tile_size : int
+        Tile edge length in pixels
+    max_workers : int, optional
+        Size of the process pool; 1 runs serially
+    executor : Executor, optional
+        Existing executor to run the tiles on
+    dtype : numpy dtype
+        Output dtype (float32 halves the size of the displacement cube)
+
+    Returns
+    -------
+    dict
+        ``displacement`` and ``velocity`` as read-only memory maps (meters
+        and meters per year, positive towards the satellite) and ``dates``
+    """
+    data = np.load(stack, mmap_mode='r') if isinstance(stack, str) else np.asarray(stack)
+    if data.ndim != 3 or data.shape[0] != len(pairs):
+        raise ValueError(f"Stack of shape {data.shape} does not match {len(pairs)} pairs")
+
+    days = _as_days(dates)
+    design = sbas_design_matrix(days, pairs)
+    scale = 1.0 if wavelength is None else -wavelength / (4 * np.pi)
+    shape = data.shape[1:]
+
+    reference_values = None
+    if reference_pixel is not None:
+        reference_values = np.asarray(data[:, reference_pixel[0], reference_pixel[1]],
+                                      dtype=np.float64) * scale
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, out_shape in (('displacement.npy', (days.size, *shape)), ('velocity.npy', shape)):
+        out = np.lib.format.open_memmap(os.path.join(out_dir, name), mode='w+',
+                                        dtype=dtype, shape=out_shape)
+        del out
+
+    source = stack if isinstance(stack, str) else data
+    tasks = [(source, out_dir, tile, design, days, scale, reference_values, min_valid)
+             for tile in tile_slices(shape, tile_size)]
+
+    if executor is not None and isinstance(stack, str):
+        pixels = sum(executor.map(_invert_tile, tasks))
+    elif not isinstance(stack, str) or len(tasks) == 1 or max_workers == 1:
+        pixels = sum(_invert_tile(task) for task in tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pixels = sum(pool.map(_invert_tile, tasks))
+    logger.debug(f"SBAS inversion of {len(pairs)} interferograms: "
+                 f"{pixels} pixels in {len(tasks)} tiles")
+
+    return {
+        'dates': np.asarray(dates),
+        'displacement': np.load(os.path.join(out_dir, 'displacement.npy'), mmap_mode='r'),
+        'velocity': np.load(os.path.join(out_dir, 'velocity.npy'), mmap_mode='r'),
+    }
+
+
+def los_observations(field: np.ndarray, x_coords: np.ndarray, y_coords: np.ndarray,
+                     step: int = 10, incidence_angle: Optional[float] = None
+                     ) -> Tuple[np.ndarray, ...]:
+    """
+    Subsample a LOS map into observations for the Mogi inversion.
+
+    Without horizontal motion the LOS displacement of a Mogi source is
+    mostly vertical; it is converted with ``incidence_angle`` (degrees)
+    when given and the horizontal components are returned as NaN, which
+    ``invert_mogi`` and ``MogiGridSearch`` treat as missing.
+
+    Parameters
+    ----------
+    field : np.ndarray
+        (rows, cols) displacement, e.g. one epoch of the displacement cube
+    x_coords, y_coords : np.ndarray
+        Pixel coordinates as 1-D axes (cols,), (rows,) or full grids
+    step : int
+        Keep every ``step``-th pixel along each axis
+    incidence_angle : float, optional
+        Radar incidence angle in degrees
+
+    Returns
+    -------
+    tuple of np.ndarray
+        x, y, ux, uy, uz of the valid subsampled pixels
+    """
+    field = np.asarray(field[::step, ::step], dtype=float)
+    x_coords, y_coords = np.asarray(x_coords), np.asarray(y_coords)
+    if x_coords.ndim == 1:
+        x_coords, y_coords = np.meshgrid(x_coords, y_coords)
+    x = x_coords[::step, ::step].ravel()
+    y = y_coords[::step, ::step].ravel()
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    uz = field.ravel()
+    if incidence_angle is not None:
+        uz = uz / np.cos(np.radians(incidence_angle))
+    keep = np.isfinite(uz)
+    missing = np.full(int(keep.sum()), np.nan)
+    return x[keep], y[keep], missing, missing.copy(), uz[keep]
@@ -0,0 +1,214 @@
+"""
+Cache
+utils/cache.py
+
+Content-addressed memo cache for values that are expensive to recompute.
+
+Keys are hashes of the inputs themselves (DataFrames, arrays, configs), so
+an entry is reused exactly as long as its inputs are unchanged. Entries live
+in an in-memory LRU tier and, when ``cache_dir`` is given, in a JSON disk
+tier that survives restarts and is shared by worker processes:
+
+    <cache_dir>/<key>.json   {"value": ..., "stored_at": <unix time>}
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _update_digest(digest, value: Any):
+    """Feed a stable byte representation of ``value`` into ``digest``."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        digest.update(repr(value).encode())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"ndarray{value.shape}{value.dtype.str}".encode())
+        if value.dtype.hasobject:
+            digest.update(repr(value.tolist()).encode())
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value, key=repr):
+            _update_digest(digest, key)
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    elif hasattr(value, 'columns') and hasattr(value, 'dtypes'):
+        import pandas as pd
+
+        digest.update(f"frame{value.shape}".encode())
+        digest.update(repr([(str(c), str(t)) for c, t in value.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif hasattr(value, 'dtype') and hasattr(value, 'index'):
+        import pandas as pd
+
+        digest.update(f"series{len(value)}{value.dtype}{value.name!r}".encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    else:
+        digest.update(repr(value).encode())
+
+
+def content_key(*parts: Any) -> str:
+    """
+    Stable hash of arbitrary inputs.
+
+    DataFrames and Series are hashed by content (values, index, column
+    names and dtypes), arrays by shape, dtype and bytes, and dicts
+    independently of insertion order.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        _update_digest(digest, part)
+    return digest.hexdigest()
+
+
+class MemoCache:
+    """
+    Two-tier memo cache with LRU and TTL eviction.
+
+    Parameters
+    ----------
+    max_entries : int
+        Entries kept in memory; the least recently used is evicted first
+    ttl : float, optional
+        Seconds after which an entry is stale (default: never)
+    cache_dir : str, optional
+        Directory of the disk tier; values must be JSON serializable
+    clock : callable
+        Wall clock in seconds (``time.time``); disk entries use it too
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None,
+                 cache_dir: Optional[str] = None, clock: Callable[[], float] = time.time):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = int(max_entries)
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.clock = clock
+        # key -> (value, stored_at)
+        self._entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key, count=False) is not _MISSING
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and self.clock() - stored_at > self.ttl
+
+    def _path(self, key: str) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Tuple[Any, Optional[float]]:
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+            return entry['value'], float(entry['stored_at'])
+        except FileNotFoundError:
+            return _MISSING, None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return _MISSING, None
+
+    def _remember(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, key: str, count: bool = True) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._expired(entry[1]):
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return entry[0]
+            del self._entries[key]
+            if count:
+                self.expirations += 1
+
+        if self.cache_dir is not None:
+            value, stored_at = self._read_disk(key)
+            if value is not _MISSING and stored_at is not None:
+                if not self._expired(stored_at):
+                    self._remember(key, value, stored_at)
+                    if count:
+                        self.hits += 1
+                        self.disk_hits += 1
+                    return value
+                if count:
+                    self.expirations += 1
+                    try:
+                        os.remove(self._path(key))
+                    except OSError:
+                        pass
+
+        if count:
+            self.misses += 1
+        return _MISSING
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Cached value for ``key``, or ``default`` (counted as a miss)."""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def put(self, key: str, value: Any):
+        """Store ``value`` in memory and, if configured, on disk."""
+        stored_at = self.clock()
+        self._remember(key, value, stored_at)
+
+        if self.cache_dir is not None:
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({'value': value, 'stored_at': stored_at}, f)
+                os.replace(tmp_path, path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Could not write cache entry {key}: {e}")
+
+    def clear(self):
+        """Drop every entry from both tiers (statistics are kept)."""
+        self._entries.clear()
+        if self.cache_dir is not None:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and eviction counts since creation."""
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'entries': len(self._entries),
+        }
@@ -2,12 +2,343 @@
 Io
 utils/io.py
 
-Module for io.
+Columnar, time-partitioned on-disk store for monitoring time series.
+
+Each dataset (seismic, gps, gas, thermal, ...) is ingested once and split
+into monthly partitions. Within a partition every column is its own file,
+so a monitoring cycle reads only the columns and the time window it needs:
+
+    <root>/<dataset>/_schema.json
+    <root>/<dataset>/2024-01/time.npy        (format='npy', memory-mapped)
+    <root>/<dataset>/2024-01/magnitude.npy
+    <root>/<dataset>/2024-01.parquet         (format='parquet', needs pyarrow)
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TimeLike = Union[str, pd.Timestamp, np.datetime64, None]
+
+SCHEMA_FILE = '_schema.json'
+FORMATS = ('npy', 'parquet')
+
+
+def _partition_key(times: np.ndarray) -> np.ndarray:
+    """Monthly partition labels ('YYYY-MM') for datetime64 values."""
+    return np.datetime_as_string(times.astype('datetime64[M]'), unit='M')
+
+
+def _to_datetime64(value: TimeLike) -> Optional[np.datetime64]:
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return np.datetime64(timestamp.value, 'ns')
+
+
+def _column_array(series: pd.Series) -> np.ndarray:
+    """Column as a fixed-width (memory-mappable) NumPy array."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        return series.to_numpy(dtype='datetime64[ns]')
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.to_numpy()
+    return series.astype(str).to_numpy(dtype=str)
+
+
+class TimeSeriesStore:
+    """
+    Columnar, monthly-partitioned time-series store.
+
+    Parameters
+    ----------
+    root : str
+        Store directory (created if needed)
+    format : str
+        ``'npy'`` (memory-mapped NumPy columns, no extra dependencies) or
+        ``'parquet'`` (requires pyarrow) for newly created datasets;
+        existing datasets keep the format recorded in their schema
+    """
+
+    def __init__(self, root: str, format: str = 'npy'):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown store format '{format}', expected one of {FORMATS}")
+        if format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet storage requires pyarrow: pip install pyarrow")
+
+        self.root = root
+        self.format = format
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Layout helpers
+    # ------------------------------------------------------------------
+    def _dataset_dir(self, dataset: str) -> str:
+        return os.path.join(self.root, dataset)
+
+    def _schema(self, dataset: str) -> Optional[Dict]:
+        path = os.path.join(self._dataset_dir(dataset), SCHEMA_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write_schema(self, dataset: str, schema: Dict):
+        path = os.path.join(self._dataset_dir(dataset), SCHEMA_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(schema, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def datasets(self) -> List[str]:
+        """Names of the datasets in the store."""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, SCHEMA_FILE))
+        )
+
+    def partitions(self, dataset: str) -> List[str]:
+        """Partition labels ('YYYY-MM') of a dataset, oldest first."""
+        schema = self._schema(dataset)
+        return sorted(schema['partitions']) if schema else []
+
+    def columns(self, dataset: str) -> List[str]:
+        """Column names of a dataset (time column first)."""
+        schema = self._schema(dataset)
+        return list(schema['columns']) if schema else []
+
+    # ------------------------------------------------------------------
+    # Partition I/O
+    # ------------------------------------------------------------------
+    def _read_partition(self, dataset: str, schema: Dict, partition: str,
+                        columns: Sequence[str], start: Optional[np.datetime64],
+                        end: Optional[np.datetime64]) -> pd.DataFrame:
+        time_column = schema['time_column']
+        base = os.path.join(self._dataset_dir(dataset), partition)
+
+        if schema['format'] == 'parquet':
+            filters = []
+            if start is not None:
+                filters.append((time_column, '>=', pd.Timestamp(start)))
+            if end is not None:
+                filters.append((time_column, '<', pd.Timestamp(end)))
+            read_columns = list(dict.fromkeys([time_column, *columns]))
+            frame = pd.read_parquet(f"{base}.parquet", columns=read_columns,
+                                    filters=filters or None)
+            return frame[list(columns)]
+
+        times = np.load(os.path.join(base, f"{time_column}.npy"), mmap_mode='r')
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side='left'))
+
+        # Only the selected rows of the selected columns are paged in
+        return pd.DataFrame({
+            column: np.array(np.load(os.path.join(base, f"{column}.npy"), mmap_mode='r')[lo:hi])
+            for column in columns
+        })
+
+    def _write_partition(self, dataset: str, schema: Dict, partition: str,
+                         frame: pd.DataFrame):
+        base = os.path.join(self._dataset_dir(dataset), partition)
+
+        if schema['format'] == 'parquet':
+            tmp_path = f"{base}.parquet.tmp"
+            frame.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, f"{base}.parquet")
+            return
+
+        tmp_dir = f"{base}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for column in frame.columns:
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), _column_array(frame[column]))
+
+        old_dir = f"{base}.old"
+        if os.path.exists(base):
+            os.replace(base, old_dir)
+        os.replace(tmp_dir, base)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _prepare(self, dataset: str, data: pd.DataFrame, time_column: str,
+                 schema: Optional[Dict] = None) -> Tuple[pd.DataFrame, Dict]:
+        """Validate rows against the dataset schema (created if new), time-sorted."""
+        if time_column not in data.columns:
+            raise ValueError(f"Data for '{dataset}' has no '{time_column}' column")
+
+        frame = data.copy()
+        frame[time_column] = pd.to_datetime(frame[time_column], utc=True).dt.tz_localize(None)
+        frame = frame.sort_values(time_column, kind='stable').reset_index(drop=True)
+
+        if schema is None:
+            schema = self._schema(dataset)
+        if schema is None:
+            os.makedirs(self._dataset_dir(dataset), exist_ok=True)
+            columns = [time_column] + [c for c in frame.columns if c != time_column]
+            schema = {'time_column': time_column, 'columns': columns,
+                      'format': self.format, 'partitions': []}
+        elif schema['time_column'] != time_column:
+            raise ValueError(f"Dataset '{dataset}' uses time column '{schema['time_column']}'")
+
+        missing = [c for c in schema['columns'] if c not in frame.columns]
+        extra = [c for c in frame.columns if c not in schema['columns']]
+        if missing or extra:
+            raise ValueError(f"Columns do not match dataset '{dataset}': "
+                             f"missing {missing}, unexpected {extra}")
+        return frame[schema['columns']], schema
+
+    def _merge_partition(self, dataset: str, schema: Dict, partition: str,
+                         rows: pd.DataFrame, unique: bool):
+        """Merge rows into one partition with a single rewrite."""
+        time_column = schema['time_column']
+        if partition in schema['partitions']:
+            existing = self._read_partition(dataset, schema, partition,
+                                            schema['columns'], None, None)
+            rows = pd.concat([existing, rows], ignore_index=True)
+        else:
+            schema['partitions'] = sorted(schema['partitions'] + [partition])
+        rows = rows.sort_values(time_column, kind='stable').reset_index(drop=True)
+        if unique:
+            rows = rows.drop_duplicates(time_column, keep='last', ignore_index=True)
+        self._write_partition(dataset, schema, partition, rows)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def ingest(self, dataset: str, data: pd.DataFrame, time_column: str = 'time',
+               unique: bool = False):
+        """
+        Add rows to a dataset, merging them into their monthly partitions.
+
+        Parameters
+        ----------
+        dataset : str
+            Dataset name, e.g. ``'seismic'`` or ``'gps'``
+        data : pd.DataFrame
+            Rows to add; must contain ``time_column``
+        time_column : str
+            Name of the timestamp column
+        unique : bool
+            Keep one row per timestamp: a new row replaces a stored row with
+            the same time, so re-ingesting the same rows is idempotent
+        """
+        if data.empty:
+            return
+        frame, schema = self._prepare(dataset, data, time_column)
+
+        keys = _partition_key(frame[time_column].to_numpy(dtype='datetime64[ns]'))
+        for partition in pd.unique(keys):
+            self._merge_partition(dataset, schema, partition, frame[keys == partition], unique)
+
+        self._write_schema(dataset, schema)
+        logger.debug(f"Ingested {len(frame)} rows into {dataset}")
+
+    def ingest_csv(self, dataset: str, path: str, time_column: str = 'time',
+                   chunksize: int = 500_000, max_buffered_rows: Optional[int] = None,
+                   **read_csv_kwargs):
+        """
+        Ingest a (possibly very large) CSV file in chunks.
+
+        Chunks are buffered per partition so that each partition is
+        rewritten once rather than once per chunk. A partition is written
+        when a chunk starts past its month (always the case for files in
+        time order), or when more than ``max_buffered_rows`` rows (default
+        ``4 * chunksize``) are buffered.
+        """
+        if max_buffered_rows is None:
+            max_buffered_rows = 4 * chunksize
+        pending: Dict[str, List[pd.DataFrame]] = {}
+        buffered = 0
+        schema = None
+
+        def write(partitions):
+            nonlocal buffered
+            for partition in partitions:
+                rows = pending.pop(partition)
+                buffered -= sum(len(r) for r in rows)
+                self._merge_partition(dataset, schema, partition,
+                                      pd.concat(rows, ignore_index=True), unique=False)
+            if partitions:
+                self._write_schema(dataset, schema)
+
+        for chunk in pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs):
+            if chunk.empty:
+                continue
+            frame, schema = self._prepare(dataset, chunk, time_column, schema)
+            keys = _partition_key(frame[time_column].to_numpy(dtype='datetime64[ns]'))
+            for partition in pd.unique(keys):
+                pending.setdefault(partition, []).append(frame[keys == partition])
+            buffered += len(frame)
+
+            if buffered > max_buffered_rows:
+                write(sorted(pending))
+            else:
+                write(sorted(p for p in pending if p < keys[0]))
+        write(sorted(pending))
+
+    def read(self, dataset: str, start: TimeLike = None, end: TimeLike = None,
+             columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Read a time window of a dataset.
+
+        Parameters
+        ----------
+        dataset : str
+            Dataset name
+        start, end : str or timestamp, optional
+            Half-open window [start, end); open-ended when omitted
+        columns : iterable of str, optional
+            Columns to load (default all); the time column is always included
+
+        Returns
+        -------
+        pd.DataFrame
+            Rows in time order
+        """
+        schema = self._schema(dataset)
+        if schema is None:
+            raise KeyError(f"No dataset '{dataset}' in {self.root}")
+
+        time_column = schema['time_column']
+        if columns is None:
+            selected = list(schema['columns'])
+        else:
+            selected = list(dict.fromkeys([time_column, *columns]))
+            unknown = [c for c in selected if c not in schema['columns']]
+            if unknown:
+                raise KeyError(f"Unknown columns for '{dataset}': {unknown}")
+
+        start = _to_datetime64(start)
+        end = _to_datetime64(end)
+        first = None if start is None else str(_partition_key(np.array([start]))[0])
+        last = None if end is None else str(_partition_key(np.array([end]))[0])
+
+        frames = [
+            self._read_partition(dataset, schema, partition, selected, start, end)
+            for partition in schema['partitions']
+            if (first is None or partition >= first) and (last is None or partition <= last)
+        ]
+        if not frames:
+            return pd.DataFrame({c: pd.Series(dtype='datetime64[ns]' if c == time_column else float)
+                                 for c in selected})
+        return pd.concat(frames, ignore_index=True)
+
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+def load_data_file(filepath: str, format: Optional[str] = None) -> pd.DataFrame:
+    """Load a tabular data file (CSV or Parquet) into a DataFrame."""
+    format = format or os.path.splitext(filepath)[1].lstrip('.').lower()
+    if format == 'parquet':
+        return pd.read_parquet(filepath)
+    return pd.read_csv(filepath)
@@ -2,12 +2,136 @@
 Report Generator
 visualization/report_generator.py
 
-Module for report generator.
+Renders VUAP reports for people and other programs.
+
+Reports are archived as structured records (see
+``integration/report_store.py``); TXT and JSON are produced on demand from
+the report dictionary by ``render``.
 """
 
-def main_function():
-    """Main function for this module."""
-    return "Functionality to be implemented"
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+PARAMETER_ORDER = ['S', 'P', 'G', 'D', 'H', 'E', 'W', 'L', 'R']
+FORMATS = ('txt', 'json')
+
+
+def json_default(value: Any) -> Any:
+    """``json.dumps`` fallback for NumPy scalars and arrays and datetimes."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def report_filename(report: Dict, fmt: str = 'txt') -> str:
+    """File name ``<volcano>_<YYYYmmdd_HHMMSS>.<fmt>`` of a report."""
+    volcano_safe = ''.join(c if c.isalnum() else '_' for c in report['volcano'])
+    timestamp = report['timestamp'].replace(':', '').replace('-', '').replace('T', '_').split('.')[0]
+    return f"{volcano_safe}_{timestamp}.{fmt}"
+
+
+def _number(value: Any, spec: str) -> str:
+    """Format a value, 'n/a' where it is missing (None or NaN)."""
+    if value is None or value != value:
+        return "n/a"
+    return format(float(value), spec)
+
+
+def format_probability(value: Optional[float], spec: str = '.1%') -> str:
+    """Eruption probability as a percentage, 'n/a' when there is none."""
+    return _number(value, spec)
+
+
+def _render_txt(report: Dict) -> str:
+    lines = [
+        "=" * 60,
+        f"🌋 VUAP REPORT: {report['volcano']}",
+        "=" * 60,
+        "",
+        f"📅 TIMESTAMP: {report['timestamp']}",
+        f"🚨 ALERT LEVEL: {report['alert_level']}",
+        f"📊 ERUPTION PROBABILITY: {_number(report['eruption_probability'], '.2%')}",
+    ]
+    if report.get('probability_ensemble'):
+        ensemble = report['probability_ensemble']
+        lines.append(f"   {ensemble['credible']:.0%} CREDIBLE INTERVAL: "
+                     f"{_number(ensemble['lower'], '.2%')} - {_number(ensemble['upper'], '.2%')}")
+    lines.append("")
+
+    lines.append("📈 STATE VECTOR:")
+    cells = [f"  {param}: {_number(value, '.3f')}"
+             for param, value in zip(PARAMETER_ORDER, report['state_vector'])]
+    for row in range(0, len(cells), 3):
+        lines.append(" | ".join(cells[row:row + 3]))
+    lines.append("")
+
+    lines.append("🚦 THRESHOLD STATUS:")
+    for key, value in report['threshold_status'].items():
+        status = "✅ ACTIVE" if value else "☑️ INACTIVE"
+        lines.append(f"  • {key.upper()}: {status}")
+    lines.append("")
+
+    lines.append("💡 RECOMMENDATIONS:")
+    for i, rec in enumerate(report['recommendations'], 1):
+        lines.append(f"  {i}. {rec}")
+    lines.append("")
+
+    lines.append("📋 PARAMETER VALUES:")
+    timings = report.get('parameter_timings') or {}
+    for param, value in report['parameter_values'].items():
+        if value is None:
+            lines.append(f"  {param}: n/a")
+        elif param in timings:
+            lines.append(f"  {param}: {float(value):.3f} ({timings[param] * 1000:.1f} ms)")
+        else:
+            lines.append(f"  {param}: {float(value):.3f}")
+    lines.append("")
+
+    if report.get('parameter_cache'):
+        cache = report['parameter_cache']
+        lines.append(f"🗃️  PARAMETER CACHE: {cache['hits']} hits, {cache['misses']} misses")
+        lines.append("")
+
+    if report.get('analogues'):
+        analogues = report['analogues']
+        lines.append(f"🔎 HISTORICAL ANALOGUES ({analogues['k']}):")
+        for match in analogues['matches']:
+            outcome = ("no eruption recorded" if match['days_to_eruption'] is None
+                       else f"eruption after {match['days_to_eruption']:.1f} days")
+            lines.append(f"  • {match['volcano']} {match['time']} "
+                         f"(distance {match['distance']:.3f}): {outcome}")
+        lines.append("")
+
+    lines.append(f"⏭️  NEXT ASSESSMENT: {report['next_assessment']}")
+    lines.append("=" * 60)
+    return "\n".join(lines) + "\n"
+
+
+def render(report: Dict, fmt: str = 'txt') -> str:
+    """
+    Render a VUAP report.
+
+    Parameters
+    ----------
+    report : dict
+        Report from ``generate_vuap_report`` or a ``ReportStore`` query
+    fmt : str
+        'txt' (human-readable summary) or 'json' (full report)
 
-if __name__ == "__main__":
-    print("Module:", __file__)
+    Returns
+    -------
+    str
+        The rendered report
+    """
+    if fmt == 'txt':
+        return _render_txt(report)
+    if fmt == 'json':
+        return json.dumps(report, indent=2, ensure_ascii=False, default=json_default)
+    raise ValueError(f"Unknown report format '{fmt}', expected one of {FORMATS}")
@@ -2,10 +2,639 @@
 Tests for integration.
 """
 
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.integration.analogues import AnalogueIndex
+from src.integration.eruption_probability import EnsembleProbability, reference_states
+from src.integration.parameter_graph import INPUT_SPECS, ParameterGraph, prepare_catalog
+from src.integration.report_store import ReportStore, ReportWriter
+from src.integration.scheduler import MonitoringScheduler
+from src.integration.state_vector import (
+    PARAMETER_NAMES, STATE_DTYPE, HistoryBuffer, StateVector, state_array,
+)
+from src.integration.threshold_detection import ThresholdDetector, detect_thresholds
+from src.integration.vuap import VolcanicMonitoringFramework
+from src.utils.cache import MemoCache
+from src.visualization.report_generator import format_probability, render
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Cold-start budget (seconds) for importing the CLI report path
+IMPORT_BUDGET = float(os.environ.get('VOLCANO_IMPORT_BUDGET', '2.0'))
+
+
 def test_example():
     """Example test."""
     assert True
 
+
+def test_batch_probabilities_match_single_vector_scoring():
+    """Batch scoring agrees with the per-vector method for any leading shape."""
+    framework = VolcanicMonitoringFramework("Test Volcano")
+    rng = np.random.default_rng(0)
+    states = rng.uniform(0.0, 1.0, size=(3, 4, 9))
+
+    batch = framework.calculate_eruption_probabilities(states)
+    single = np.array([
+        [framework.calculate_eruption_probability(v) for v in row] for row in states
+    ])
+
+    assert batch.shape == (3, 4)
+    np.testing.assert_allclose(batch, single)
+
+
+def test_score_state_vectors_classifies_thresholds():
+    """Threshold flags are derived from the configured levels."""
+    framework = VolcanicMonitoringFramework("Test Volcano")
+    probabilities = np.array([0.2, 0.6, 0.75, 0.9])
+
+    status = framework.classify_probabilities(probabilities)
+
+    assert status['warning'].tolist() == [False, True, True, True]
+    assert status['critical'].tolist() == [False, False, True, True]
+    assert status['alert'].tolist() == [False, False, False, True]
+
+
+def test_probability_ensemble_intervals_and_reference_states():
+    """Ensembles bracket the deterministic value; every reference state counts."""
+    framework = VolcanicMonitoringFramework("Test Volcano", volcano_type='Stratovolcano')
+    sealed = reference_states('stratovolcano')[1]
+    assert np.isclose(framework.calculate_eruption_probabilities(sealed), 1 / (1 + np.exp(-0.75)))
+
+    state = np.array([0.5, 0.4, 0.6, 0.5, 0.3, 0.2, 0.4, 0.1, 0.5])
+    exact = framework.calculate_probability_ensemble(state, np.zeros(9))
+    assert np.isclose(exact['lower'], exact['upper']) and np.isclose(exact['mean'], exact['probability'])
+
+    ensemble = EnsembleProbability(framework._weights, framework._reference_states,
+                                   n_samples=4000, thresholds={'warning': 0.5}, seed=0)
+    batch = ensemble.evaluate(np.stack([state, sealed]), 0.1)
+    assert batch['mean'].shape == (2,)
+    assert batch['lower'][0] < batch['probability'][0] < batch['upper'][0]
+    # A reference state is the model's maximum: noise can only lower it
+    assert batch['upper'][1] <= batch['probability'][1]
+    assert batch['exceedance']['warning'][1] > batch['exceedance']['warning'][0]
+
+    ensemble.evaluate(state, 0.05)
+    start = time.perf_counter()
+    for _ in range(20):
+        ensemble.evaluate(state, 0.05)
+    assert (time.perf_counter() - start) / 20 < 0.02
+
+    report = framework.generate_vuap_report()
+    assert report['probability_ensemble']['credible'] == 0.9
+
+    # Missing parameters are not perturbed: only their sigma here, so no spread
+    partial = np.where(np.arange(9) < 4, state, np.nan)
+    fixed = ensemble.evaluate(partial, np.where(np.arange(9) < 4, 0.0, 0.3))
+    assert np.isclose(fixed['lower'], fixed['probability']) and np.isclose(fixed['upper'], fixed['probability'])
+
+    # Without any data there is no probability, not a biased interval
+    empty = VolcanicMonitoringFramework("Test Volcano").generate_vuap_report()
+    assert empty['missing_parameters'] == PARAMETER_NAMES
+    assert empty['eruption_probability'] is None
+    assert all(np.isnan(empty['probability_ensemble'][key]) for key in ('mean', 'lower', 'upper'))
+    assert np.isnan(empty['probability_ensemble']['exceedance']['warning'])
+
+
+def test_report_without_enough_data_is_no_data_not_normal():
+    """Missing or too few parameters give an explicit NO DATA level, never NORMAL."""
+    empty = VolcanicMonitoringFramework("Test Volcano").generate_vuap_report()
+    assert empty['alert_level'] == "⚪ NO DATA" and empty['color_code'] == "GRAY"
+    assert not any(empty['threshold_status'][level] for level in ('warning', 'critical', 'alert'))
+    assert empty['recommendations'][0].startswith("Restore monitoring data: 0 of 9")
+    assert "nan" not in render(empty, 'txt').lower()
+    assert format_probability(empty['eruption_probability']) == 'n/a'
+
+    sparse = VolcanicMonitoringFramework("Test Volcano")
+    sparse.parameters.update({'S': 0.1, 'P': 0.1})
+    report = sparse.generate_vuap_report()
+    assert report['alert_level'] == "⚪ NO DATA"
+    assert report['eruption_probability'] is not None
+    assert "missing: G, D, H, E, W, L, R" in report['recommendations'][0]
+
+    sparse.parameters['D'] = 0.1
+    assert sparse.generate_vuap_report()['alert_level'] == "🟢 NORMAL"
+
+
+def test_state_vector_records_missing_parameters_and_scores_without_conversion():
+    """Missing parameters are masked, not silently zero; record arrays score directly."""
+    now = datetime(2024, 1, 2)
+    state = StateVector.from_parameters(
+        {'S': 0.6, 'P': 0.5, 'G': None, 'D': 0.4}, now,
+        parameter_times={'S': now - timedelta(hours=2)}, uncertainties={'S': 0.1})
+    assert state.missing == ['G', 'H', 'E', 'W', 'L', 'R']
+    assert state.to_dict()['G'] is None and state.filled(-1.0)[2] == -1.0
+    assert state.parameter_times[0] == (now - timedelta(hours=2)).timestamp()
+    assert np.isclose(state.uncertainty[0], 0.1)
+
+    records = state_array(100_000)
+    assert records.itemsize == STATE_DTYPE.itemsize == 161
+    rng = np.random.default_rng(8)
+    records.values[:] = rng.uniform(0, 1, (100_000, 9))
+    records.valid[:] = True
+    view = StateVector.from_record(records, 5)
+    view.values[0] = 0.99
+    assert records.values[5, 0] == 0.99
+
+    framework = VolcanicMonitoringFramework("Test Volcano")
+    assert np.shares_memory(records.values, records)
+    np.testing.assert_allclose(framework.calculate_eruption_probabilities(records),
+                               framework.calculate_eruption_probabilities(np.array(records.values)))
+    assert StateVector.from_record(records, -1).time == records.time[-1]
+
+    # Missing parameters drop out of the distance, whatever value they hold
+    records.valid[:10, 2] = False
+    records.values[:10, 2] = 0.0
+    partial = framework.calculate_eruption_probabilities(records[:10])
+    records.values[:10, 2] = 1.0
+    np.testing.assert_allclose(framework.calculate_eruption_probabilities(records[:10]), partial)
+    weights = np.where(np.arange(9) == 2, 0.0, framework._weights)
+    weights *= framework._weights.sum() / weights.sum()
+    distance = np.sqrt(np.square(records.values[:10] - framework._reference_states[0]) @ weights)
+    np.testing.assert_allclose(partial, 1 / (1 + np.exp(2.5 * (distance - 0.3))))
+
+    framework.parameters = {'S': 0.5, 'P': None}
+    report = framework.generate_vuap_report()
+    assert 'P' in report['missing_parameters'] and report['state_vector'][1] is None
+    assert framework.state_vector_history.window()['valid'][-1].tolist() == [True] + [False] * 8
+    framework.parameters = dict.fromkeys(PARAMETER_NAMES)
+    assert np.isnan(framework.calculate_eruption_probability(framework.get_state_vector()))
+
+
+def test_analogue_index_matches_brute_force_across_rebuilds(tmp_path):
+    rng = np.random.default_rng(11)
+    weights = VolcanicMonitoringFramework("Etna")._weights
+    index = AnalogueIndex(weights, leafsize=8, rebuild_fraction=0.5, min_buffer=50)
+
+    volcanoes, vectors, times = [], [], []
+    for batch in range(6):
+        name = f"V{batch % 3}"
+        x = rng.random((40, 9))
+        t = 1e9 + 3600.0 * np.arange(batch * 40, (batch + 1) * 40)
+        index.add(name, x, t)
+        volcanoes += [name] * 40
+        vectors.append(x)
+        times.append(t)
+    vectors, times, volcanoes = np.vstack(vectors), np.concatenate(times), np.array(volcanoes)
+    assert len(index) == 240 and 0 < index.buffered < 240   # tree plus pending buffer
+
+    queries = rng.random((5, 9))
+    brute = np.sqrt(np.square(queries[:, None, :] - vectors[None, :, :]) @ weights)
+    result = index.query(queries, k=7)
+    np.testing.assert_allclose(result['distance'], np.sort(brute, axis=1)[:, :7])
+    np.testing.assert_array_equal(result['volcano'], volcanoes[result['index']])
+
+    # A volcano's own recent states are skipped; others are unaffected
+    now = times[volcanoes == 'V0'].mean()
+    own = index.query(queries[0], k=20, volcano='V0', time=now, exclude_window=1e5)
+    own_times = own['time'][own['volcano'] == 'V0']
+    assert len(own['distance']) == 20 and np.isfinite(own['distance']).all()
+    assert np.all(np.abs(own_times - now) >= 1e5)
+
+    index.set_eruptions({'V1': [times[-1] + 86400.0]})
+    index.save(str(tmp_path))
+    reopened = AnalogueIndex.load(str(tmp_path))
+    again = reopened.query(queries, k=7)
+    np.testing.assert_allclose(again['distance'], result['distance'])
+    v1 = again['volcano'] == 'V1'
+    np.testing.assert_allclose(again['time_to_eruption'][v1], times[-1] + 86400.0 - again['time'][v1])
+    assert np.isinf(again['time_to_eruption'][~v1]).all()
+
+    # Saving a reopened index over its own memory-mapped files keeps it intact
+    reopened.save(str(tmp_path))
+    reopened = AnalogueIndex.load(str(tmp_path))
+    np.testing.assert_allclose(reopened.query(queries, k=7)['distance'], result['distance'])
+
+    # New vectors after reopening are found immediately
+    reopened.add('V9', queries[:1], [2e9])
+    assert reopened.query(queries[0], k=1)['volcano'][0] == 'V9'
+
+    # Missing parameters are left out of the distance on both sides
+    partial = np.where(rng.random((30, 9)) < 0.2, np.nan, rng.random((30, 9)))
+    reopened.add('V8', partial, 3e9 + np.arange(30))
+    stored = np.vstack([vectors, queries[:1], partial])
+    probe = np.where(np.arange(9) == 4, np.nan, queries[1])
+    joint = np.isfinite(stored) & np.isfinite(probe)
+    squared = np.where(joint, np.square(stored - probe), 0.0) @ weights
+    expected = np.sqrt(squared * weights.sum() / (joint @ weights))
+    masked = reopened.query(probe, k=5)
+    np.testing.assert_allclose(masked['distance'], np.sort(expected)[:5])
+    np.testing.assert_array_equal(masked['index'], np.argsort(expected, kind='stable')[:5])
+
+
+def test_analogue_index_searches_trees_for_shared_missing_parameters(monkeypatch):
+    """Vectors sharing one missing set get their own tree; only rare patterns are scanned."""
+    rng = np.random.default_rng(5)
+    weights = VolcanicMonitoringFramework("Etna")._weights
+    missing = np.isin(np.arange(9), [4, 5, 6, 8])
+    stored = np.where(missing, np.nan, rng.random((500, 9)))
+    index = AnalogueIndex(weights)
+    index.add('Etna', stored, 1e9 + np.arange(500))
+    index.rebuild()
+
+    def no_scan(*args):
+        raise AssertionError("masked scan used")
+
+    probe = np.where(missing, np.nan, rng.random(9))
+    joint = ~missing
+    expected = np.sqrt(np.square(stored - probe)[:, joint] @ weights[joint]
+                       * weights.sum() / weights[joint].sum())
+    with monkeypatch.context() as patch:
+        patch.setattr(index, '_masked_candidates', no_scan)
+        result = index.query(probe, k=5)
+    np.testing.assert_allclose(result['distance'], np.sort(expected)[:5])
+    np.testing.assert_array_equal(result['index'], np.argsort(expected, kind='stable')[:5])
+
+    # A rare pattern stays in the scan, and is still found
+    index.add('Fuji', np.where(np.arange(9) < 2, probe, np.nan), 2e9)
+    index.rebuild()
+    assert len(index._trees) == 1 and len(index._scan_rows) == 1
+    assert index.query(probe, k=1)['volcano'][0] == 'Fuji'
+
+
+def test_report_store_batches_and_queries_by_volcano_and_time(tmp_path):
+    reports = []
+    for name in ("Etna", "Fuji"):
+        framework = VolcanicMonitoringFramework(name)
+        framework.parameters = dict.fromkeys(PARAMETER_NAMES, 0.6)
+        report = framework.generate_vuap_report()
+        for hour in range(5):
+            reports.append(dict(report, timestamp=f"2024-03-01T{hour:02d}:00:00",
+                                eruption_probability=0.1 * hour))
+
+    path = str(tmp_path / "reports.sqlite")
+    store = ReportStore(path, batch_size=4)
+    for report in reports:
+        store.append(report)
+    assert store.pending == 2                        # two full batches written
+    store.close()
+
+    with ReportStore(path) as store:
+        assert store.volcanoes() == ["Etna", "Fuji"]
+        assert store.count() == 10
+        window = store.query("Fuji", start="2024-03-01T01:00:00", end="2024-03-01T03:00:00")
+        assert [r["timestamp"][11:13] for r in window] == ["01", "02"]
+        assert store.latest("Etna")["timestamp"] == "2024-03-01T04:00:00"
+        times, probabilities = store.probabilities("Etna")
+        np.testing.assert_allclose(probabilities, 0.1 * np.arange(5))
+        assert np.all(np.diff(times) == 3600)
+
+        # Rendering works from the stored record as from the live report
+        stored = store.query("Etna", limit=1)[0]
+        assert render(stored, "txt") == render(reports[0], "txt")
+        assert json.loads(render(stored, "json")) == stored
+        exported = store.export(str(tmp_path / "txt"), "txt", volcano="Fuji")
+        assert len(exported) == 5 and exported[0].endswith("Fuji_20240301_000000.txt")
+
+
+class _SlowReportStore(ReportStore):
+    def flush(self):
+        if self._pending:
+            time.sleep(0.05)
+        return super().flush()
+
+
+def test_report_writer_batches_off_the_calling_thread(tmp_path):
+    framework = VolcanicMonitoringFramework("Etna")
+    framework.parameters = dict.fromkeys(PARAMETER_NAMES, 0.6)
+    report = framework.generate_vuap_report()
+    store = _SlowReportStore(str(tmp_path / "reports.sqlite"))
+
+    # A lone report is written once the flush interval passes
+    writer = ReportWriter(store, max_queue=100, batch_size=4, flush_interval=0.05)
+    writer.submit(report)
+    deadline = time.time() + 5
+    while writer.metrics()["written"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.count() == 1
+
+    started = time.perf_counter()
+    for hour in range(10):
+        writer.submit(dict(report, timestamp=f"2024-03-01T{hour:02d}:00:00"))
+    submit_time = time.perf_counter() - started
+    writer.close()                                   # drains what is still queued
+
+    metrics = writer.metrics()
+    assert submit_time < 0.05                        # never waited for the slow store
+    assert store.count() == 11
+    assert metrics["written"] == metrics["submitted"] == 11
+    assert metrics["queue_depth"] == 0 and metrics["batches"] >= 3
+    assert metrics["write_latency"]["mean"] >= 0.05
+    assert metrics["queue_latency"]["max"] >= metrics["write_latency"]["mean"]
+
+    # A closed writer neither hangs on flush nor accepts more reports; the
+    # framework falls back to the store instead of dropping them
+    assert writer.flush() is True
+    with pytest.raises(RuntimeError):
+        writer.submit(report)
+    framework.report_store, framework.report_writer = store, writer
+    framework._save_report(report)
+    store.flush()
+    assert store.count() == 12
+
+    # A producer blocked on a full queue holds no lock: metrics() answers
+    # at once and close() waits for the blocked report, then writes it
+    writer = ReportWriter(store, max_queue=1, batch_size=1, flush_interval=0.01)
+    accepted = []
+
+    def produce():
+        for _ in range(4):
+            try:
+                writer.submit(report)
+            except RuntimeError:
+                break
+            accepted.append(report)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    time.sleep(0.02)
+    started = time.perf_counter()
+    writer.metrics()
+    assert time.perf_counter() - started < 0.03
+    writer.close()
+    producer.join()
+    assert writer.metrics()["written"] == writer.metrics()["submitted"] == len(accepted) >= 1
+    assert store.count() == 12 + len(accepted)
+
+
+def test_threshold_detection_batch_matches_stream():
+    """Hysteresis and dwell suppress flapping; streaming reproduces the batch result."""
+    p = np.array([0.2, 0.52, 0.48, 0.51, 0.72, 0.9, 0.88, 0.6, 0.44, 0.3])
+    result = detect_thresholds(p, hysteresis=0.05)
+    assert result['levels'].tolist() == [0, 1, 1, 1, 2, 3, 3, 1, 0, 0]
+    assert [(c['index'], c['to']) for c in result['crossings']] == [
+        (1, 'warning'), (4, 'critical'), (5, 'alert'), (7, 'warning'), (8, 'normal')]
+    episode, = result['episodes']
+    assert (episode['onset'], episode['duration'], episode['peak_level'], episode['peak_index']) == (
+        1, 7, 'alert', 5)
+    assert len(detect_thresholds(p, hysteresis=0.0)['crossings']) == 7
+
+    rng = np.random.default_rng(7)
+    noisy = np.clip(0.55 + 0.4 * np.sin(np.arange(2000) / 80.0) + rng.normal(0, 0.03, 2000), 0, 1)
+    times = np.datetime64('2024-01-01T00') + np.arange(noisy.size) * np.timedelta64(1, 'h')
+    batch = detect_thresholds(noisy, times, hysteresis=0.02, min_dwell=3)
+    detector = ThresholdDetector(hysteresis=0.02, min_dwell=3)
+    crossings, episodes = [], []
+    for t, value in zip(times, noisy):
+        for crossing in detector.update(value, t):
+            if 'episode' in crossing:
+                episodes.append(crossing.pop('episode'))
+            crossings.append(crossing)
+    if detector.open_episode() is not None:
+        episodes.append(detector.open_episode())
+
+    assert crossings == batch['crossings'] and episodes == batch['episodes']
+    assert len(batch['episodes']) > 0
+    assert len(batch['crossings']) < len(detect_thresholds(noisy, hysteresis=0.0)['crossings'])
+
+    framework = VolcanicMonitoringFramework("Etna")
+    for value in (0.2, 0.9):
+        framework.check_thresholds(value)
+    assert [alert['message'] for alert in framework.alerts] == ['🚨 Level raised to ALERT (p=0.90)']
+
+
+def test_history_buffer_wraps_and_returns_contiguous_views():
+    """The ring buffer keeps the newest samples and exposes them as a view."""
+    history = HistoryBuffer(capacity=4, width=2)
+    for i in range(6):
+        history.append([i, 10 * i], timestamp=float(i))
+
+    window = history.window()
+    assert len(history) == 4
+    np.testing.assert_array_equal(window[:, 0], [2, 3, 4, 5])
+    np.testing.assert_array_equal(history.timestamps(2), [4.0, 5.0])
+    assert np.shares_memory(window, history.window(2))
+    np.testing.assert_allclose(history.rate_of_change(), [1.0, 10.0])
+
+    # State vector records: slopes per parameter, skipping missing entries
+    states = HistoryBuffer(capacity=4, dtype=STATE_DTYPE)
+    start = datetime(2024, 1, 1)
+    for i in range(4):
+        moment = start + timedelta(hours=i)
+        state = StateVector.from_parameters({'S': 0.1 * i, 'P': 0.5 if i == 2 else None}, moment)
+        states.append(state.record, timestamp=moment)
+    slopes = states.rate_of_change()
+    assert slopes.shape == (9,)
+    assert np.isclose(slopes[0], 0.1 / 3600) and np.all(slopes[1:] == 0.0)
+
+
+def test_framework_history_is_bounded(tmp_path):
+    """Report generation records history up to the configured capacity."""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("history_capacity: 3\n")
+    framework = VolcanicMonitoringFramework("Test Volcano", str(config_file))
+    framework.parameters = dict.fromkeys(framework.parameters, 0.5)
+
+    for _ in range(5):
+        framework.generate_vuap_report()
+
+    assert len(framework.state_vector_history) == 3
+    history = framework.state_vector_history.window()
+    assert history.dtype == STATE_DTYPE and history['values'].shape == (3, 9)
+    assert history['valid'].all()
+    assert len(framework.eruption_probability_history) == 3
+
+
+def test_scheduler_runs_volcanoes_concurrently():
+    """Every volcano completes its cycles and reports latency statistics."""
+    reports = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        scheduler = MonitoringScheduler(
+            {'Etna': {}, 'Kilauea': {'monitoring_interval': 0.01}},
+            default_interval=0.01,
+            executor=executor,
+            on_report=lambda framework, report: reports.append(report['volcano']),
+        )
+        asyncio.run(scheduler.run(max_cycles=2))
+
+    stats = scheduler.latency_stats()
+    assert sorted(reports) == ['Etna', 'Etna', 'Kilauea', 'Kilauea']
+    assert stats['Etna']['cycles'] == 2
+    assert stats['Kilauea']['failures'] == 0
+    assert stats['Kilauea']['max'] >= stats['Kilauea']['last'] >= 0.0
+
+
+def test_scheduler_detaches_report_writer_on_shutdown(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite"))
+    scheduler = MonitoringScheduler({'Etna': {}, 'Kilauea': {}}, default_interval=0.01,
+                                    report_store=store)
+    asyncio.run(scheduler.run(max_cycles=1))
+
+    assert scheduler.report_writer.closed
+    assert all(framework.report_writer is None for framework in scheduler.frameworks.values())
+    assert store.count() == 2
+    scheduler.frameworks['Etna'].flush_reports()     # returns at once after shutdown
+
+
+def test_parameter_graph_shares_inputs_and_times_parameters():
+    """S and P read one prepared catalog; values come from data, not chance."""
+    rng = np.random.default_rng(4)
+    times = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, 3, 200)), unit='D')
+    data = {
+        'seismic': pd.DataFrame({'time': times, 'magnitude': rng.exponential(0.5, 200) + 1.0,
+                                 'depth': rng.uniform(1, 10, 200)}),
+        'tremor': pd.DataFrame({'time': pd.date_range('2024-01-01', periods=240, freq='h'),
+                                'rsam': np.sin(np.arange(240) / 5.0) + 2.0}),
+    }
+    prepared = []
+
+    def counting_prepare(catalog):
+        prepared.append(len(catalog))
+        return prepare_catalog(catalog)
+
+    specs = {**INPUT_SPECS, 'seismic_catalog': {'dataset': 'seismic', 'prepare': counting_prepare}}
+    result = ParameterGraph(input_specs=specs, max_workers=4).evaluate(data)
+
+    assert prepared == [200]
+    assert {p for p, s in result['status'].items() if s == 'ok'} == {'S', 'P', 'L'}
+    assert result['status']['G'] == 'no_data'
+    assert set(result['timings']) == {'S', 'P', 'L'}
+    assert all(0.0 <= result['values'][p] <= 1.0 for p in 'SPL')
+    assert result['values']['D'] is None
+
+    framework = VolcanicMonitoringFramework("Test Volcano")
+    framework.monitoring_data = data
+    framework.calculate_parameters()
+    report = framework.generate_vuap_report()
+    assert report['parameter_values'] == result['values']
+    assert set(report['parameter_timings']) == {'S', 'P', 'L'}
+
+
+def test_parameter_cache_recomputes_only_changed_inputs(tmp_path):
+    """Unchanged inputs are served from the cache; LRU, TTL and disk tiers apply."""
+    rng = np.random.default_rng(5)
+    times = pd.date_range('2024-01-01', periods=100, freq='h')
+    catalog = pd.DataFrame({'time': times, 'magnitude': rng.exponential(0.5, 100) + 1.0,
+                            'depth': rng.uniform(1, 10, 100)})
+    gas = pd.DataFrame({'time': times, 'so2_flux': rng.uniform(500, 1500, 100)})
+
+    framework = VolcanicMonitoringFramework("Test Volcano")
+    framework.monitoring_data = {'seismic': catalog, 'gas': gas}
+    first = dict(framework.calculate_parameters())
+    framework.monitoring_data = {'seismic': catalog.copy(), 'gas': gas.assign(so2_flux=gas['so2_flux'] * 2)}
+    second = dict(framework.calculate_parameters())
+    report = framework.generate_vuap_report()
+
+    assert framework.parameter_status['S'] == framework.parameter_status['P'] == 'cached'
+    assert framework.parameter_status['G'] == 'ok'
+    assert second['S'] == first['S'] and second['G'] > first['G']
+    assert report['parameter_cache']['hits'] >= 2
+    assert report['parameter_cache']['misses'] == 4
+
+    now = [0.0]
+    cache = MemoCache(max_entries=2, ttl=10.0, cache_dir=str(tmp_path), clock=lambda: now[0])
+    for key in 'abc':
+        cache.put(key, 1.0)
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.get('a') == 1.0 and cache.disk_hits == 1
+    now[0] = 11.0
+    assert cache.get('b') is None and cache.expirations == 1
+    restarted = MemoCache(cache_dir=str(tmp_path))
+    assert restarted.get('c') == 1.0 and restarted.get('b') is None
+
+
+def _load_script(name):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / 'scripts' / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path, monkeypatch):
+    """Failed partitions are rerun on resume; finished ones are not duplicated."""
+    from src.utils.io import TimeSeriesStore
+
+    batch = _load_script('batch_processing')
+    rng = np.random.default_rng(6)
+    times = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, 3, 300)), unit='D')
+    TimeSeriesStore(str(tmp_path / 'Etna')).ingest('seismic', pd.DataFrame({
+        'time': times, 'magnitude': rng.exponential(0.5, 300) + 1.0, 'depth': rng.uniform(1, 10, 300)}))
+    volcanoes = {'Etna': {'data_sources': {'data_store': str(tmp_path / 'Etna')}}}
+
+    def engine():
+        return batch.BackfillEngine(volcanoes, str(tmp_path / 'out'), '2024-01-02', '2024-01-04',
+                                    chunk='12h', step='3h', window='1D',
+                                    executor=ThreadPoolExecutor(max_workers=2), flush_rows=4)
+
+    run_partition = batch.run_partition
+
+    def flaky(partition, *args):
+        if partition['start'].startswith('2024-01-03T12'):
+            raise RuntimeError('worker lost')
+        return run_partition(partition, *args)
+
+    monkeypatch.setattr(batch, 'run_partition', flaky)
+    first = engine().run()
+    assert (first['total'], first['completed'], first['failed']) == (4, 3, 1)
+
+    monkeypatch.setattr(batch, 'run_partition', run_partition)
+    second = engine().run()
+    assert (second['skipped'], second['completed'], second['rows']) == (3, 1, 4)
+
+    results = TimeSeriesStore(str(tmp_path / 'out')).read('vuap_Etna')
+    assert len(results) == 16 and results['time'].is_unique
+    assert results['S'].notna().all() and results['G'].isna().all()
+    assert results['eruption_probability'].between(0.0, 1.0).all()
+
+    # Rows written before a lost checkpoint are replaced when rerun
+    os.remove(tmp_path / 'out' / batch.CHECKPOINT_FILE)
+    assert engine().run()['completed'] == 4
+    rerun = TimeSeriesStore(str(tmp_path / 'out')).read('vuap_Etna')
+    pd.testing.assert_frame_equal(rerun, results)
+
+    # A volcano without a data store fails its partitions instead of backfilling NaN
+    with pytest.raises(ValueError, match='data_store'):
+        batch.run_partition({'volcano': 'Etna', 'start': '2024-01-02', 'end': '2024-01-03'},
+                            {}, None, '3h', '1D')
+
+
+def test_report_path_cold_start_within_budget(tmp_path):
+    """A one-off report stays light: no heavy stacks, CLI import within budget."""
+    probe = (
+        "import json, sys, time\n"
+        f"sys.path.insert(0, {str(REPO_ROOT)!r})\n"
+        "start = time.perf_counter()\n"
+        "import run_volcano\n"
+        "elapsed = time.perf_counter() - start\n"
+        "code = run_volcano.main(['--volcano', 'X', '--report', '--simple'])\n"
+        "heavy = [m for m in ('pandas', 'scipy', 'matplotlib', 'sklearn') if m in sys.modules]\n"
+        "print(json.dumps({'code': code, 'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    output = subprocess.run([sys.executable, '-c', probe], cwd=tmp_path,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result['code'] == 0
+    assert (tmp_path / 'results' / 'reports.sqlite').exists()
+    assert len(list((tmp_path / 'results' / 'reports').glob('X_*.txt'))) == 1
+    assert result['heavy'] == []
+    assert result['elapsed'] < IMPORT_BUDGET, (
+        f"CLI import took {result['elapsed']:.2f}s (budget {IMPORT_BUDGET:.2f}s)")
+
+
 if __name__ == "__main__":
     test_example()
+    test_batch_probabilities_match_single_vector_scoring()
+    test_score_state_vectors_classifies_thresholds()
+    test_probability_ensemble_intervals_and_reference_states()
+    test_report_without_enough_data_is_no_data_not_normal()
+    test_state_vector_records_missing_parameters_and_scores_without_conversion()
+    test_threshold_detection_batch_matches_stream()
+    test_history_buffer_wraps_and_returns_contiguous_views()
+    test_scheduler_runs_volcanoes_concurrently()
+    test_parameter_graph_shares_inputs_and_times_parameters()
     print("All tests passed!")
@@ -2,10 +2,150 @@
 Tests for models.
 """
 
+import numpy as np
+
+from src.models import okada
+from src.models.mogi import (
+    MogiGridSearch,
+    calculate_displacement,
+    calculate_multi_source_displacement,
+    invert_mogi,
+    mogi_jacobian,
+)
+
+
 def test_example():
     """Example test."""
     assert True
 
+
+def test_mogi_displacement_is_finite_above_source_and_chunk_invariant():
+    """r = 0 gives pure uplift; chunking, float32 and out= agree."""
+    x = np.linspace(-2000, 2000, 41)[None, :]
+    y = np.linspace(-2000, 2000, 31)[:, None]
+
+    ux, uy, uz = calculate_displacement(x, y, 2500, 1e6)
+    assert np.isfinite(ux).all() and np.isfinite(uy).all()
+    assert np.allclose([ux[15, 20], uy[15, 20]], 0.0, atol=1e-15)
+    assert np.isclose(uz[15, 20], 1e6 * 0.75 / np.pi / 2500**2)
+
+    out = tuple(np.empty((31, 41), dtype=np.float32) for _ in range(3))
+    chunked = calculate_displacement(x, y, 2500, 1e6, out=out, chunk_size=50)
+    assert chunked[2] is out[2] and out[2].dtype == np.float32
+    np.testing.assert_allclose(out[2], uz, rtol=1e-5)
+
+    summed = calculate_multi_source_displacement(
+        x, y, [(0.0, 0.0, 2500, 1e6),
+               {'source_x': 500.0, 'source_y': 0.0, 'source_depth': 1500, 'volume_change': -2e5}])
+    second = calculate_displacement(x - 500.0, y, 1500, -2e5)
+    for total, first, other in zip(summed, (ux, uy, uz), second):
+        np.testing.assert_allclose(total, first + other)
+
+
+def test_mogi_jacobian_matches_finite_differences():
+    """The analytic Jacobian agrees with central differences."""
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-5000, 5000, (2, 20))
+    params = np.array([300.0, -200.0, 3000.0, 1e6])
+
+    _, jac = mogi_jacobian(x, y, *params)
+    for i in range(4):
+        step = np.zeros(4)
+        step[i] = 1e-4 * abs(params[i])
+        up, _ = mogi_jacobian(x, y, *(params + step))
+        down, _ = mogi_jacobian(x, y, *(params - step))
+        np.testing.assert_allclose(jac[:, :, i], (up - down) / (2 * step[i]),
+                                   rtol=1e-5, atol=1e-12)
+
+
+def test_invert_mogi_recovers_synthetic_source():
+    """A noise-free synthetic source is recovered within bounds."""
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(-10000, 10000, (2, 500))
+    ux, uy, uz = calculate_displacement(x - 1200, y + 800, 4500, 2e6)
+
+    result = invert_mogi(ux, uy, uz, x, y, initial_depth=3000,
+                         n_starts=4, max_workers=1, random_state=0)
+
+    assert result['success']
+    np.testing.assert_allclose(
+        [result['source_x'], result['source_y'], result['source_depth'], result['volume_change']],
+        [1200, -800, 4500, 2e6], rtol=1e-4)
+
+    bounded = invert_mogi(ux, uy, uz, x, y, bounds=[None, None, (5000, 8000)],
+                          n_starts=2, random_state=0)
+    assert 5000 <= bounded['source_depth'] <= 8000
+
+
+def test_mogi_grid_search_uses_cached_greens_table(tmp_path):
+    """Grid search finds the source node and reuses the memory-mapped table."""
+    rng = np.random.default_rng(2)
+    x, y = rng.uniform(-8000, 8000, (2, 30))
+    ux, uy, uz = calculate_displacement(x - 1000, y + 1500, 4000, 1e6)
+    axes = (np.arange(-3000, 3001, 500), np.arange(-3000, 3001, 500),
+            np.arange(1000, 8001, 1000))
+
+    search = MogiGridSearch(x, y, *axes, cache_dir=str(tmp_path))
+    result = search.search(ux, uy, uz)
+
+    assert (result['source_x'], result['source_y'], result['source_depth']) == (1000, -1500, 4000)
+    assert np.isclose(result['volume_change'], 1e6)
+
+    cached = MogiGridSearch(x, y, *axes, cache_dir=str(tmp_path))
+    assert isinstance(cached.table, np.memmap)
+    assert len(list(tmp_path.glob('mogi_greens_*.npy'))) == 1
+
+    epochs = cached.search_epochs(*(np.stack([c, 2 * c], axis=1) for c in (ux, uy, uz)))
+    np.testing.assert_allclose(epochs['volume_change'], [1e6, 2e6])
+
+
+def test_okada_matches_published_check_values():
+    """Okada (1985) Table 2, case 2: x=2, y=3, d=4, dip=70, L=3, W=2, lambda=mu."""
+    dip = np.deg2rad(70.0)
+    u = okada._okada_frame(np.array(2.0), np.array(3.0), 4.0, 3.0, 2.0,
+                           np.sin(dip), np.cos(dip), 0.5)
+    expected = [
+        [-8.689e-3, -4.298e-3, -2.747e-3],   # strike-slip
+        [-4.682e-3, -3.527e-2, -3.564e-2],   # dip-slip
+        [-2.660e-4, 1.056e-2, 3.214e-3],     # tensile
+    ]
+    np.testing.assert_allclose(u, expected, rtol=2e-3)
+
+
+def test_okada_patch_evaluation_and_greens_matrix_agree():
+    """Vectorized patch sums, tilt and the Green's matrix are consistent."""
+    patches = {
+        'x': [0.0, 500.0], 'y': [0.0, -300.0], 'depth': [3000.0, 4000.0],
+        'strike': [10.0, 40.0], 'dip': [60.0, 90.0],
+        'length': [2000.0, 1000.0], 'width': [1000.0, 1500.0],
+        'rake': [30.0, 0.0], 'slip': [1.0, 0.5], 'opening': [0.0, 0.2],
+    }
+    x = np.linspace(-5000, 5000, 9)
+    y = np.linspace(-4000, 4000, 9)
+
+    fields = okada.evaluate_patches(x, y, patches, tilt=True)
+    G = okada.build_greens_matrix(x, y, patches, slip_components=('strike', 'dip', 'opening'))
+    rake = np.deg2rad(patches['rake'])
+    slip = np.array(patches['slip'])
+    model = np.concatenate([np.cos(rake) * slip, np.sin(rake) * slip, patches['opening']])
+
+    predicted = (G @ model).reshape(3, -1)
+    np.testing.assert_allclose(predicted[0], fields['ue'], atol=1e-12)
+    np.testing.assert_allclose(predicted[2], fields['uz'], atol=1e-12)
+
+    step = 1e-2
+    kwargs = {k: patches[k][1] for k in ('depth', 'strike', 'dip', 'length', 'width', 'opening')}
+    up = okada.calculate_displacement(x - 500 + step, y + 300, **kwargs)[2]
+    down = okada.calculate_displacement(x - 500 - step, y + 300, **kwargs)[2]
+    tilt_e, _ = okada.calculate_tilt(x - 500, y + 300, **kwargs)
+    np.testing.assert_allclose(tilt_e, (up - down) / (2 * step), rtol=1e-5, atol=1e-12)
+
+
 if __name__ == "__main__":
     test_example()
+    test_mogi_displacement_is_finite_above_source_and_chunk_invariant()
+    test_mogi_jacobian_matches_finite_differences()
+    test_invert_mogi_recovers_synthetic_source()
+    test_okada_matches_published_check_values()
+    test_okada_patch_evaluation_and_greens_matrix_agree()
     print("All tests passed!")
@@ -2,10 +2,117 @@
 Tests for parameters.
 """
 
+import numpy as np
+import pandas as pd
+
+from src.parameters.deformation import StreamingDeformation, calculate_deformation
+from src.parameters.lyapunov import (
+    StreamingLyapunov,
+    calculate_lyapunov,
+    largest_lyapunov_exponent,
+)
+from src.parameters.seismic_pulse import (
+    StreamingSeismicPulse,
+    calculate_b_value,
+    calculate_seismic_pulse,
+)
+
+
+def _catalog(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, 5 * 86400, n)), unit='s'),
+        'magnitude': rng.exponential(0.5, n) + 0.5,
+        'depth': rng.uniform(1.0, 15.0, n),
+    })
+
+
 def test_example():
     """Example test."""
     assert True
 
+
+def test_seismic_pulse_does_not_mutate_input():
+    """The caller's time column keeps its original dtype."""
+    catalog = _catalog()
+    catalog['time'] = catalog['time'].astype(str)
+    original = catalog.copy()
+
+    calculate_seismic_pulse(catalog, tremor_factor=0.2)
+
+    pd.testing.assert_frame_equal(catalog, original)
+
+
+def test_streaming_seismic_pulse_matches_batch_window():
+    """Running sums agree with a full rescan of the events in the window."""
+    catalog = _catalog()
+    stream = StreamingSeismicPulse(window=86400.0, mc=1.0)
+    stream.add_events(catalog)
+
+    cutoff = catalog['time'].iloc[-1] - pd.Timedelta(seconds=86400)
+    in_window = catalog[catalog['time'] >= cutoff]
+
+    assert len(stream) == len(in_window)
+    assert np.isclose(stream.value(tremor_factor=0.3),
+                      calculate_seismic_pulse(in_window, tremor_factor=0.3))
+    assert np.isclose(stream.b_value(), calculate_b_value(in_window, mc=1.0))
+
+
+def test_streaming_deformation_matches_windowed_regression():
+    """Network velocities equal a least-squares fit over the last window."""
+    rng = np.random.default_rng(3)
+    times = np.arange(600) / 48.0
+    velocity = rng.normal(0.0, 5.0, (4, 3))
+    positions = times[:, None, None] * velocity + rng.normal(0.0, 1.0, (600, 4, 3))
+    positions[450, 1, 0] += 300.0  # a single bad epoch
+
+    tracker = StreamingDeformation(['A', 'B', 'C', 'D'], window=100, outlier_threshold=5.0)
+    for t, epoch in zip(times, positions):
+        tracker.update(t, epoch)
+
+    recent = slice(500, 600)
+    expected = np.array([[np.polyfit(times[recent], positions[recent, s, c], 1)[0]
+                          for c in range(3)] for s in range(4)])
+    np.testing.assert_allclose(tracker.velocities(), expected, atol=1e-8)
+    assert tracker.outliers.tolist() == [0, 1, 0, 0]
+    assert 0.0 <= tracker.deformation_index() <= 1.0
+
+    frame = pd.DataFrame({
+        'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(times[recent], unit='D'),
+        'easting': positions[recent, 0, 0],
+        'northing': positions[recent, 0, 1],
+        'vertical': positions[recent, 0, 2],
+    })
+    assert np.isclose(calculate_deformation(frame), tracker.station_indices()[0])
+    assert 0.0 <= calculate_deformation(frame[['vertical']]) <= 1.0
+
+
+def test_lyapunov_exponent_of_logistic_map_and_streaming_windows():
+    """Rosenstein estimate recovers ln 2 for the logistic map; streaming matches batch."""
+    x = np.empty(2000)
+    x[0] = 0.3
+    for i in range(1, x.size):
+        x[i] = 4.0 * x[i - 1] * (1.0 - x[i - 1])
+    exponent = largest_lyapunov_exponent(x, dimension=2, delay=1, theiler=1, fit_steps=3)
+    assert abs(exponent - np.log(2)) < 0.05
+    assert calculate_lyapunov(pd.DataFrame({'value': x})) == 1.0
+
+    rng = np.random.default_rng(2)
+    series = np.sin(np.arange(1500) / 3.0) + 0.3 * rng.normal(size=1500)
+    streaming = StreamingLyapunov(window=500)
+    for chunk in np.array_split(series, 40):
+        streaming.update(chunk)
+        if len(streaming) == 500:
+            expected = largest_lyapunov_exponent(streaming.samples().copy(), 3,
+                                                 streaming.delay, streaming.theiler)
+            assert np.isclose(streaming.exponent(), expected)
+    assert 0.0 <= streaming.value() <= 1.0
+
+
 if __name__ == "__main__":
     test_example()
+    test_seismic_pulse_does_not_mutate_input()
+    test_streaming_seismic_pulse_matches_batch_window()
+    test_streaming_deformation_matches_windowed_regression()
+    test_lyapunov_exponent_of_logistic_map_and_streaming_windows()
     print("All tests passed!")
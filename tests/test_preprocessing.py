@@ -2,10 +2,206 @@
 Tests for preprocessing.
 """
 
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.integration.vuap import VolcanicMonitoringFramework
+from src.parameters.deformation import calculate_insar_deformation
+from src.parameters.gas_flux import calculate_gas_flux
+from src.parameters.seismic_pulse import calculate_seismic_pulse, calculate_tremor_factor
+from src.preprocessing.gas_processing import DOASRetrieval, GasStreamProcessor, plume_flux
+from src.preprocessing.gps_processing import GPSNetworkProcessor
+from src.preprocessing.insar_processing import los_observations, sbas_invert
+from src.preprocessing.seismic_processing import SeismicStreamProcessor, stream_chunks
+from src.utils.io import TimeSeriesStore
+
+
 def test_example():
     """Example test."""
     assert True
 
+
+def test_time_series_store_reads_projected_windows(tmp_path):
+    """Ingested data is partitioned by month and read back by window and column."""
+    times = pd.date_range('2024-01-20', '2024-03-10', freq='6h')
+    catalog = pd.DataFrame({
+        'time': times,
+        'magnitude': np.linspace(0.5, 3.0, len(times)),
+        'depth': np.linspace(1.0, 10.0, len(times)),
+        'station': ['ETNA'] * len(times),
+    })
+    store = TimeSeriesStore(str(tmp_path / 'store'))
+    store.ingest('seismic', catalog.iloc[::2])
+    store.ingest('seismic', catalog.iloc[1::2])
+
+    assert store.partitions('seismic') == ['2024-01', '2024-02', '2024-03']
+
+    window = store.read('seismic', '2024-02-25', '2024-03-02', columns=['magnitude'])
+    expected = catalog[(catalog['time'] >= '2024-02-25') & (catalog['time'] < '2024-03-02')]
+    assert list(window.columns) == ['time', 'magnitude']
+    np.testing.assert_array_equal(window['time'].to_numpy(), expected['time'].to_numpy())
+    np.testing.assert_allclose(window['magnitude'], expected['magnitude'])
+
+    framework = VolcanicMonitoringFramework('Etna')
+    framework.load_data(data_store=str(tmp_path / 'store'), end='2024-03-10', window='2D')
+    assert len(framework.seismic_data) == 8
+    assert framework.seismic_data['station'].eq('ETNA').all()
+
+    # CSV chunks are grouped by partition: one rewrite per month, not per chunk
+    catalog.to_csv(tmp_path / 'catalog.csv', index=False)
+    csv_store = TimeSeriesStore(str(tmp_path / 'csv'))
+    writes = []
+    write_partition = csv_store._write_partition
+    csv_store._write_partition = lambda *args: writes.append(str(args[2])) or write_partition(*args)
+    csv_store.ingest_csv('seismic', str(tmp_path / 'catalog.csv'), chunksize=20,
+                         max_buffered_rows=1000)
+    assert writes == ['2024-01', '2024-02', '2024-03']
+    np.testing.assert_array_equal(csv_store.read('seismic')['time'].to_numpy(),
+                                  store.read('seismic')['time'].to_numpy())
+
+    # Out-of-order files are still merged correctly when the buffer spills
+    catalog.iloc[::-1].to_csv(tmp_path / 'reversed.csv', index=False)
+    csv_store.ingest_csv('reversed', str(tmp_path / 'reversed.csv'), chunksize=20,
+                         max_buffered_rows=50)
+    pd.testing.assert_frame_equal(csv_store.read('reversed'), csv_store.read('seismic'))
+
+
+def test_gps_network_processor_streams_chunks():
+    """Chunked processing removes the common mode, outliers, offsets and gaps."""
+    rng = np.random.default_rng(0)
+    n_stations, n_epochs, chunk = 8, 3 * 2880, 2880
+    times = 1.7e9 + 30.0 * np.arange(n_epochs)
+    velocity = rng.normal(0, 10, (n_stations, 1, 3)) / 86400
+    signal = velocity * (times - times[0])[None, :, None]
+    common_mode = 0.15 * rng.normal(size=(n_epochs, 3)).cumsum(axis=0)
+
+    positions = signal + common_mode + rng.normal(0, 2, (n_stations, n_epochs, 3))
+    positions[3, 4000:] += [20.0, -15.0, 30.0]
+    positions[2, 100, 0] += 80.0
+    positions[1, 2000:2100] = np.nan
+
+    processor = GPSNetworkProcessor([f'GPS{i}' for i in range(n_stations)], interval=3600)
+    output = list(processor.process_stream(
+        (times[i:i + chunk], positions[:, i:i + chunk]) for i in range(0, n_epochs, chunk)
+    ))
+    bin_times = np.concatenate([t for t, _ in output])
+    values = np.concatenate([v for _, v in output], axis=1)
+
+    assert bin_times.size == 73 and np.all(np.diff(bin_times) == 3600)
+    assert not np.isnan(values).any()
+
+    assert [(o['station'], o['epoch']) for o in processor.offsets] == [(3, 4000)]
+    np.testing.assert_allclose(processor.offsets[0]['step'], [20.0, -15.0, 30.0], atol=1.5)
+
+    # Hourly means track the true motion relative to the network median
+    expected = signal - np.median(signal, axis=0)
+    expected = expected.reshape(n_stations, -1, 120, 3).mean(axis=2)
+    residual = values[:, :72] - expected
+    residual -= residual.mean(axis=1, keepdims=True)
+    assert np.abs(residual).max() < 2.0
+
+
+def test_sbas_inversion_of_memory_mapped_stack(tmp_path):
+    """Tiled SBAS inversion recovers the displacement history of a synthetic stack."""
+    rng = np.random.default_rng(1)
+    days = np.cumsum(rng.integers(6, 30, 15)).astype(float)
+    pairs = [(i, j) for i in range(15) for j in range(i + 1, min(i + 3, 15))]
+    yy, xx = np.mgrid[:40, :30]
+    rate = 0.05 * np.exp(-((xx - 15) ** 2 + (yy - 20) ** 2) / 200.0)  # m/yr
+    truth = rate[None] * (days / 365.25)[:, None, None]
+
+    stack = np.array([truth[j] - truth[i] for i, j in pairs], dtype=np.float32)
+    stack[3, :10, :10] = np.nan           # one interferogram missing over a corner
+    stack[:, 0, 29] = np.nan              # pixel never observed
+    np.save(tmp_path / 'stack.npy', stack)
+
+    result = sbas_invert(str(tmp_path / 'stack.npy'), days, pairs, str(tmp_path / 'sbas'),
+                         tile_size=16, max_workers=2)
+    assert result['displacement'].shape == (15, 40, 30)
+    assert np.isnan(result['velocity'][0, 29])
+    assert np.isnan(result['velocity']).sum() == 1
+
+    observed = np.isfinite(result['velocity'])
+    np.testing.assert_allclose(result['displacement'][:, observed],
+                               (truth - truth[0])[:, observed], atol=1e-5)
+    np.testing.assert_allclose(result['velocity'][observed], rate[observed], atol=1e-5)
+
+    assert 0.0 < calculate_insar_deformation(result['velocity']) <= 1.0
+    x, y, ux, uy, uz = los_observations(result['displacement'][-1], np.arange(30) * 100.0,
+                                        np.arange(40) * 100.0, step=5)
+    assert x.size == uz.size == 48 and np.isnan(ux).all()
+
+
+def test_seismic_stream_processor_builds_catalog_and_tremor():
+    """Chunked waveforms yield coincident events and an RSAM series for S(t)."""
+    rng = np.random.default_rng(0)
+    fs, n_stations = 50.0, 4
+    waveforms = rng.normal(0, 1, (n_stations, int(fs * 1800))).astype(np.float32)
+    decay = np.arange(int(4 * fs))
+    burst = 20 * np.exp(-decay / fs) * np.sin(2 * np.pi * 5 * decay / fs)
+    for onset in (300.0, 900.0, 1300.0):
+        for station in range(n_stations):
+            start = int((onset + 0.4 * station) * fs)
+            waveforms[station, start:start + decay.size] += burst
+    waveforms[:, int(1500 * fs):] *= 5  # tremor episode
+
+    # Multiplexed float32 frames, as from a socket
+    stream = io.BytesIO(waveforms.T.tobytes())
+    processor = SeismicStreamProcessor([f'ST{i}' for i in range(n_stations)], fs,
+                                       config={'rsam_window': 60.0}, max_workers=2)
+    events, tremor = processor.process_stream(
+        stream_chunks(stream, n_stations, chunk_samples=int(17 * fs)), start_time=0.0)
+    processor.close()
+
+    onsets = (events['time'] - pd.Timestamp(0)).dt.total_seconds().to_numpy()
+    np.testing.assert_allclose(onsets[:3], [300.0, 900.0, 1300.0], atol=0.5)
+    assert (events['n_stations'][:3] == n_stations).all()
+    assert len(tremor) == 30 and tremor['time'].is_monotonic_increasing
+
+    assert calculate_tremor_factor(tremor) > 0.5
+    pulse = calculate_seismic_pulse(events, tremor_data=tremor)
+    assert pulse == calculate_seismic_pulse(events, tremor_data=tremor)
+
+
+def test_gas_stream_processor_fluxes_and_ratios():
+    """Batched DOAS scans give the plume flux and MultiGAS batches the CO2/SO2 ratio."""
+    rng = np.random.default_rng(0)
+    wavelengths = np.linspace(300.0, 340.0, 512)
+    so2_xs = 1e-19 * (1 + np.sin(1.7 * wavelengths)) * np.exp(-(wavelengths - 305) / 15)
+    o3_xs = 5e-21 * np.exp(-(wavelengths - 300) / 10)
+    retrieval = DOASRetrieval(wavelengths, {'SO2': so2_xs, 'O3': o3_xs})
+
+    angles = np.linspace(-70.0, 70.0, 41)
+    position = 1000.0 * np.tan(np.radians(angles))
+    vertical = 2e17 * np.exp(-(position - 200) ** 2 / (2 * 300 ** 2))
+    clear_sky = 1e4 * np.exp(-(wavelengths - 320) ** 2 / 800)
+    slant = vertical / np.cos(np.radians(angles))
+    scan = clear_sky * np.exp(-np.outer(slant, so2_xs) - 3e18 * o3_xs)
+    spectra = scan[None] * (1 + rng.normal(0, 1e-4, (10, angles.size, wavelengths.size)))
+
+    processor = GasStreamProcessor(retrieval, angles, plume_distance=1000.0, ratio_window=300)
+    expected = plume_flux(slant[None], angles, 1000.0, wind_speed=5.0)[0]
+    assert 50.0 < expected < 100.0
+
+    so2 = np.abs(rng.normal(2.0, 1.5, 2000))
+    co2 = 400 + 5.0 * so2 + rng.normal(0, 0.2, 2000)
+    ratios = pd.concat([processor.process_multigas(np.arange(i, i + 500), so2[i:i + 500],
+                                                   co2[i:i + 500]) for i in range(0, 2000, 500)])
+    valid = ratios['co2_so2'].dropna()
+    assert len(valid) > 1500
+    np.testing.assert_allclose(valid, 5.0, rtol=0.02)
+
+    fluxes = processor.process_scans(np.arange(10) * 60.0, spectra, clear_sky, wind_speed=5.0)
+    np.testing.assert_allclose(fluxes['so2_flux'], expected, rtol=0.02)
+    np.testing.assert_allclose(fluxes['co2_flux'],
+                               fluxes['so2_flux'] * processor.ratio * 44.009 / 64.066)
+
+    g_index = calculate_gas_flux(pd.concat([fluxes, ratios], ignore_index=True))
+    assert 0.0 < g_index < 1.0
+
+
 if __name__ == "__main__":
     test_example()
     print("All tests passed!")